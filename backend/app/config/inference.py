@@ -0,0 +1,120 @@
+"""
+Inference configuration for VisionPulse API.
+Tune these values for your hardware (Render/Fly targets are CPU-only).
+"""
+from app.config.security import YOLO_CONFIDENCE_THRESHOLD
+
+# Models users can pick per request (?model=); weights missing locally are downloaded on first use
+MODELS = {
+    "yolov8n": "yolov8n.pt",  # fastest (downloaded at docker build time)
+    "yolov8s": "yolov8s.pt",
+    "yolov8m": "yolov8m.pt",
+    "yolov8l": "yolov8l.pt",
+    "yolov8x": "yolov8x.pt"  # most accurate, ~20x slower than n on CPU
+}
+DEFAULT_MODEL = "yolov8n"
+YOLO_MODEL_WEIGHTS = MODELS[DEFAULT_MODEL]  # Weights of the default model
+MODEL_MEMORY_BUDGET_MB = 1500  # Loaded replicas above this evict the least recently used models
+MODEL_MEMORY_OVERHEAD = 3.0  # Estimated RAM per replica = weights size x this (activations, workspace)
+INFERENCE_BACKEND = "torch"  # "torch", "onnx", "openvino" or "onnx_int8" (exported once, cached next to the weights)
+
+# Fixed predict settings - same for every image so results stay consistent
+PREDICT_KWARGS = {
+    "conf": YOLO_CONFIDENCE_THRESHOLD,
+    "iou": 0.45,  # Standard NMS IoU threshold
+    "imgsz": 640,  # Fixed image size for consistency
+    "max_det": 300,  # Maximum detections per image
+    "agnostic_nms": False,  # Class-specific NMS
+    "verbose": False
+}
+
+# Startup preload (load + warm models before the server accepts traffic; /ready reports progress)
+PRELOAD_ON_STARTUP = False  # True = load + warm before accepting traffic (False = load inside the first request)
+PRELOAD_MODELS = []  # Extra models to load + warm at startup (the default model always is)
+PRELOAD_BACKENDS = []  # Alternate backends to export + warm at startup too, e.g. ["onnx", "openvino"]
+PRELOAD_TIMEOUT_SECONDS = 300  # Startup gives up on preloading after this (server still starts, /ready stays 503)
+
+# Micro-batching (concurrent /api/infer requests share one predict() call)
+INFERENCE_MAX_BATCH_SIZE = 8  # Max images per forward pass (1 = old single-image path)
+INFERENCE_MAX_WAIT_MS = 10  # How long the first queued request waits for others to join
+INFERENCE_STATS_WINDOW = 1000  # Number of recent requests kept for wait-time percentiles
+
+# Fair scheduling of queued work (weighted fair queueing per session and priority class)
+INFERENCE_PRIORITY_WEIGHTS = {
+    "interactive": 16,  # /api/infer and frame streams - somebody is waiting on the response
+    "batch": 2,  # /api/infer-batch images
+    "speculative": 1  # work started at upload before anyone asked for it
+}
+
+# Asynchronous job API (/api/jobs; jobs are kept in SQLite so queued work survives restarts)
+JOB_WORKERS = 4  # Jobs in flight at once (their images still share the batcher with everything else)
+JOB_PRIORITY = "interactive"  # Fair-queue class of job images (see INFERENCE_PRIORITY_WEIGHTS)
+JOB_TIMEOUT_SECONDS = 600  # A job gives up after this, including time spent waiting out overload
+JOB_MAX_ATTEMPTS = 3  # Jobs interrupted by this many restarts are marked failed instead of re-run
+JOB_RETENTION_HOURS = 24  # Finished jobs (and their results) are deleted after this
+
+# Executor (keeps forward passes, model loading and warmup off the event loop)
+INFERENCE_EXECUTOR_WORKERS = 1  # Worker threads, each with its own model replica
+INFERENCE_MAX_QUEUE = 32  # Requests allowed to wait for a worker before we return 503
+
+# Admission control (reject early with 503 + Retry-After instead of timing out in the queue)
+ADMISSION_COLD_BATCH_MS = 500  # Assumed forward-pass time before any batch has been measured
+DISCONNECT_POLL_SECONDS = 0.25  # How often a waiting request checks whether its client left
+
+# Frame-stream detection over WebSocket (/ws/detect/{session_id})
+STREAM_DEFAULT_MODE = "latest"  # "latest" (drop stale frames, lowest latency) or "all" (every frame, in order)
+STREAM_MAX_BUFFERED_FRAMES = 30  # "all" mode: frames allowed to wait before we stop reading the socket
+STREAM_STATS_WINDOW_SECONDS = 5  # Window for the per-stream FPS and latency figures
+
+# Multi-process replica pool (0 = run the model inside the API process)
+INFERENCE_REPLICAS = 0  # Worker processes, each with its own YOLO replica
+INFERENCE_THREADS_PER_REPLICA = 2  # torch intra-op threads (and pinned cores) per replica
+REPLICA_START_TIMEOUT_SECONDS = 120  # Time allowed for all replicas to load + warm up
+REPLICA_RESULT_TIMEOUT_SECONDS = 60  # Give up on a batch if its replica never answers
+
+# Tiled inference for high-resolution images (native-resolution tiles instead of one 640 downscale)
+TILING_ENABLED = True
+TILING_MEGAPIXEL_THRESHOLD = 4.0  # Images above this many megapixels are tiled automatically
+TILE_SIZE = 640  # Tile edge in pixels (matches imgsz, so tiles run at native resolution)
+TILE_OVERLAP = 0.2  # Fraction of a tile shared with its neighbour (objects on borders appear whole once)
+TILE_INCLUDE_FULL_IMAGE = True  # Also predict the downscaled full image, for objects bigger than a tile
+TILE_MERGE_METHOD = "nms"  # "nms" (keep best box) or "wbf" (confidence-weighted box fusion)
+TILE_MERGE_METRIC = "ios"  # "ios" (intersection over smaller box, catches border slivers) or "iou"
+TILE_MERGE_THRESHOLD = 0.5  # Same-class boxes overlapping at least this much are merged
+
+# Decoded + letterboxed image cache (upload -> inference, keyed by image_id; entries expire after SESSION_TTL_MINUTES)
+PREPROCESS_CACHE_MB = 256  # ~1.2 MB per cached 640x640 image
+PREPROCESS_AT_UPLOAD = True  # Decode + letterbox right after upload (in the background) instead of on first inference
+
+# Speculative inference at upload (opt-in; /api/infer then attaches to the running job or takes its result)
+SPECULATIVE_INFERENCE = False  # Start detection as soon as an upload is accepted (?speculate= overrides per upload)
+SPECULATIVE_MAX_INFLIGHT = 4  # Speculative jobs allowed at once; further uploads are simply not speculated
+SPECULATIVE_RESULT_TTL_SECONDS = 300  # Results nobody asked for are dropped after this
+
+# Inference result cache (keyed by image bytes + model + predict params)
+INFERENCE_CACHE_ENABLED = True
+INFERENCE_CACHE_MEMORY_ENTRIES = 512  # In-memory LRU size (a few KB per entry)
+INFERENCE_CACHE_DISK_ENTRIES = 10000  # On-disk entries kept across restarts
+
+# Validation storage (app/utils/validation_store.py)
+VALIDATION_STORE = "sqlite"  # "sqlite" (rows in one WAL database), "journal" (snapshot + event log, with undo) or "json" (file per session)
+VALIDATION_COALESCE_MS = 20  # Edits to one session arriving this close together are persisted in one write
+JOURNAL_FSYNC_INTERVAL_MS = 50  # Journal appends are fsynced together this often (one fsync per burst of edits)
+JOURNAL_COMPACT_EVENTS = 500  # Fold a session's journal into a new snapshot once this many events are waiting
+JOURNAL_COMPACT_INTERVAL_SECONDS = 30  # How often the background thread looks for journals to compact
+JOURNAL_IDLE_SECONDS = 600  # Sessions untouched this long are compacted and dropped from memory
+
+# INT8 quantization (INFERENCE_BACKEND = "onnx_int8"; build + check with scripts/quantize_int8.py)
+INT8_QUANTIZATION_MODE = "static"  # "static" (calibrated on uploads) or "dynamic" (weights only)
+INT8_CALIBRATION_IMAGES = 100  # Most recent uploads used for static calibration
+INT8_REQUIRE_GUARDRAIL = True  # Serve INT8 only if its accuracy report passed, else FP32 onnx
+INT8_MAX_PRECISION_DROP = 0.02  # Allowed precision loss vs FP32 on user ground truth
+INT8_MAX_RECALL_DROP = 0.02  # Allowed recall loss vs FP32 on user ground truth
+
+# Notes:
+# - On CPU, batches beyond ~8 images rarely help; raise it on GPU hosts
+# - Keep INFERENCE_MAX_WAIT_MS small - it is added to every lone request's latency
+# - More executor workers only help when cores are idle; each replica also uses torch intra-op threads
+# - On CPU-only hosts (Render/Fly) INFERENCE_BACKEND = "openvino" or "onnx" is usually faster than torch;
+#   compare with scripts/bench_backends.py
+# - With replicas enabled, keep INFERENCE_REPLICAS x INFERENCE_THREADS_PER_REPLICA <= physical cores
@@ -8,9 +8,12 @@ from slowapi.errors import RateLimitExceeded
 import os
 import secrets
 
-from app.routers import upload, inference, export, ws, validation
+from app.routers import upload, inference, export, ws, validation, stream, jobs
 from app.middleware.security import SecurityHeadersMiddleware, CSRFProtectionMiddleware
 from app.utils.cleanup import start_cleanup_task
+from app.utils.image_index import image_index
+from app.utils.validation_store import validation_store
+from app.config.inference import PRELOAD_ON_STARTUP
 
 limiter = Limiter(key_func=get_remote_address)
 app = FastAPI(
@@ -49,6 +52,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Detections", "ETag"],  # X-Detections: metadata for ?format=float32; ETag: send back as If-Match
     allow_origin_regex=r"https://.*\.(vercel\.app|railway\.app)",
 )
 
@@ -57,13 +61,33 @@ app.include_router(upload.router, prefix="/api", tags=["upload"])
 app.include_router(inference.router, prefix="/api", tags=["inference"])
 app.include_router(validation.router, prefix="/api", tags=["validation"])
 app.include_router(export.router, prefix="/api", tags=["export"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
 app.include_router(ws.router, prefix="/ws", tags=["websockets"])
+app.include_router(stream.router, prefix="/ws", tags=["websockets"])
 
 # Start background cleanup task on startup
 @app.on_event("startup")
-def startup_event():
-    """Start cleanup task when server starts."""
+async def startup_event():
+    """
+    Index uploads and start the cleanup task, then (with PRELOAD_ON_STARTUP)
+    load + warm the model. Uvicorn only accepts connections once this
+    returns, so the first request never pays the cold start.
+    """
+    indexed = image_index.rebuild()  # also moves old flat-layout uploads into session dirs
+    print(f"Indexed {indexed} uploaded images")
     start_cleanup_task()  # Uses CLEANUP_INTERVAL_MINUTES from config
+    recovered = jobs.job_runner.recover()  # jobs queued before the last shutdown
+    if recovered:
+        print(f"Re-queued {recovered} unfinished inference jobs")
+    if PRELOAD_ON_STARTUP:
+        await inference.preload()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stop inference replica processes and flush validation data when server stops."""
+    if inference.replica_pool is not None:
+        inference.replica_pool.shutdown()
+    validation_store.close()
 
 @app.get("/")
 async def root():
@@ -71,8 +95,31 @@ async def root():
 
 @app.get("/health")
 async def health():
+    """Liveness: the process is up (says nothing about the model)."""
     return {"ok": True}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: 200 once the model is loaded and warmed, 503 before that
+    (or if preloading failed). With PRELOAD_ON_STARTUP off the model
+    loads lazily, so the server counts as ready straight away.
+    """
+    model = inference.readiness.snapshot()
+    is_ready = inference.readiness.ready or not PRELOAD_ON_STARTUP
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={
+            "ready": is_ready,
+            "backend": inference.ACTIVE_BACKEND,
+            "loaded_models": inference.registry.loaded(),
+            "preload": PRELOAD_ON_STARTUP,
+            "model": model,
+            "queue_depth": inference.batcher.queue_depth(),
+            "executor": inference.inference_executor.stats()
+        }
+    )
+
 @app.get("/csrf-token")
 async def get_csrf_token(request: Request):
     """
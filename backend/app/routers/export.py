@@ -1,18 +1,16 @@
 import io
 import zipfile
-from pathlib import Path
+from typing import Optional
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from app.utils.image_index import image_index
 
 router = APIRouter()
 
-# cross-platform temp dir
-import tempfile
-UPLOAD_DIR = Path(tempfile.gettempdir()) / "visionpulse_uploads"
-
 class ExportRequest(BaseModel):
     session_id: str
+    image_id: Optional[str] = None  # defaults to the session's most recent upload
     boxes: list[dict]  # {x1, y1, x2, y2, class_id, ...}
     image_width: int
     image_height: int
@@ -53,10 +51,12 @@ async def export_yolo(data: ExportRequest):
         zf.writestr(f"{data.session_id}.txt", labels_content)
         
         # add original image
-        files = list(UPLOAD_DIR.glob(f"{data.session_id}.*"))
-        if files:
-            with open(files[0], "rb") as img:
-                zf.writestr(files[0].name, img.read())
+        if data.image_id and data.image_id.startswith(f"{data.session_id}_"):
+            record = image_index.get(data.image_id)
+        else:
+            record = image_index.latest(data.session_id)
+        if record is not None and record.path.exists():
+            zf.write(record.path, record.path.name)
     
     zip_buffer.seek(0)
     
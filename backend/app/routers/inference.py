@@ -1,57 +1,550 @@
 import time
 import json
+import asyncio
+import threading
 import numpy as np
 from pathlib import Path
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request
+from typing import Awaitable, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-from ultralytics import YOLO
 from app.utils.metrics import calc_metrics
+from app.utils.batcher import MicroBatcher, DeadlineExceeded
+from app.utils.admission import AdmissionController, Overloaded
+from app.utils.executor import inference_executor, InferenceQueueFull
+from app.utils.detections import Detections
+from app.utils.replica_pool import ReplicaPool
+from app.utils.images import decode_image, image_size, unletterbox_boxes
+from app.utils.image_index import image_index
+from app.utils.preprocess_cache import Prepared, preprocess_cache, prepare
+from app.utils.tiling import merge_boxes, shift_boxes, tile_grid
+from app.utils.inference_cache import inference_cache, cache_key
+from app.utils.backends import load_backend_model, resolve_backend
+from app.utils.readiness import Readiness
+from app.utils.model_registry import ModelRegistry, UnknownModel
+from app.utils.payloads import FORMATS, UnsupportedFormat, encode_response, objects
+from app.utils.stages import StageTimer, stage_stats
+from app.utils.speculative import speculator
+from app.utils.job_store import job_store
+from app.utils.single_flight import SingleFlight
+from app.utils.validation_store import ImageNotFound, SessionNotFound, validation_store
+from app.utils.session_writer import session_writer
+from app.utils.image_index import ImageRecord
 from app.schemas.validation import GroundTruthBox
+from app.middleware.security import validate_session_id
+from app.routers import ws
+from app.config.inference import (
+    DEFAULT_MODEL,
+    DISCONNECT_POLL_SECONDS,
+    INFERENCE_BACKEND,
+    INFERENCE_CACHE_ENABLED,
+    INFERENCE_REPLICAS,
+    PRELOAD_BACKENDS,
+    PRELOAD_MODELS,
+    PRELOAD_TIMEOUT_SECONDS,
+    PREDICT_KWARGS,
+    TILE_INCLUDE_FULL_IMAGE,
+    TILE_MERGE_METHOD,
+    TILE_MERGE_METRIC,
+    TILE_MERGE_THRESHOLD,
+    TILE_OVERLAP,
+    TILE_SIZE,
+    TILING_ENABLED,
+    TILING_MEGAPIXEL_THRESHOLD,
+    YOLO_MODEL_WEIGHTS
+)
 from app.config.security import (
     INFERENCE_RATE_LIMIT,
-    YOLO_CONFIDENCE_THRESHOLD,
+    MAX_IMAGES_PER_SESSION,
     YOLO_INFERENCE_TIMEOUT_SECONDS
 )
 
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
 
-# load model once (lazy)
-model = None
+# Model load state and warmup timings (reported by /ready)
+readiness = Readiness()
 
-# cross-platform temp dir
-import tempfile
-UPLOAD_DIR = Path(tempfile.gettempdir()) / "visionpulse_uploads"
-VALIDATION_DIR = Path(tempfile.gettempdir()) / "visionpulse_validations"
-VALIDATION_DIR.mkdir(exist_ok=True)
+# Backend actually serving the default model (onnx_int8 may fall back to onnx) - checked once at startup
+ACTIVE_BACKEND = resolve_backend(INFERENCE_BACKEND, YOLO_MODEL_WEIGHTS)
 
-def get_model():
-    global model
-    if model is None:
-        model = YOLO("yolov8n.pt")
+def load_model(weights: str = YOLO_MODEL_WEIGHTS, backend: Optional[str] = None, name: str = DEFAULT_MODEL):
+    """
+    Load and warm up a fresh YOLO replica. Blocking - call it on the executor.
+    Every model goes through here, so they all get the same warmup.
+    """
+    backend = backend or ACTIVE_BACKEND
+    t0 = time.perf_counter()
+    yolo = load_backend_model(backend, weights)
+    if backend == "torch":
         # Enable half precision for faster inference (2x speedup on compatible hardware)
         try:
-            model.to('cuda')  # Try GPU first
-            model.half()  # Use FP16 for faster inference
+            yolo.to('cuda')  # Try GPU first
+            yolo.half()  # Use FP16 for faster inference
         except:
             # Fallback to CPU if CUDA not available
             pass
-        # Set deterministic behavior for consistent results
-        import torch
-        torch.manual_seed(42)
-        if torch.cuda.is_available():
-            torch.cuda.manual_seed(42)
-        # Warm up the model with a dummy prediction to ensure consistent performance
-        import numpy as np
-        dummy_img = np.zeros((640, 640, 3), dtype=np.uint8)
-        model.predict(dummy_img, verbose=False)
-    return model
+    # Set deterministic behavior for consistent results
+    import torch
+    torch.manual_seed(42)
+    if torch.cuda.is_available():
+        torch.cuda.manual_seed(42)
+    t1 = time.perf_counter()
+    # Warm up the model with a dummy prediction to ensure consistent performance
+    dummy_img = np.zeros((640, 640, 3), dtype=np.uint8)
+    yolo.predict(dummy_img, verbose=False)
+    readiness.record(
+        f"{name}:{backend}/{threading.current_thread().name}",
+        load_ms=(t1 - t0) * 1000,
+        warmup_ms=(time.perf_counter() - t1) * 1000
+    )
+    return yolo
+
+# Models users can pick per request, loaded lazily and kept under MODEL_MEMORY_BUDGET_MB
+registry = ModelRegistry(load_model)
+
+# Out-of-process replicas for the default model (None = predict in this process)
+replica_pool = ReplicaPool(backend=ACTIVE_BACKEND, predict_kwargs=PREDICT_KWARGS) if INFERENCE_REPLICAS > 0 else None
+
+def read_decoded(path, timer: StageTimer):
+    """Read + decode an image file, timing the two separately."""
+    t = time.perf_counter_ns()
+    data = Path(path).read_bytes()
+    t = timer.since("read", t)
+    img = decode_image(data)
+    timer.since("decode", t)
+    return img
+
+def load_prepared(source, timer: Optional[StageTimer] = None):
+    """
+    Letterboxed image for an upload: from the preprocess cache (filled at
+    upload time), else decoded from disk and cached for next time.
+    Stream frames arrive already prepared.
+    """
+    if isinstance(source, Prepared):
+        return source
+    timer = timer or StageTimer()
+    image_id = Path(source).stem
+    prepared = preprocess_cache.get(image_id)
+    if prepared is None:
+        img = read_decoded(source, timer)
+        t = time.perf_counter_ns()
+        prepared = preprocess_cache.fill(image_id, img) or prepare(img)
+        timer.since("preprocess", t)
+    return prepared
+
+def predict_stages(results: list, wall_ns: int) -> dict:
+    """
+    Split one predict() call into preprocess / forward / nms (ns) using
+    ultralytics' own per-image timings ("postprocess" is mostly NMS).
+    Every image of a batch waited for the whole call, so each is charged
+    the batch totals. Without timings it all counts as forward.
+    """
+    speed = getattr(results[0], "speed", None) if results else None
+    if not speed:
+        return {"forward": wall_ns}
+    forward = int(speed.get("inference", 0.0) * len(results) * 1e6)
+    nms = int(speed.get("postprocess", 0.0) * len(results) * 1e6)
+    return {"preprocess": max(0, wall_ns - forward - nms), "forward": forward, "nms": nms}
+
+def predict_batch(items: list) -> list:
+    """
+    Run a batch of (model_name, source[, StageTimer]) items (one Detections
+    per item). Items of the same model share one forward pass; the
+    detections record the model that produced them. Items carrying a
+    timer get their queue wait, decode/preprocess and the batch's
+    forward/NMS charged to it.
+    """
+    by_model = {}
+    for index, (name, *_) in enumerate(items):
+        by_model.setdefault(name, []).append(index)
+    
+    results = [None] * len(items)
+    for name, indices in by_model.items():
+        timers = [items[i][2] if len(items[i]) > 2 else StageTimer() for i in indices]
+        for timer in timers:
+            if timer.queued_ns is not None:
+                timer.since("queue", timer.queued_ns)
+        # Decode up front: ultralytics only stacks in-memory images into one batch,
+        # a list of file paths is still predicted one image at a time
+        # (tiles arrive already decoded and are predicted as they are)
+        prepared = [
+            None if isinstance(items[i][1], np.ndarray) else load_prepared(items[i][1], timer)
+            for i, timer in zip(indices, timers)
+        ]
+        images = [items[i][1] if p is None else p.image for i, p in zip(indices, prepared)]
+        if replica_pool is not None and name == DEFAULT_MODEL:
+            t0 = time.perf_counter_ns()
+            output = replica_pool.predict(images)  # parsed in the worker process
+            stages = {"forward": time.perf_counter_ns() - t0}
+            parse = None
+        else:
+            with registry.checkout(name) as yolo:
+                t0 = time.perf_counter_ns()
+                output = yolo.predict(images, **PREDICT_KWARGS)
+            stages = predict_stages(output, time.perf_counter_ns() - t0)
+            parse = Detections.from_result
+        registry.record(name, len(indices), sum(stages.values()) / 1e6)
+        for i, p, timer, raw in zip(indices, prepared, timers, output):
+            t = time.perf_counter_ns()
+            detections = parse(raw) if parse is not None else raw
+            rows = detections.array
+            if p is not None:
+                rows = unletterbox_boxes(rows, p.scale, p.pad, p.shape)
+            results[i] = Detections(rows, detections.names, name)
+            for stage, ns in stages.items():
+                timer.add(stage, ns)
+            timer.since("parse", t)
+    return results
+
+# Groups concurrent requests into one predict() call, run on the inference executor
+batcher = MicroBatcher(predict_batch, executor=inference_executor)
+
+# Turns requests away up front when they can't finish before their deadline
+admission = AdmissionController(batcher)
+
+def _warm_replica_pool():
+    t0 = time.perf_counter()
+    replica_pool.start()  # loads + warms every replica before returning
+    readiness.record(f"{ACTIVE_BACKEND}/replica-pool", load_ms=(time.perf_counter() - t0) * 1000, warmup_ms=0.0)
+
+async def preload():
+    """
+    Load and warm the default model before traffic arrives, so no user
+    request pays the cold start. Every executor thread needs its own
+    replica: each warmup job holds its checkout until all of them have
+    one, so they can't reuse each other's. PRELOAD_MODELS get one warmed
+    replica each; PRELOAD_BACKENDS are exported and warmed as well, so
+    switching INFERENCE_BACKEND later doesn't pay the export either.
+    """
+    readiness.begin()
+    workers = inference_executor.max_workers
+    barrier = threading.Barrier(workers)
+    
+    def warm_thread():
+        try:
+            with registry.checkout(DEFAULT_MODEL):
+                barrier.wait(timeout=PRELOAD_TIMEOUT_SECONDS)
+        except Exception:
+            barrier.abort()
+            raise
+    
+    def warm_model(name):
+        with registry.checkout(name):
+            pass
+    
+    async def load_all():
+        if replica_pool is not None:
+            await inference_executor.run(_warm_replica_pool)
+        else:
+            await asyncio.gather(*(inference_executor.run(warm_thread) for _ in range(workers)))
+        for name in PRELOAD_MODELS:
+            if name != DEFAULT_MODEL:
+                await inference_executor.run(warm_model, name)
+        for backend in PRELOAD_BACKENDS:
+            if backend != ACTIVE_BACKEND:
+                await inference_executor.run(load_model, YOLO_MODEL_WEIGHTS, backend)
+    
+    try:
+        await asyncio.wait_for(load_all(), timeout=PRELOAD_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        readiness.fail(f"Preload timed out after {PRELOAD_TIMEOUT_SECONDS}s")
+        print(f"[INFERENCE] Preload timed out after {PRELOAD_TIMEOUT_SECONDS}s")
+        return
+    except Exception as e:
+        readiness.fail(f"{type(e).__name__}: {e}")
+        print(f"[INFERENCE] Preload failed: {e}")
+        return
+    readiness.finish()
+    print(f"[INFERENCE] Models ready: {readiness.snapshot()['models']}")
+
+def model_identity(model: str = DEFAULT_MODEL) -> str:
+    """Identifies whatever produces the boxes - part of every cache key."""
+    return f"{model}:{registry.identity(model)}"
+
+def should_tile(filepath: Path) -> bool:
+    if not TILING_ENABLED:
+        return False
+    try:
+        width, height = image_size(filepath)
+    except Exception:
+        return False  # let the normal path report the decode error
+    return width * height > TILING_MEGAPIXEL_THRESHOLD * 1_000_000
+
+def tiling_identity() -> str:
+    """Tiling settings that change the boxes - part of the cache key for tiled images."""
+    return (
+        f"tiled:{TILE_SIZE}:{TILE_OVERLAP}:{int(TILE_INCLUDE_FULL_IMAGE)}:"
+        f"{TILE_MERGE_METHOD}:{TILE_MERGE_METRIC}:{TILE_MERGE_THRESHOLD}"
+    )
+
+async def gather_or_cancel(coros) -> list:
+    """asyncio.gather(), but the first failure cancels the rest (dropping their queued work)."""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+async def detect_tiled(
+    filepath: Path,
+    model: str = DEFAULT_MODEL,
+    deadline: Optional[float] = None,
+    report: Optional[dict] = None,
+    timer: Optional[StageTimer] = None,
+    session: Optional[str] = None,
+    priority: str = "interactive"
+) -> Detections:
+    """
+    Tiled inference for one large image: overlapping TILE_SIZE crops (plus
+    the downscaled full image) go through the micro-batcher in groups of
+    INFERENCE_MAX_BATCH_SIZE, under the request's session and priority, so
+    they share the fair queue, queue limits and deadline shedding with
+    everything else. At most one group per executor worker is queued at a
+    time - a huge image can't fill the queue on its own. The boxes are
+    shifted back and merged. Groups overlap in time, so their stage times
+    add up to more than the request's wall time.
+    """
+    timer = timer or StageTimer()
+    start = time.perf_counter()
+    image = await inference_executor.run(read_decoded, filepath, timer)
+    height, width = image.shape[:2]
+    windows = tile_grid(width, height, TILE_SIZE, TILE_OVERLAP)
+    sources = [image[y0:y1, x0:x1] for x0, y0, x1, y1 in windows]
+    offsets = [(x0, y0) for x0, y0, _, _ in windows]
+    if TILE_INCLUDE_FULL_IMAGE:
+        sources.append(image)
+        offsets.append((0, 0))
+    size = batcher.max_batch_size
+    groups = [list(range(i, min(i + size, len(sources)))) for i in range(0, len(sources), size)]
+    
+    in_flight = asyncio.Semaphore(batcher.concurrency())
+    
+    async def submit(indices):
+        async with in_flight:
+            t0 = time.perf_counter()
+            output = await gather_or_cancel(
+                batcher.submit((model, sources[i], timer), deadline=deadline, session=session, priority=priority)
+                for i in indices
+            )
+            return output, (time.perf_counter() - t0) * 1000
+    
+    decoded = time.perf_counter()
+    results = await gather_or_cancel(submit(g) for g in groups)
+    
+    rows, names, tiles, batches = [], {}, [], []
+    for batch_index, (indices, (output, run_ms)) in enumerate(zip(groups, results)):
+        batches.append({"size": len(indices), "ms": round(run_ms, 1)})
+        for i, tile_boxes in zip(indices, output):
+            rows.append(shift_boxes(tile_boxes.array, *offsets[i]))
+            names.update(tile_boxes.names)
+            x0, y0 = offsets[i]
+            tiles.append({
+                "x": x0, "y": y0,
+                "width": sources[i].shape[1], "height": sources[i].shape[0],
+                "full_image": i == len(windows),
+                "boxes": len(tile_boxes),
+                "batch": batch_index,
+                "ms": round(run_ms / len(indices), 1)  # share of its group's time
+            })
+    
+    merge_start = time.perf_counter()
+    boxes = np.concatenate(rows)
+    merged = merge_boxes(boxes, TILE_MERGE_METHOD, TILE_MERGE_METRIC, TILE_MERGE_THRESHOLD)
+    merged = merged[:PREDICT_KWARGS["max_det"]]
+    timer.add("nms", int((time.perf_counter() - merge_start) * 1e9))  # cross-tile NMS/WBF
+    if report is not None:
+        report["tiling"] = {
+            "image_size": [width, height],
+            "tiles": tiles,
+            "batches": batches,
+            "boxes_before_merge": len(boxes),
+            "decode_ms": round((decoded - start) * 1000, 1),
+            "merge_ms": round((time.perf_counter() - merge_start) * 1000, 1),
+            "total_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+    return Detections(merged, {c: names[c] for c in np.unique(merged[:, 5]).astype(int).tolist()}, model)
+
+def inspect_image(filepath: Path, model: str) -> tuple[bool, Optional[str]]:
+    """(whether to tile, result-cache key or None) for an image file. Blocking - run it on a thread."""
+    tiled = should_tile(filepath)
+    if not INFERENCE_CACHE_ENABLED:
+        return tiled, None
+    model_id = f"{model_identity(model)}:{tiling_identity()}" if tiled else model_identity(model)
+    return tiled, cache_key(filepath.read_bytes(), model_id, PREDICT_KWARGS)
+
+async def detect(
+    filepath: Path,
+    model: str = DEFAULT_MODEL,
+    deadline: Optional[float] = None,
+    report: Optional[dict] = None,
+    timer: Optional[StageTimer] = None,
+    session: Optional[str] = None,
+    priority: str = "interactive"
+) -> tuple[Detections, bool]:
+    """
+    Detections for one image file from the given model (a name from MODELS,
+    already resolved), plus whether they came from the cache.
+    Cache hits never touch the model. Misses go through admission control
+    (raises Overloaded) and then the batcher, or tiled inference for
+    images above TILING_MEGAPIXEL_THRESHOLD (tile timings go into report).
+    Stage timings go into timer. session and priority place the image in
+    the batcher's fair queue (see app/utils/fair_queue.py).
+    """
+    timer = timer or StageTimer()
+    t = time.perf_counter_ns()
+    loop = asyncio.get_running_loop()
+    # File I/O and hashing block - keep them off the event loop (so does the cache's disk tier)
+    tiled, key = await loop.run_in_executor(None, inspect_image, filepath, model)
+    timer.since("read", t)
+    if key is not None:
+        cached = await loop.run_in_executor(None, inference_cache.get, key)
+        if cached is not None:
+            return Detections.from_json(cached), True
+    
+    admission.admit(deadline)
+    if tiled:
+        boxes = await detect_tiled(
+            filepath, model, deadline=deadline, report=report, timer=timer, session=session, priority=priority
+        )
+    else:
+        timer.queued_ns = time.perf_counter_ns()
+        boxes = await batcher.submit((model, str(filepath), timer), deadline=deadline, session=session, priority=priority)
+    if key is not None:
+        await loop.run_in_executor(None, inference_cache.put, key, boxes.to_json())
+    return boxes, False
+
+def model_busy() -> bool:
+    """Anything queued or every worker running - speculative work would get in the way."""
+    return batcher.queue_depth() > 0 or batcher.running_batches() >= batcher.concurrency()
+
+def speculate(
+    session_id: str,
+    image_id: str,
+    filepath: Path,
+    model: str = DEFAULT_MODEL,
+    after: Optional[Awaitable] = None
+) -> bool:
+    """
+    Start detection for a fresh upload in the background (low priority,
+    see app/utils/speculative.py). after is awaited first - the upload's
+    preprocessing, so the job finds the image already decoded.
+    """
+    async def job():
+        if after is not None:
+            await after
+        report = {}
+        boxes, cached = await detect(filepath, model, report=report, session=session_id, priority="speculative")
+        return boxes, cached, report
+    
+    return speculator.start((image_id, model), job, busy=model_busy())
+
+def queued_image(model: str, filepath: Path):
+    """Matches the batcher item of one image file (tiles and stream frames are queued as arrays)."""
+    path = str(filepath)
+    return lambda item: isinstance(item[1], str) and item[1] == path and item[0] == model
+
+async def detect_or_attach(
+    session_id: str,
+    image_id: str,
+    filepath: Path,
+    model: str,
+    deadline: Optional[float],
+    report: dict,
+    timer: StageTimer,
+    priority: str = "interactive"
+) -> tuple[Detections, bool]:
+    """
+    detect(), unless a speculative job already has (or is computing) this
+    image's boxes - then wait for it instead (moving it up to interactive
+    priority if it is still queued). A failed job falls back to running
+    the image normally.
+    """
+    job = speculator.take((image_id, model))
+    if job is not None:
+        t = time.perf_counter_ns()
+        batcher.reprioritize(queued_image(model, filepath), priority)
+        try:
+            boxes, cached, job_report = await asyncio.shield(job)  # a disconnect must not kill the job
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        else:
+            timer.since("speculative", t)
+            report.update(job_report, speculative=True)
+            return boxes, cached
+    return await detect(filepath, model, deadline=deadline, report=report, timer=timer, session=session_id, priority=priority)
+
+# Concurrent /api/infer calls for the same image, model and params share one run
+single_flight = SingleFlight()
+
+def flight_key(image_id: str, model: str) -> tuple:
+    """Everything that decides an image's stored result."""
+    return (image_id, model_identity(model), tiling_identity(), json.dumps(PREDICT_KWARGS, sort_keys=True))
+
+async def infer_image(
+    session_id: str,
+    record: ImageRecord,
+    model: str,
+    deadline: Optional[float] = None,
+    priority: str = "interactive"
+) -> dict:
+    """
+    Detect + persist one uploaded image and return the /api/infer body.
+    Calls for an image that is already being run (double-clicks, retries,
+    a job for the same image) wait for that run and get its result, so
+    the model runs once and the detections are stored once; their copy
+    says "coalesced": true.
+    """
+    check_stored_model(session_id, record.image_id, model)
+    
+    async def run():
+        start = time.perf_counter()
+        report = {}
+        timer = StageTimer()
+        detections, cached = await detect_or_attach(
+            session_id, record.image_id, record.path, model, deadline, report, timer, priority
+        )
+        return store_result(session_id, record.image_id, detections, cached, time.perf_counter() - start, model, report, timer)
+    
+    meta, shared = await single_flight.do(flight_key(record.image_id, model), run)
+    return {**meta, "coalesced": True} if shared else dict(meta)
+
+class ClientDisconnected(Exception):
+    pass
+
+class ModelMismatch(Exception):
+    pass
+
+async def until_disconnect(request: Request, coro):
+    """Await coro, but cancel it (and drop any queued work) if the client goes away."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
 
 @router.post("/infer/{session_id}")
 @limiter.limit(INFERENCE_RATE_LIMIT)
-async def run_inference(request: Request, session_id: str, image_id: str = None):
+async def run_inference(
+    request: Request,
+    session_id: str,
+    image_id: str = None,
+    model: Optional[str] = None,
+    response_format: Literal[FORMATS] = Query("objects", alias="format")
+):
     """
     Run YOLO on uploaded image.
     Returns boxes + metrics (FPS, avg conf, false pos rate).
@@ -62,133 +555,374 @@ async def run_inference(request: Request, session_id: str, image_id: str = None)
     - Fixed IoU threshold for NMS (0.45)
     - Model warmup on first load to prevent cold-start performance issues
     
+    Concurrent requests are micro-batched into a single forward pass,
+    which runs on the inference executor (never on the event loop).
+    
+    Overload protection: a request that can't finish within its deadline
+    (YOLO_INFERENCE_TIMEOUT_SECONDS, or a shorter X-Deadline-Ms header) is
+    rejected with 503 + Retry-After before it queues. Queued work is
+    dropped when it times out or the client disconnects.
+    
+    Images above TILING_MEGAPIXEL_THRESHOLD are tiled automatically
+    (see app/utils/tiling.py); the response then carries a "tiling"
+    section with per-tile and per-batch timings.
+    
+    ?model= picks one of MODELS (default DEFAULT_MODEL); it is recorded
+    on the stored image and on every box. An image already stored with
+    another model is rejected with 409.
+    
+    Response format (?format=): "objects" (default, one JSON object per
+    box), "columns" (parallel arrays), "msgpack" or "float32" (raw
+    buffer) - see app/utils/payloads.py.
+    
+    Concurrent calls for the same image and model are coalesced: one
+    run, one stored entry, same result for every caller.
+    
+    With speculative inference (SPECULATIVE_INFERENCE or ?speculate=true
+    on upload) the boxes may already be computed, or in progress, when
+    this is called; the response then says "speculative": true.
+    
+    metrics carries a per-stage latency breakdown (stages_ms: read,
+    decode, preprocess, queue, forward, nms, parse, write); rolling
+    per-stage histograms are at /api/inference/stages.
+    
     Security: Rate limited + timeout protection.
     """
     
+    try:
+        model = registry.resolve(model)
+    except UnknownModel as e:
+        raise HTTPException(400, str(e))
+    
     # Find the specific image file
     if image_id:
         # Use the specific image_id provided
-        files = list(UPLOAD_DIR.glob(f"{image_id}.*"))
-        if not files:
+        record = image_index.get(image_id)
+        if record is None:
             raise HTTPException(404, f"Image {image_id} not found")
-        filepath = files[0]
     else:
-        # Fallback: Find all files for this session and get most recent
-        files = list(UPLOAD_DIR.glob(f"{session_id}_*.*"))
-        if not files:
+        # Fallback: most recent upload of this session
+        record = image_index.latest(session_id)
+        if record is None:
             raise HTTPException(404, "Session not found")
-        filepath = max(files, key=lambda f: f.stat().st_mtime)
     
     # inference with timeout protection
-    start = time.perf_counter()
+    timeout = YOLO_INFERENCE_TIMEOUT_SECONDS
+    client_deadline = request.headers.get("X-Deadline-Ms")
+    if client_deadline and client_deadline.isdigit():
+        timeout = min(timeout, int(client_deadline) / 1000)
+    
     try:
-        yolo = get_model()
-        results = yolo.predict(
-            filepath, 
-            conf=YOLO_CONFIDENCE_THRESHOLD,
-            iou=0.45,  # Standard NMS IoU threshold
-            imgsz=640,  # Fixed image size for consistency
-            max_det=300,  # Maximum detections per image
-            agnostic_nms=False,  # Class-specific NMS
-            verbose=False
+        meta = await asyncio.wait_for(
+            until_disconnect(request, infer_image(session_id, record, model, deadline=time.perf_counter() + timeout)),
+            timeout=timeout
         )
-        
-        elapsed = time.perf_counter() - start
-        
-        # Timeout check
-        if elapsed > YOLO_INFERENCE_TIMEOUT_SECONDS:
-            raise HTTPException(408, f"Inference timeout ({YOLO_INFERENCE_TIMEOUT_SECONDS}s limit)")
-            
+    except Overloaded as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+    except InferenceQueueFull as e:
+        retry_after = max(1, round(admission.estimate_seconds()))
+        raise HTTPException(503, str(e), headers={"Retry-After": str(retry_after)})
+    except (asyncio.TimeoutError, DeadlineExceeded):
+        raise HTTPException(408, f"Inference timeout ({timeout:g}s limit)")
+    except ClientDisconnected:
+        raise HTTPException(499, "Client disconnected")
+    except ModelMismatch as e:
+        raise HTTPException(409, str(e))
     except Exception as e:
         raise HTTPException(500, f"Inference failed: {str(e)}")
     
-    elapsed = time.perf_counter() - start
-    
-    # parse boxes
-    boxes = []
-    confidences = []
-    for r in results:
-        for box in r.boxes:
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            conf = float(box.conf[0])
-            cls = int(box.cls[0])
-            label = r.names[cls]
-            
-            boxes.append({
-                "x1": x1, "y1": y1, "x2": x2, "y2": y2,
-                "confidence": conf,
-                "label": label,
-                "class_id": cls
-            })
-            confidences.append(conf)
+    try:
+        return encode_response(response_format, meta, meta.pop("detections"))
+    except UnsupportedFormat as e:
+        raise HTTPException(406, str(e))
+
+
+def store_result(
+    session_id: str,
+    image_id: str,
+    detections: Detections,
+    cached: bool,
+    elapsed: float,
+    model: str,
+    report: dict,
+    timer: StageTimer
+) -> dict:
+    """
+    Persist one image's detections and build the /api/infer response body
+    (before format encoding - the Detections sit under "detections"). The
+    job API goes through here too, so its results are the same as the
+    synchronous endpoint's.
+    """
+    image_data, result = build_image_entry(image_id, detections, elapsed, model)
+    t = time.perf_counter_ns()
+    if not save_image_entries(session_id, [image_data]):
+        check_stored_model(session_id, image_id, model)  # lost a race with a run of another model
+    timer.since("write", t)
     
+    breakdown = timer.breakdown()
+    stage_stats.record(breakdown)
+    result["metrics"] = {**result["metrics"], **breakdown}
+    return {"session_id": session_id, **result, "cached": cached, **report}
+
+
+# GroundTruthBox defaults for a fresh detection: not verified yet, assumed correct until marked FP
+UNREVIEWED_BOX = {
+    name: field.default
+    for name, field in GroundTruthBox.model_fields.items()
+    if name not in {"x1", "y1", "x2", "y2", "confidence", "label", "class_id", "box_id", "model"}
+}
+
+
+def build_image_entry(
+    image_id: str,
+    detections: Detections,
+    elapsed: float,
+    model: str = DEFAULT_MODEL
+) -> tuple[dict, dict]:
+    """
+    Turn one image's detections into (validation entry, API response).
+    Box ids are {image_id}_box_{idx}; the response keeps the Detections
+    array for the encoders (app/utils/payloads.py).
+    """
     # calc metrics
-    metrics = calc_metrics(elapsed, confidences)
-    
-    # Save boxes for validation (convert to GroundTruthBox format)
-    gt_boxes = []
-    for idx, box in enumerate(boxes):
-        gt_box = GroundTruthBox(
-            x1=box['x1'],
-            y1=box['y1'],
-            x2=box['x2'],
-            y2=box['y2'],
-            confidence=box['confidence'],
-            label=box['label'],
-            class_id=box['class_id'],
-            is_verified=False,  # Not verified yet
-            is_correct=True      # Default assumption (until user marks as FP)
-        )
-        gt_boxes.append(gt_box)
-    
-    # Save validation data - append to session's image list
-    validation_file = VALIDATION_DIR / f"{session_id}.json"
-    
-    # Use the image_id from the file if not provided
-    if not image_id:
-        image_id = filepath.stem  # Get filename without extension
-    
-    # Assign unique box_ids
-    for idx, gt_box in enumerate(gt_boxes):
-        gt_box.box_id = f"{image_id}_box_{idx}"
+    metrics = calc_metrics(elapsed, detections.array[:, 4].tolist())
     
-    # Load existing session data or create new
-    if validation_file.exists():
-        with open(validation_file, 'r') as f:
-            session_data = json.load(f)
-        print(f"[INFERENCE] Loading existing session {session_id}: {len(session_data.get('images', []))} images already stored")
-    else:
-        session_data = {
-            "session_id": session_id,
-            "images": []
-        }
-        print(f"[INFERENCE] Creating new session {session_id}")
+    # The stored boxes add the GroundTruthBox review fields; model output
+    # is already well-formed, so the dicts are built directly instead of
+    # validating every box.
+    stored_boxes = [{**box, **UNREVIEWED_BOX} for box in detections.boxes(f"{image_id}_box_")]
     
-    # Add this image's data
     image_data = {
         "image_id": image_id,
         "timestamp": datetime.utcnow().isoformat(),
-        "boxes": [b.dict() for b in gt_boxes],
+        "model": model,
+        "boxes": stored_boxes,
         "yolo_metrics": metrics
     }
-    session_data["images"].append(image_data)
     
-    print(f"[INFERENCE] Appending new image {image_id}. Total images now: {len(session_data['images'])}")
+    result = {
+        "image_id": image_id,
+        "model": model,
+        "detections": detections,
+        "count": len(detections),
+        "metrics": metrics
+    }
+    return image_data, result
+
+
+def save_image_entries(session_id: str, entries: list[dict]) -> int:
+    """
+    Add inferred images to the session's validation data; returns how
+    many were new. Images already stored are skipped, so re-running
+    inference never duplicates an image or wipes its validations.
+    """
+    added = validation_store.add_images(session_id, entries)
+    if added:
+        session_writer.touch(session_id)  # new ETag for /api/validations
+        print(f"[INFERENCE] Session {session_id}: stored {added} new image(s)")
+    else:
+        print(f"[INFERENCE] Nothing new to store")
+    return added
+
+
+def check_stored_model(session_id: str, image_id: str, model: str):
+    """
+    Raise ModelMismatch if the image is already stored with another
+    model's boxes: those stay (with their validations), so a run of a
+    different model would return boxes that are never stored, under box
+    ids that point at the stored ones. Images stored before models were
+    recorded count as DEFAULT_MODEL.
+    """
+    try:
+        stored = validation_store.image_model(session_id, image_id) or DEFAULT_MODEL
+    except (SessionNotFound, ImageNotFound):
+        return
+    if stored != model:
+        raise ModelMismatch(f"Image {image_id} is already stored with model {stored}")
+
+
+class BatchInferenceRequest(BaseModel):
+    image_ids: Optional[list[str]] = Field(None, max_length=MAX_IMAGES_PER_SESSION)  # None = every un-inferred image
+    stream: Literal["ndjson", "websocket"] = "ndjson"
+    model: Optional[str] = None  # one of MODELS, default DEFAULT_MODEL
+
+
+def find_session_images(session_id: str, image_ids: Optional[list[str]]) -> list[tuple[str, Path]]:
+    """(image_id, path) pairs to run, oldest upload first."""
+    if image_ids is None:
+        done = validation_store.image_ids(session_id)
+        return [(r.image_id, r.path) for r in image_index.session_images(session_id) if r.image_id not in done]
     
-    with open(validation_file, 'w') as f:
-        json.dump(session_data, f, default=str)
+    found = []
+    for image_id in dict.fromkeys(image_ids):  # dedupe, keep order
+        if not image_id.startswith(f"{session_id}_"):
+            raise HTTPException(400, f"Image {image_id} does not belong to session {session_id}")
+        record = image_index.get(image_id)
+        if record is None:
+            raise HTTPException(404, f"Image {image_id} not found")
+        found.append((image_id, record.path))
+    return found
+
+
+# keep references so running batch tasks aren't garbage collected
+_batch_tasks = set()
+
+
+async def _run_batch(session_id: str, images: list[tuple[str, Path]], model: str, events: asyncio.Queue):
+    """
+    Run every image through the batcher, emit one event per image as it finishes,
+    then persist all results in one write. Runs as its own task so a dropped
+    client connection doesn't lose finished work.
+    """
+    start = time.perf_counter()
     
-    # Return boxes with box_ids for frontend
-    boxes_with_ids = []
-    for idx, box in enumerate(boxes):
-        box_with_id = box.copy()
-        box_with_id['box_id'] = f"{image_id}_box_{idx}"
-        boxes_with_ids.append(box_with_id)
+    async def run_one(image_id, filepath):
+        t0 = time.perf_counter()
+        report = {}
+        timer = StageTimer()
+        try:
+            check_stored_model(session_id, image_id, model)
+            detections, cached = await detect(filepath, model, report=report, timer=timer, session=session_id, priority="batch")
+        except Exception as e:
+            return image_id, None, str(e)
+        image_data, result = build_image_entry(image_id, detections, time.perf_counter() - t0, model)
+        breakdown = timer.breakdown()  # no write yet - the batch is stored in one write at the end
+        stage_stats.record(breakdown)
+        result["metrics"] = {**result["metrics"], **breakdown}
+        return image_id, (image_data, {**result, "cached": cached, **report}), None
     
-    return {
+    entries = []
+    failed = 0
+    tasks = [asyncio.ensure_future(run_one(image_id, path)) for image_id, path in images]
+    for next_done in asyncio.as_completed(tasks):
+        image_id, built, error = await next_done
+        if error is not None:
+            failed += 1
+            event = {"type": "error", "image_id": image_id, "detail": f"Inference failed: {error}"}
+        else:
+            image_data, result = built
+            entries.append(image_data)
+            event = {"type": "result", "session_id": session_id, **objects(result, result.pop("detections"))}
+        await events.put(event)
+        await ws.broadcast_event(session_id, event)
+    
+    if entries:
+        save_image_entries(session_id, entries)
+    
+    done = {
+        "type": "done",
         "session_id": session_id,
-        "image_id": image_id,
-        "boxes": boxes_with_ids,
-        "count": len(boxes),
-        "metrics": metrics
+        "completed": len(entries),
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
     }
+    await events.put(done)
+    await ws.broadcast_event(session_id, done)
+
+
+@router.post("/infer-batch/{session_id}")
+@limiter.limit(INFERENCE_RATE_LIMIT)
+async def run_batch_inference(
+    request: Request,
+    session_id: str,
+    batch_req: Optional[BatchInferenceRequest] = None
+):
+    """
+    Run inference on many images of a session in one call.
+    
+    Defaults to every image of the session that has no detections yet;
+    pass image_ids to pick specific ones. Images go through the
+    micro-batcher together and results are streamed back as each
+    finishes, either as NDJSON (one JSON object per line) or over the
+    session websocket (/ws/metrics/{session_id}). All detections are
+    written to the validation store in a single write at the end.
+    
+    Security: Rate limited (one token per batch) + session ID sanitized.
+    """
+    try:
+        session_id = validate_session_id(session_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    batch_req = batch_req or BatchInferenceRequest()
+    try:
+        model = registry.resolve(batch_req.model)
+    except UnknownModel as e:
+        raise HTTPException(400, str(e))
+    images = find_session_images(session_id, batch_req.image_ids)
+    
+    events = asyncio.Queue()
+    task = asyncio.create_task(_run_batch(session_id, images, model, events))
+    _batch_tasks.add(task)
+    task.add_done_callback(_batch_tasks.discard)
+    
+    if batch_req.stream == "websocket":
+        return JSONResponse(
+            status_code=202,
+            content={
+                "session_id": session_id,
+                "image_ids": [image_id for image_id, _ in images],
+                "model": model,
+                "stream": "websocket"
+            }
+        )
+    
+    async def ndjson():
+        while True:
+            event = await events.get()
+            yield json.dumps(event, default=str) + "\n"
+            if event["type"] == "done":
+                break
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/inference/stats")
+async def inference_stats():
+    """
+    Batch-size and queue-wait statistics for the inference scheduler.
+    Use these to tune INFERENCE_MAX_BATCH_SIZE / INFERENCE_MAX_WAIT_MS.
+    "fairness" has queue depth and wait times per session and per
+    priority class (INFERENCE_PRIORITY_WEIGHTS).
+    """
+    from app.routers.stream import streams_snapshot  # stream imports this module
+    return {
+        "batching": {
+            "max_batch_size": batcher.max_batch_size,
+            "max_wait_ms": batcher.max_wait * 1000,
+            "queue_depth": batcher.queue_depth(),
+            **batcher.stats.snapshot()
+        },
+        "fairness": batcher.fairness(),
+        "executor": inference_executor.stats(),
+        "admission": admission.stats(),
+        "replicas": replica_pool.stats() if replica_pool is not None else None,
+        "models": registry.stats(),
+        "cache": inference_cache.stats() if INFERENCE_CACHE_ENABLED else None,
+        "preprocess_cache": preprocess_cache.stats(),
+        "speculative": speculator.stats(),
+        "single_flight": single_flight.stats(),
+        "image_index": image_index.stats(),
+        "streams": streams_snapshot(),
+        "jobs": job_store.stats(),
+        "validation_writes": session_writer.stats()
+    }
+
+
+@router.get("/inference/stages")
+async def inference_stages():
+    """
+    Where request time goes: rolling per-stage latency (avg, p50/p95/p99,
+    max, share of total and a bucketed histogram) over the last
+    INFERENCE_STATS_WINDOW /api/infer requests.
+    """
+    return stage_stats.snapshot()
+
+
+@router.get("/models")
+async def list_models():
+    """
+    Models that can be passed as ?model=, with load state, estimated
+    memory, load times and per-model forward-pass latency.
+    """
+    return registry.stats()
@@ -0,0 +1,216 @@
+"""
+Asynchronous inference jobs.
+
+POST /api/jobs/{session_id}?image_id=&model=   -> 202 {job_id, status}
+GET  /api/jobs/{job_id}                        -> status (+ result when done)
+GET  /api/jobs/{job_id}/result?format=         -> exactly what /api/infer returns
+GET  /api/sessions/{session_id}/jobs           -> the session's recent jobs
+
+Submitting returns at once; the job runs in the background and the
+client polls, or listens on the session websocket (/ws/metrics/{session_id})
+for "job" events (running, done with the result, failed). Jobs live in
+SQLite (app/utils/job_store.py), so queued work survives a restart.
+
+Jobs run through the same code as /api/infer (speculative attach,
+single flight, cache, fair queue, persistence), so the result is the
+same. They are not bound to an HTTP connection: when the server is
+overloaded a job waits for Retry-After and tries again instead of
+failing.
+"""
+import asyncio
+import time
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.routers import inference, ws
+from app.utils.admission import Overloaded
+from app.utils.batcher import DeadlineExceeded
+from app.utils.detections import Detections
+from app.utils.executor import InferenceQueueFull
+from app.utils.image_index import image_index
+from app.utils.job_store import job_store
+from app.utils.model_registry import UnknownModel
+from app.utils.payloads import FORMATS, UnsupportedFormat, encode_response, objects
+from app.middleware.security import validate_session_id
+from app.config.inference import JOB_MAX_ATTEMPTS, JOB_PRIORITY, JOB_TIMEOUT_SECONDS, JOB_WORKERS
+from app.config.security import INFERENCE_RATE_LIMIT
+
+router = APIRouter()
+limiter = Limiter(key_func=get_remote_address)
+
+
+def public(job: dict) -> dict:
+    """Job row as the API shows it."""
+    return {
+        "job_id": job["job_id"],
+        "session_id": job["session_id"],
+        "image_id": job["image_id"],
+        "model": job["model"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+        "result": job["result"]
+    }
+
+
+async def run_job(job: dict) -> dict:
+    """Detect + persist one job's image, retrying while the server is overloaded."""
+    record = image_index.get(job["image_id"])
+    if record is None:
+        raise FileNotFoundError(f"Image {job['image_id']} not found")
+    deadline = time.perf_counter() + JOB_TIMEOUT_SECONDS
+    while True:
+        try:
+            meta = await asyncio.wait_for(
+                inference.infer_image(job["session_id"], record, job["model"], deadline, JOB_PRIORITY),
+                timeout=max(0.0, deadline - time.perf_counter())
+            )
+            return objects(meta, meta.pop("detections"))  # stored as JSON with the job
+        except Overloaded as e:
+            retry_after = e.retry_after
+        except InferenceQueueFull:
+            retry_after = max(1, round(inference.admission.estimate_seconds()))
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            raise TimeoutError(f"Inference timeout ({JOB_TIMEOUT_SECONDS:g}s limit)")
+        if time.perf_counter() + retry_after > deadline:
+            raise TimeoutError(f"Server overloaded for the whole {JOB_TIMEOUT_SECONDS:g}s job limit")
+        await asyncio.sleep(retry_after)
+
+
+class JobRunner:
+    """JOB_WORKERS tasks taking job_ids off an in-memory queue (the store is the durable copy)."""
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = max(1, workers)
+        self._queue = None
+        self._tasks = []
+
+    def _ensure_workers(self):
+        # Workers live on whichever event loop is serving requests
+        if self._queue is None or all(task.done() for task in self._tasks):
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    def enqueue(self, job_id: str):
+        self._ensure_workers()
+        self._queue.put_nowait(job_id)
+
+    def recover(self) -> int:
+        """Re-queue jobs left unfinished by the last run (call at startup)."""
+        job_ids = job_store.recover(JOB_MAX_ATTEMPTS)
+        for job_id in job_ids:
+            self.enqueue(job_id)
+        return len(job_ids)
+
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:  # never let one job take the worker down
+                print(f"[JOBS] Job {job_id} crashed the runner: {e}")
+
+    async def _run(self, job_id: str):
+        job = job_store.get(job_id)
+        if job is None or job["status"] != "queued":
+            return
+        job_store.mark_running(job_id)
+        await ws.broadcast_event(job["session_id"], {"type": "job", "job_id": job_id, "status": "running"})
+        try:
+            result = await run_job(job)
+        except Exception as e:
+            job_store.fail(job_id, f"Inference failed: {e}")
+            event = {"type": "job", "job_id": job_id, "status": "failed", "detail": f"Inference failed: {e}"}
+        else:
+            job_store.finish(job_id, result)
+            event = {"type": "job", "job_id": job_id, "status": "done", "result": result}
+        await ws.broadcast_event(job["session_id"], event)
+
+
+# Global instance
+job_runner = JobRunner()
+
+
+@router.post("/jobs/{session_id}")
+@limiter.limit(INFERENCE_RATE_LIMIT)
+async def submit_job(request: Request, session_id: str, image_id: Optional[str] = None, model: Optional[str] = None):
+    """
+    Queue inference for one image (default: the session's latest upload)
+    and return a job_id right away (202). Poll /api/jobs/{job_id} or
+    listen on the session websocket for the result.
+    """
+    try:
+        session_id = validate_session_id(session_id)
+        model = inference.registry.resolve(model)
+    except (ValueError, UnknownModel) as e:
+        raise HTTPException(400, str(e))
+
+    if image_id:
+        if not image_id.startswith(f"{session_id}_"):
+            raise HTTPException(400, f"Image {image_id} does not belong to session {session_id}")
+        record = image_index.get(image_id)
+        if record is None:
+            raise HTTPException(404, f"Image {image_id} not found")
+    else:
+        record = image_index.latest(session_id)
+        if record is None:
+            raise HTTPException(404, "Session not found")
+
+    job = job_store.create(session_id, record.image_id, model)
+    job_runner.enqueue(job["job_id"])
+    return JSONResponse(status_code=202, content=public(job))
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a job; includes the result once it is done."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return public(job)
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    response_format: Literal[FORMATS] = Query("objects", alias="format")
+):
+    """
+    The finished job's result, encoded like /api/infer (?format= as
+    there). 409 while the job is still queued or running, 500 if it failed.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(500, job["error"])
+    if job["status"] != "done":
+        raise HTTPException(409, f"Job is {job['status']}")
+    meta = dict(job["result"])
+    try:
+        return encode_response(response_format, meta, Detections.from_boxes(meta.pop("boxes")))
+    except UnsupportedFormat as e:
+        raise HTTPException(406, str(e))
+
+
+@router.get("/sessions/{session_id}/jobs")
+async def list_session_jobs(session_id: str):
+    """The session's most recent jobs (without results), newest first."""
+    try:
+        session_id = validate_session_id(session_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {
+        "session_id": session_id,
+        "jobs": [{**public(job), "result": None} for job in job_store.session_jobs(session_id)]
+    }
@@ -0,0 +1,203 @@
+"""
+Real-time detection on a stream of frames over WebSocket.
+
+WS /ws/detect/{session_id}?mode=latest|all&model=yolov8n
+
+The client sends each frame (webcam capture, decoded video frame) as one
+binary message of JPEG/PNG/WebP bytes and gets back a "detections"
+message per processed frame. Frames are numbered in arrival order.
+
+- latest: at most one frame waits while the previous one is being
+  detected; a newer frame replaces it (counted as dropped), so the
+  server always works on the newest frame and latency stays flat.
+- all: every frame is detected, in order. Up to
+  STREAM_MAX_BUFFERED_FRAMES wait; beyond that the server stops reading
+  the socket, which pushes back on the client.
+
+Frames of all open streams go through the same micro-batcher as
+/api/infer, so concurrent streams share forward passes. Every result
+carries the stream's FPS, latency and drop counters.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.routers import inference
+from app.utils.batcher import percentile
+from app.utils.executor import InferenceQueueFull
+from app.utils.images import decode_image
+from app.utils.model_registry import UnknownModel
+from app.utils.preprocess_cache import prepare
+from app.middleware.security import validate_session_id
+from app.config.inference import (
+    STREAM_DEFAULT_MODE,
+    STREAM_MAX_BUFFERED_FRAMES,
+    STREAM_STATS_WINDOW_SECONDS
+)
+from app.config.security import MAX_UPLOAD_SIZE_MB
+
+router = APIRouter()
+
+MODES = ("latest", "all")
+MAX_FRAME_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+# open streams, for /api/inference/stats
+active_streams: dict[int, "StreamStats"] = {}
+
+
+class StreamStats:
+    """Per-stream counters; FPS and latency over the last STREAM_STATS_WINDOW_SECONDS."""
+
+    def __init__(self, session_id: str, mode: str, model: str, window: float = STREAM_STATS_WINDOW_SECONDS):
+        self.session_id = session_id
+        self.mode = mode
+        self.model = model
+        self.window = window
+        self.started = time.perf_counter()
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self._done = deque()  # (finished_at, latency_ms)
+
+    def record(self, latency_ms: float):
+        now = time.perf_counter()
+        self.processed += 1
+        self._done.append((now, latency_ms))
+        while self._done and now - self._done[0][0] > self.window:
+            self._done.popleft()
+
+    def snapshot(self) -> dict:
+        now = time.perf_counter()
+        recent = [(t, ms) for t, ms in self._done if now - t <= self.window]
+        span = min(self.window, now - self.started)
+        latencies = [ms for _, ms in recent]
+        return {
+            "session_id": self.session_id,
+            "mode": self.mode,
+            "model": self.model,
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "fps": round(len(recent) / span, 2) if span > 0 else 0.0,
+            "latency_ms": {
+                "avg": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+                "p95": round(percentile(latencies, 95), 1)
+            }
+        }
+
+
+class WorkerExited(Exception):
+    """The stream's detection task ended (its client is gone, or it crashed)."""
+
+
+def streams_snapshot() -> list:
+    return [stats.snapshot() for stats in active_streams.values()]
+
+
+def prepare_frame(data: bytes):
+    """Decode + letterbox one frame (runs off the event loop)."""
+    return prepare(decode_image(data))
+
+
+@router.websocket("/detect/{session_id}")
+async def detect_stream(
+    websocket: WebSocket,
+    session_id: str,
+    mode: str = STREAM_DEFAULT_MODE,
+    model: Optional[str] = None
+):
+    """
+    Stream frames in, detections out. See the module docstring for the
+    protocol. Frames are not stored and never touch the validation data.
+    """
+    try:
+        session_id = validate_session_id(session_id)
+        model = inference.registry.resolve(model)
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode} (choose from {', '.join(MODES)})")
+    except (ValueError, UnknownModel) as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+    stats = StreamStats(session_id, mode, model)
+    active_streams[id(websocket)] = stats
+    # latest: one waiting slot, overwritten by newer frames; all: bounded buffer
+    pending = asyncio.Queue(maxsize=1 if mode == "latest" else STREAM_MAX_BUFFERED_FRAMES)
+    loop = asyncio.get_running_loop()
+
+    async def detect_frames():
+        while True:
+            frame, received_at, data = await pending.get()
+            try:
+                prepared = await loop.run_in_executor(None, prepare_frame, data)
+                detections = await inference.batcher.submit((model, prepared), session=session_id)
+            except InferenceQueueFull:
+                stats.dropped += 1
+                await websocket.send_json({"type": "dropped", "frame": frame, "reason": "overloaded"})
+                continue
+            except Exception as e:
+                stats.errors += 1
+                await websocket.send_json({"type": "error", "frame": frame, "detail": f"Detection failed: {e}"})
+                continue
+            latency_ms = (time.perf_counter() - received_at) * 1000
+            stats.record(latency_ms)
+            await websocket.send_json({
+                "type": "detections",
+                "frame": frame,
+                "boxes": detections.boxes(),
+                "count": len(detections),
+                "latency_ms": round(latency_ms, 1),
+                "stream": stats.snapshot()
+            })
+
+    worker = asyncio.create_task(detect_frames())
+
+    async def unless_worker_exits(coro):
+        # Nothing would ever drain the buffer (or answer frames) once the worker is gone
+        task = asyncio.ensure_future(coro)
+        await asyncio.wait({task, worker}, return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            task.cancel()
+            raise WorkerExited()
+        return task.result()
+
+    try:
+        while True:
+            message = await unless_worker_exits(websocket.receive())
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None:
+                continue  # text messages are ignored (clients may send keepalives)
+            stats.received += 1
+            frame = stats.received
+            if len(data) > MAX_FRAME_BYTES:
+                stats.errors += 1
+                await websocket.send_json({"type": "error", "frame": frame, "detail": "Frame too large"})
+                continue
+            item = (frame, time.perf_counter(), data)
+            if mode == "latest":
+                if pending.full():
+                    pending.get_nowait()
+                    stats.dropped += 1
+                pending.put_nowait(item)
+            else:
+                await unless_worker_exits(pending.put(item))  # blocks reading while the buffer is full
+    except WebSocketDisconnect:
+        pass
+    except WorkerExited:
+        if not worker.cancelled() and worker.exception() is not None:
+            print(f"[STREAM] Detection worker for session {session_id} stopped: {worker.exception()}")
+        try:
+            await websocket.close(code=1011, reason="Detection stopped")
+        except Exception:
+            pass  # the client is already gone
+    finally:
+        worker.cancel()
+        active_streams.pop(id(websocket), None)
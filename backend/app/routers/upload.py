@@ -1,12 +1,20 @@
-import os
+import io
 import time
+import asyncio
 import uuid
 import magic
-from pathlib import Path
+from typing import Optional
 from fastapi import APIRouter, UploadFile, HTTPException, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from app.utils.session_manager import session_manager
+from app.utils.images import decode_image, image_size
+from app.utils.image_index import image_index, record_for
+from app.middleware.security import validate_session_id
+from app.utils.preprocess_cache import preprocess_cache
+from app.routers import inference
+from app.utils.model_registry import UnknownModel
+from app.config.inference import PREPROCESS_AT_UPLOAD, SPECULATIVE_INFERENCE
 from app.config.security import (
     MAX_UPLOAD_SIZE_MB, 
     UPLOAD_RATE_LIMIT, 
@@ -18,21 +26,39 @@ limiter = Limiter(key_func=get_remote_address)
 
 MAX_SIZE = MAX_UPLOAD_SIZE_MB * 1024 * 1024  # Convert MB to bytes
 ALLOWED_TYPES = set(ALLOWED_MIME_TYPES)
+MIME_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
 
-# cross-platform temp dir
-import tempfile
-UPLOAD_DIR = Path(tempfile.gettempdir()) / "visionpulse_uploads"
 
-UPLOAD_DIR.mkdir(exist_ok=True, parents=True)
+def preprocess_upload(image_id: str, contents: bytes):
+    """Decode + letterbox the upload for inference while the bytes are still in memory."""
+    try:
+        preprocess_cache.fill(image_id, decode_image(contents))
+    except Exception as e:
+        print(f"[UPLOAD] Preprocessing {image_id} failed (inference will read from disk): {e}")
 
 @router.post("/upload")
 @limiter.limit(UPLOAD_RATE_LIMIT)
-async def upload_image(request: Request, file: UploadFile, session_id: str = None):
+async def upload_image(
+    request: Request,
+    file: UploadFile,
+    session_id: str = None,
+    speculate: Optional[bool] = None,
+    model: Optional[str] = None
+):
     """
     Upload an image. Returns session_id for tracking.
     Validates: size, MIME type, session limits.
+    
+    With speculate=true (default SPECULATIVE_INFERENCE) detection with
+    ?model= starts in the background right away, when the model is idle;
+    /api/infer for this image then picks that up.
+    
     Security: Rate limited + session upload caps.
     """
+    try:
+        model = inference.registry.resolve(model)
+    except UnknownModel as e:
+        raise HTTPException(400, str(e))
     
     # size check
     contents = await file.read()
@@ -44,24 +70,45 @@ async def upload_image(request: Request, file: UploadFile, session_id: str = Non
     if mime not in ALLOWED_TYPES:
         raise HTTPException(400, f"Invalid file type: {mime}")
     
-    # Generate or reuse session ID
+    # Generate or reuse session ID (it names the session's upload directory)
     if not session_id:
         session_id = str(uuid.uuid4())
+    try:
+        session_id = validate_session_id(session_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     
     # Check session limits
     allowed, reason = session_manager.can_upload(session_id)
     if not allowed:
         raise HTTPException(429, reason)
     
-    # Save with unique filename: session_id + timestamp
-    ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
+    # Save with unique filename: session_id + timestamp, in the session's directory
+    ext = MIME_EXTENSIONS.get(mime, "jpg")
     timestamp = int(time.time() * 1000)
     image_id = f"{session_id}_{timestamp}"
-    filepath = UPLOAD_DIR / f"{image_id}.{ext}"
+    session_dir = image_index.session_dir(session_id)
+    session_dir.mkdir(exist_ok=True, parents=True)
+    filepath = session_dir / f"{image_id}.{ext}"
     
     with open(filepath, "wb") as f:
         f.write(contents)
     
+    try:
+        width, height = image_size(io.BytesIO(contents))
+    except Exception:
+        width = height = None
+    image_index.add(record_for(filepath, mime=mime, width=width, height=height))
+    
+    # Warm the preprocess cache without holding up the response
+    preprocessed = None
+    if PREPROCESS_AT_UPLOAD:
+        preprocessed = asyncio.get_running_loop().run_in_executor(None, preprocess_upload, image_id, contents)
+    
+    speculating = False
+    if SPECULATIVE_INFERENCE if speculate is None else speculate:
+        speculating = inference.speculate(session_id, image_id, filepath, model, after=preprocessed)
+    
     # Increment session counter
     session_manager.increment(session_id)
     
@@ -71,5 +118,8 @@ async def upload_image(request: Request, file: UploadFile, session_id: str = Non
         "filename": file.filename,
         "size": len(contents),
         "mime": mime,
-        "session_upload_count": session_manager.get_count(session_id)
+        "width": width,
+        "height": height,
+        "session_upload_count": session_manager.get_count(session_id),
+        "speculative": speculating
     }
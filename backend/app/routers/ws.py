@@ -36,13 +36,20 @@ async def broadcast_metrics(session_id: str, metrics: dict):
     Send metrics to connected client.
     Called from inference endpoint.
     """
+    await broadcast_event(session_id, {
+        "type": "metrics",
+        "data": metrics
+    })
+
+async def broadcast_event(session_id: str, event: dict):
+    """
+    Send any JSON event (e.g. per-image batch results) to the session's client.
+    No-op if nobody is connected.
+    """
     if session_id in active_connections:
         ws = active_connections[session_id]
         try:
-            await ws.send_json({
-                "type": "metrics",
-                "data": metrics
-            })
+            await ws.send_json(event)
         except:
             # connection dead, clean up
-            del active_connections[session_id]
+            active_connections.pop(session_id, None)
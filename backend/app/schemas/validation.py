@@ -54,6 +54,7 @@ class GroundTruthBox(BaseModel):
     label: str = Field(max_length=50)
     class_id: int
     box_id: Optional[str] = Field(None, max_length=200, description="Unique identifier for this box")
+    model: Optional[str] = Field(None, max_length=50, description="Model that produced this box (None for manual boxes)")
     
     # Ground truth fields
     is_verified: bool = False  # Has user reviewed this box?
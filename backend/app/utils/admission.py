@@ -0,0 +1,80 @@
+"""
+Deadline-aware admission control for inference.
+
+Before a request joins the queue we estimate how long it would wait,
+using the batcher's recent forward-pass times. If it cannot finish
+before its deadline it is turned away immediately (503 + Retry-After)
+instead of joining a backlog it would time out in anyway. Under
+overload that keeps latency flat: the queue never grows past what can
+actually be served in time.
+"""
+import math
+import time
+from typing import Optional
+
+from app.config.inference import (
+    ADMISSION_COLD_BATCH_MS,
+    INFERENCE_MAX_QUEUE
+)
+from app.utils.batcher import MicroBatcher
+
+
+class Overloaded(Exception):
+    """Request rejected up front; retry_after is a hint in whole seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, batcher: MicroBatcher, max_queue: int = INFERENCE_MAX_QUEUE):
+        self.batcher = batcher
+        self.max_queue = max_queue
+        self.counters = {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_deadline": 0
+        }
+
+    def estimate_seconds(self) -> float:
+        """
+        Expected time until a request submitted now has its result:
+        batches queued ahead of it, spread over the workers, plus its own
+        batch, plus half a batch if every worker is busy right now.
+        """
+        batch_s = (self.batcher.stats.ewma_batch_run_ms or ADMISSION_COLD_BATCH_MS) / 1000
+        workers = self.batcher.concurrency()
+        batches_ahead = math.ceil((self.batcher.queue_depth() + 1) / self.batcher.max_batch_size)
+        waves = math.ceil(batches_ahead / workers)
+        busy_penalty = 0.5 * batch_s if self.batcher.running_batches() >= workers else 0.0
+        return self.batcher.max_wait + busy_penalty + waves * batch_s
+
+    def admit(self, deadline: Optional[float] = None):
+        """
+        Raise Overloaded if the queue is full or the deadline (a
+        time.perf_counter() value) can't be met; otherwise count it in.
+        """
+        estimate = self.estimate_seconds()
+        if self.batcher.queue_depth() >= self.max_queue:
+            self.counters["rejected_queue_full"] += 1
+            raise Overloaded(
+                f"Inference queue full ({self.max_queue} requests waiting)",
+                retry_after=max(1, math.ceil(estimate))
+            )
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if estimate > remaining:
+                self.counters["rejected_deadline"] += 1
+                raise Overloaded(
+                    f"Server busy: estimated {estimate:.1f}s exceeds the {max(remaining, 0):.1f}s left",
+                    retry_after=max(1, math.ceil(estimate - max(remaining, 0)))
+                )
+        self.counters["admitted"] += 1
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "max_queue": self.max_queue,
+            "estimated_wait_ms": round(self.estimate_seconds() * 1000, 1)
+        }
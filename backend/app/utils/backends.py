@@ -0,0 +1,96 @@
+"""
+Selectable inference backends.
+
+- torch:    plain PyTorch eager mode (default)
+- onnx:     ONNX Runtime CPU execution provider
+- openvino: OpenVINO IR, usually the fastest option on Intel CPUs
+- onnx_int8: INT8-quantized ONNX (see app/utils/quantization.py)
+
+Non-torch backends export the weights once and cache the artifact next to
+them (yolov8n.onnx, yolov8n_openvino_model/). ultralytics loads every
+format through the same predictor, so pre/post-processing and the box
+dicts we build from its Results stay identical.
+"""
+import threading
+from pathlib import Path
+
+BACKENDS = ("torch", "onnx", "openvino", "onnx_int8")
+
+_export_lock = threading.RLock()  # reentrant: the INT8 build exports FP32 onnx first
+_resolved = {}  # (backend, weights) -> backend actually served, decided once per process
+
+
+def exported_path(weights: str, backend: str) -> Path:
+    """Where the exported artifact for this backend lives."""
+    w = Path(weights)
+    if backend == "onnx":
+        return w.with_suffix(".onnx")
+    if backend == "openvino":
+        return w.with_name(f"{w.stem}_openvino_model")
+    if backend == "onnx_int8":
+        return w.with_name(f"{w.stem}_int8.onnx")
+    return w
+
+
+def export_model(weights: str, backend: str, imgsz: int = 640) -> Path:
+    """
+    Export weights for backend unless a cached export already exists.
+    Blocking (tens of seconds the first time) - call it on the executor.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend} (choose from {', '.join(BACKENDS)})")
+    target = exported_path(weights, backend)
+    if backend == "torch":
+        return target
+
+    if backend == "onnx_int8":
+        export_model(weights, "onnx", imgsz)
+        with _export_lock:
+            if not target.exists():
+                from app.utils.quantization import quantize_int8
+                quantize_int8(weights, imgsz=imgsz)
+        return target
+
+    with _export_lock:
+        if target.exists():
+            return target
+        from ultralytics import YOLO
+        print(f"[BACKEND] Exporting {weights} to {backend} (one-time)...")
+        # dynamic axes so the micro-batcher can send batches of any size
+        exported = YOLO(weights).export(format=backend, imgsz=imgsz, dynamic=True, half=False)
+        print(f"[BACKEND] Export ready: {exported}")
+        return Path(exported)
+
+
+def resolve_backend(backend: str, weights: str) -> str:
+    """
+    Backend that will actually serve requests. onnx_int8 falls back to FP32
+    onnx unless its accuracy guardrail report has passed. Decided (and
+    logged) once per weights - every cache key and model lookup asks.
+    """
+    key = (backend, weights)
+    resolved = _resolved.get(key)
+    if resolved is None:
+        resolved = backend
+        from app.config.inference import INT8_REQUIRE_GUARDRAIL
+        if backend == "onnx_int8" and INT8_REQUIRE_GUARDRAIL:
+            from app.utils.quantization import guardrail_passed, report_path
+            if not guardrail_passed(weights):
+                print(f"[BACKEND] INT8 guardrail not passed ({report_path(weights)}) - serving FP32 onnx")
+                resolved = "onnx"
+        _resolved[key] = resolved
+    return resolved
+
+
+def forget_resolved():
+    """Decide again on next use (a new INT8 model or guardrail report was written)."""
+    _resolved.clear()
+
+
+def load_backend_model(backend: str, weights: str, imgsz: int = 640):
+    """YOLO model object running on the chosen backend."""
+    from ultralytics import YOLO
+    backend = resolve_backend(backend, weights)
+    if backend == "torch":
+        return YOLO(weights)
+    return YOLO(str(export_model(weights, backend, imgsz)), task="detect")
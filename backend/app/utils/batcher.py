@@ -0,0 +1,241 @@
+"""
+Dynamic micro-batching for YOLO inference.
+
+Concurrent requests are gathered into a single batch, bounded by a max
+batch size and a max wait time. One predict() runs over the whole batch
+and every caller gets back its own result. Which waiting items make
+the next batch is decided fairly across sessions, weighted by priority
+class (interactive before batch before speculative).
+
+Batches run on the inference executor so the event loop stays free
+while a forward pass is in progress.
+"""
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Any, Callable, List, Optional
+
+from app.config.inference import (
+    INFERENCE_MAX_BATCH_SIZE,
+    INFERENCE_MAX_WAIT_MS,
+    INFERENCE_MAX_QUEUE,
+    INFERENCE_STATS_WINDOW
+)
+from app.utils.executor import InferenceExecutor, InferenceQueueFull
+from app.utils.fair_queue import FairQueue
+
+
+class DeadlineExceeded(Exception):
+    """Raised for queued work whose deadline passed before it could run."""
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0.0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class BatchStats:
+    """Batch-size and queue-wait statistics for tuning the batcher."""
+
+    def __init__(self, window: int = INFERENCE_STATS_WINDOW):
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = Counter()
+        self.queue_waits_ms = deque(maxlen=window)
+        self.batch_run_ms = deque(maxlen=window)
+        self.ewma_batch_run_ms = None  # smoothed forward-pass time, feeds admission control
+        self.shed = 0  # dropped from the queue: deadline passed
+        self.cancelled = 0  # dropped from the queue: caller gave up (e.g. client disconnected)
+
+    def record_batch(self, size: int, waits_ms: List[float], run_ms: float):
+        self.batches += 1
+        self.items += size
+        self.batch_sizes[size] += 1
+        self.queue_waits_ms.extend(waits_ms)
+        self.batch_run_ms.append(run_ms)
+        if self.ewma_batch_run_ms is None:
+            self.ewma_batch_run_ms = run_ms
+        else:
+            self.ewma_batch_run_ms = 0.8 * self.ewma_batch_run_ms + 0.2 * run_ms
+
+    def snapshot(self) -> dict:
+        waits = list(self.queue_waits_ms)
+        runs = list(self.batch_run_ms)
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            "queue_wait_ms": {
+                "avg": round(sum(waits) / len(waits), 2) if waits else 0.0,
+                "p50": round(percentile(waits, 50), 2),
+                "p95": round(percentile(waits, 95), 2),
+                "max": round(max(waits), 2) if waits else 0.0
+            },
+            "batch_run_ms": {
+                "avg": round(sum(runs) / len(runs), 2) if runs else 0.0,
+                "p95": round(percentile(runs, 95), 2),
+                "ewma": round(self.ewma_batch_run_ms or 0.0, 2)
+            },
+            "shed": self.shed,
+            "cancelled": self.cancelled
+        }
+
+
+class MicroBatcher:
+    """
+    Collects submitted items and runs them through run_batch in groups.
+
+    run_batch receives a list of items and must return a list of results
+    of the same length and order. With an executor, run_batch is called
+    on its worker threads and up to executor.max_workers batches run at
+    once; without one it is called inline on the event loop.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+        executor: Optional[InferenceExecutor] = None,
+        max_pending: int = INFERENCE_MAX_QUEUE
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.executor = executor
+        self.max_pending = max_pending
+        self.stats = BatchStats()
+        self._pending = FairQueue()
+        self._wakeup = None
+        self._slots = None
+        self._worker = None
+
+    async def submit(
+        self,
+        item: Any,
+        deadline: Optional[float] = None,
+        session: Optional[str] = None,
+        priority: str = "interactive"
+    ) -> Any:
+        """
+        Queue an item and wait for its own result.
+        deadline is a time.perf_counter() value; if it passes while the item
+        is still queued, the item is dropped and DeadlineExceeded raised.
+        Cancelling the caller takes the item out of the queue right away, so
+        abandoned requests never count toward queue_depth / max_pending or
+        the admission estimate.
+        Items are picked fairly across sessions, weighted by priority class
+        (see app/utils/fair_queue.py).
+        """
+        if len(self._pending) >= self.max_pending:
+            raise InferenceQueueFull(f"Inference queue full ({self.max_pending} requests waiting)")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        handle = self._pending.push((item, future, time.perf_counter(), deadline), session, priority)
+        self._ensure_worker()
+        self._wakeup.set()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if self._pending.discard(handle):
+                self.stats.cancelled += 1
+            raise
+
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def reprioritize(self, match: Callable[[Any], bool], priority: str) -> int:
+        """Move queued items for which match(item) is true to another priority class."""
+        return self._pending.reprioritize(lambda entry: match(entry[0]), priority)
+
+    def fairness(self) -> dict:
+        """Per-session and per-priority queue depth and wait times."""
+        return self._pending.stats()
+
+    def running_batches(self) -> int:
+        return self.executor.inflight if self.executor else 0
+
+    def concurrency(self) -> int:
+        return self.executor.max_workers if self.executor else 1
+
+    def _ensure_worker(self):
+        # The worker lives on whichever event loop is serving requests
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.executor.max_workers if self.executor else 1)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Wait for a free worker; requests keep piling up meanwhile, so busy periods batch better
+            await self._slots.acquire()
+            if not self._pending:
+                self._slots.release()  # everything queued was cancelled meanwhile
+                continue
+
+            # Hold the batch open until it fills up or the oldest item has waited long enough
+            deadline = self._pending.oldest_enqueued() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                batch.append(self._pending.pop())
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            task.add_done_callback(lambda _: self._slots.release())
+
+    async def _dispatch(self, batch):
+        started = time.perf_counter()
+        live = []
+        for entry in batch:
+            future, deadline = entry[1], entry[3]
+            if future.done():
+                # Caller gave up after the batch was formed - never run it
+                self.stats.cancelled += 1
+            elif deadline is not None and started > deadline:
+                self.stats.shed += 1
+                future.set_exception(DeadlineExceeded("Deadline passed while queued"))
+            else:
+                live.append(entry)
+        batch = live
+        if not batch:
+            return
+
+        waits_ms = [(started - entry[2]) * 1000 for entry in batch]
+        try:
+            results = await self._execute([entry[0] for entry in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for entry in batch:
+                if not entry[1].done():
+                    entry[1].set_exception(e)
+            return
+        finally:
+            self.stats.record_batch(len(batch), waits_ms, (time.perf_counter() - started) * 1000)
+
+        for entry, result in zip(batch, results):
+            if not entry[1].done():
+                entry[1].set_result(result)
+
+    async def _execute(self, items: List[Any]) -> List[Any]:
+        if self.executor is None:
+            return list(self.run_batch(items))
+        return list(await self.executor.run(self.run_batch, items))
@@ -2,40 +2,36 @@
 Background task to cleanup old uploaded files.
 Runs periodically to prevent disk space issues.
 """
-import os
 import time
-from pathlib import Path
-from datetime import datetime, timedelta
 import threading
-import tempfile
 from app.config.security import FILE_TTL_MINUTES, CLEANUP_INTERVAL_MINUTES
-
-UPLOAD_DIR = Path(tempfile.gettempdir()) / "visionpulse_uploads"
+from app.utils.preprocess_cache import preprocess_cache
+from app.utils.image_index import image_index
+from app.utils.job_store import job_store
+from app.utils.validation_store import validation_store
+from app.config.inference import JOB_RETENTION_HOURS
 
 def cleanup_old_files():
-    """Delete uploaded files older than TTL."""
-    if not UPLOAD_DIR.exists():
-        return
+    """Delete uploaded files older than TTL (and expired preprocessed images)."""
+    expired = preprocess_cache.purge_expired()
+    if expired > 0:
+        print(f"Dropped {expired} expired preprocessed images")
     
-    now = datetime.now()
-    cutoff = now - timedelta(minutes=FILE_TTL_MINUTES)
+    # The image index knows every upload and its mtime - no directory scan
+    cutoff = time.time() - FILE_TTL_MINUTES * 60
+    removed = image_index.prune(cutoff)
+    for record in removed:
+        preprocess_cache.discard(record.image_id)
+    for session_id in {record.session_id for record in removed}:
+        if not image_index.session_images(session_id):
+            validation_store.forget(session_id)  # its cached counters would never be freed otherwise
     
-    deleted_count = 0
-    for filepath in UPLOAD_DIR.glob("*"):
-        if not filepath.is_file():
-            continue
-        
-        # Check file age
-        modified_time = datetime.fromtimestamp(filepath.stat().st_mtime)
-        if modified_time < cutoff:
-            try:
-                filepath.unlink()
-                deleted_count += 1
-            except Exception as e:
-                print(f"Failed to delete {filepath}: {e}")
+    if removed:
+        print(f"Cleaned up {len(removed)} old files")
     
-    if deleted_count > 0:
-        print(f"Cleaned up {deleted_count} old files")
+    purged = job_store.purge(time.time() - JOB_RETENTION_HOURS * 3600)
+    if purged > 0:
+        print(f"Deleted {purged} finished inference jobs")
 
 def start_cleanup_task(interval_minutes=CLEANUP_INTERVAL_MINUTES):
     """Start background cleanup task."""
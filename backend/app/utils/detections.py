@@ -0,0 +1,139 @@
+"""
+Conversion of YOLO results into plain detection dicts.
+
+Kept free of FastAPI/router imports so replica worker processes can use it.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# Column order of detection arrays: x1, y1, x2, y2, confidence, class_id
+COLUMNS = ("x1", "y1", "x2", "y2", "confidence", "class_id")
+
+
+def result_array(result) -> np.ndarray:
+    """
+    All boxes of one ultralytics Results object as a single (N, 6) float32
+    array in COLUMNS order - one device->host copy instead of three tensor
+    reads per box.
+    """
+    data = result.boxes.data
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    return np.asarray(data, dtype=np.float32).reshape(-1, 6)
+
+
+class Detections:
+    """
+    One image's boxes as an (N, 6) float32 array in COLUMNS order, plus
+    class_id -> label for the classes present and the model that produced
+    them. This is what flows from predict() to the response encoders; box
+    dicts are only built (boxes()) where one object per box is wanted.
+    """
+    __slots__ = ("array", "names", "model")
+
+    def __init__(self, array: np.ndarray, names: Dict[int, str], model: Optional[str] = None):
+        self.array = np.asarray(array, dtype=np.float32).reshape(-1, 6)
+        self.names = names
+        self.model = model
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    @classmethod
+    def from_result(cls, result, model: Optional[str] = None) -> "Detections":
+        rows = result_array(result)
+        return cls(rows, {int(c): result.names[int(c)] for c in np.unique(rows[:, 5])}, model)
+
+    @classmethod
+    def from_boxes(cls, boxes: List[dict]) -> "Detections":
+        """From box dicts (older cache entries, stored job results)."""
+        names = {int(b["class_id"]): b["label"] for b in boxes}
+        return cls(boxes_to_array(boxes), names, boxes[0].get("model") if boxes else None)
+
+    def boxes(self, box_id_prefix: Optional[str] = None) -> List[dict]:
+        """
+        Box dicts {x1, y1, x2, y2, confidence, label, class_id[, model][, box_id]};
+        box i gets box_id f"{box_id_prefix}{i}".
+        """
+        boxes = []
+        for i, (x1, y1, x2, y2, conf, cls) in enumerate(self.array.tolist()):
+            box = {
+                "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+                "confidence": conf,
+                "label": self.names[int(cls)],
+                "class_id": int(cls)
+            }
+            if self.model is not None:
+                box["model"] = self.model
+            if box_id_prefix is not None:
+                box["box_id"] = f"{box_id_prefix}{i}"
+            boxes.append(box)
+        return boxes
+
+    def to_json(self) -> dict:
+        return {
+            "rows": self.array.tolist(),
+            "names": {str(c): label for c, label in self.names.items()},
+            "model": self.model
+        }
+
+    @classmethod
+    def from_json(cls, data) -> "Detections":
+        if isinstance(data, list):
+            return cls.from_boxes(data)  # cached before detections were stored as arrays
+        return cls(np.array(data["rows"], dtype=np.float32), {int(c): l for c, l in data["names"].items()}, data["model"])
+
+
+def parse_result(result) -> List[dict]:
+    """
+    Turn one ultralytics Results object into a list of box dicts:
+    {x1, y1, x2, y2, confidence, label, class_id}
+    """
+    return Detections.from_result(result).boxes()
+
+
+def boxes_to_array(boxes: List[dict]) -> np.ndarray:
+    """Box dicts back to an (N, 6) float32 array in COLUMNS order."""
+    return np.array([[b[c] for c in COLUMNS] for b in boxes], dtype=np.float32).reshape(-1, 6)
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between two (N, 4) and (M, 4) xyxy arrays -> (N, M)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def match_boxes(predicted: List[dict], truth: List[dict], iou_threshold: float = 0.5) -> List[tuple]:
+    """
+    Greedy one-to-one matching of same-class boxes, highest IoU first.
+    Returns (pred_index, truth_index) pairs.
+    """
+    if not predicted or not truth:
+        return []
+    ious = iou_matrix(
+        [[b["x1"], b["y1"], b["x2"], b["y2"]] for b in predicted],
+        [[b["x1"], b["y1"], b["x2"], b["y2"]] for b in truth]
+    )
+    same_class = np.array([[p["class_id"] == t["class_id"] for t in truth] for p in predicted])
+    ious = np.where(same_class, ious, 0.0)
+
+    pairs, used_pred, used_truth = [], set(), set()
+    for flat in np.argsort(-ious, axis=None):
+        i, j = divmod(int(flat), len(truth))
+        if ious[i, j] < iou_threshold:
+            break
+        if i in used_pred or j in used_truth:
+            continue
+        used_pred.add(i)
+        used_truth.add(j)
+        pairs.append((i, j))
+    return pairs
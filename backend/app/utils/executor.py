@@ -0,0 +1,83 @@
+"""
+Dedicated executor for blocking inference work.
+
+YOLO forward passes, model loading and warmup are CPU-bound and would
+freeze the asyncio event loop (uploads, validations, websocket pings).
+They run here instead, on a fixed number of worker threads behind a
+bounded queue.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from app.config.inference import INFERENCE_EXECUTOR_WORKERS, INFERENCE_MAX_QUEUE, INFERENCE_REPLICAS
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue has no room for more work."""
+
+
+class InferenceExecutor:
+    """
+    Thread pool with a bounded backlog.
+
+    At most max_workers jobs run at once and at most max_queue more
+    may wait; anything beyond that is rejected with InferenceQueueFull.
+    """
+
+    def __init__(self, max_workers: int = INFERENCE_EXECUTOR_WORKERS, max_queue: int = INFERENCE_MAX_QUEUE):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._inflight = 0
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def queued(self) -> int:
+        return max(0, self._inflight - self.max_workers)
+
+    def _reserve(self):
+        with self._lock:
+            if self._inflight >= self.max_workers + self.max_queue:
+                raise InferenceQueueFull(
+                    f"Inference queue full ({self.max_queue} waiting, {self.max_workers} running)"
+                )
+            self._inflight += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._inflight -= 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on a worker thread without blocking the event loop."""
+        self._reserve()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._pool.submit(partial(fn, *args, **kwargs))
+        except Exception:
+            self._release()
+            raise
+        # Release the slot when the thread finishes, even if the awaiting caller was cancelled
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "inflight": self._inflight,
+            "queued": self.queued
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance (one thread per replica process so every replica can be kept busy)
+inference_executor = InferenceExecutor(max_workers=max(INFERENCE_EXECUTOR_WORKERS, INFERENCE_REPLICAS))
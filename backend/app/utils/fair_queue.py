@@ -0,0 +1,174 @@
+"""
+Weighted fair queue for inference work.
+
+Every (session, priority class) pair is its own flow. Items are served
+by virtual finish time (start-time fair queueing): a flow's next item
+finishes 1/weight after its previous one, or after the current virtual
+time if the flow was idle. So
+
+- one session's burst of 20 images interleaves with other sessions'
+  work instead of running first, and
+- higher-weight classes (interactive) overtake lower ones (batch,
+  speculative) without starving them: a busy interactive stream only
+  slows batch work down, it never stops it.
+
+Weights come from INFERENCE_PRIORITY_WEIGHTS. Per-session queue depth
+and wait times are kept for /api/inference/stats.
+"""
+import heapq
+import itertools
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Callable, Dict, Optional
+
+from app.config.inference import INFERENCE_PRIORITY_WEIGHTS, INFERENCE_STATS_WINDOW
+
+MAX_TRACKED_SESSIONS = 200  # idle sessions beyond this drop out of the stats, least recent first
+
+_GONE = object()  # entry slot of a heap item that was popped or discarded
+
+
+class _SessionStats:
+    def __init__(self, window: int):
+        self.depth = Counter()  # priority -> items queued now
+        self.served = 0
+        self.waits_ms = deque(maxlen=window)
+
+
+class FairQueue:
+    def __init__(self, weights: Dict[str, float] = INFERENCE_PRIORITY_WEIGHTS, window: int = INFERENCE_STATS_WINDOW):
+        self.weights = dict(weights)
+        self.window = window
+        self._heap = []  # [finish, seq, start, flow, enqueued_at, entry]
+        self._seq = itertools.count()
+        self._vtime = 0.0
+        self._last_finish = {}  # flow -> finish tag of its newest item
+        self._sessions = OrderedDict()  # session -> _SessionStats, least recently active first
+        self._class_waits = {priority: deque(maxlen=window) for priority in self.weights}
+        self._discarded = 0  # discarded items still in the heap (skipped by pop)
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._discarded
+
+    def _tag(self, flow: tuple) -> tuple:
+        if len(self._last_finish) > 4 * MAX_TRACKED_SESSIONS:
+            # flows whose last item finished before the virtual time would restart from it anyway
+            self._last_finish = {f: t for f, t in self._last_finish.items() if t > self._vtime}
+        start = max(self._vtime, self._last_finish.get(flow, 0.0))
+        finish = start + 1.0 / self.weights[flow[1]]
+        self._last_finish[flow] = finish
+        return start, finish
+
+    def _session(self, session: str) -> _SessionStats:
+        stats = self._sessions.get(session)
+        if stats is None:
+            stats = self._sessions[session] = _SessionStats(self.window)
+            while len(self._sessions) > MAX_TRACKED_SESSIONS:
+                oldest = next(iter(self._sessions))
+                if sum(self._sessions[oldest].depth.values()):
+                    break
+                del self._sessions[oldest]
+        self._sessions.move_to_end(session)
+        return stats
+
+    def push(self, entry: Any, session: Optional[str] = None, priority: str = "interactive") -> list:
+        """Queue an entry; returns a handle for discard()."""
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority: {priority} (choose from {', '.join(self.weights)})")
+        flow = (session or "", priority)
+        start, finish = self._tag(flow)
+        item = [finish, next(self._seq), start, flow, time.perf_counter(), entry]
+        heapq.heappush(self._heap, item)
+        self._session(flow[0]).depth[priority] += 1
+        return item
+
+    def discard(self, item: list) -> bool:
+        """
+        Take a queued entry out (its caller gave up) so it stops counting
+        toward the queue's length. False if it was already popped.
+        """
+        if item[5] is _GONE:
+            return False
+        item[5] = _GONE
+        self._discarded += 1
+        session, priority = item[3]
+        self._session(session).depth[priority] -= 1
+        if self._discarded > 32 and self._discarded * 2 > len(self._heap):
+            self._heap = [i for i in self._heap if i[5] is not _GONE]
+            heapq.heapify(self._heap)
+            self._discarded = 0
+        return True
+
+    def pop(self) -> Any:
+        """Next entry by virtual finish time (ties: arrival order)."""
+        item = heapq.heappop(self._heap)
+        while item[5] is _GONE:
+            self._discarded -= 1
+            item = heapq.heappop(self._heap)
+        _, _, start, flow, enqueued_at, entry = item
+        item[5] = _GONE
+        self._vtime = max(self._vtime, start)
+        session, priority = flow
+        wait_ms = (time.perf_counter() - enqueued_at) * 1000
+        stats = self._session(session)
+        stats.depth[priority] -= 1
+        stats.served += 1
+        stats.waits_ms.append(wait_ms)
+        self._class_waits[priority].append(wait_ms)
+        if self._last_finish.get(flow, float("inf")) <= self._vtime:
+            del self._last_finish[flow]  # idle flow - it restarts from the virtual time
+        return entry
+
+    def oldest_enqueued(self) -> Optional[float]:
+        """perf_counter() at which the longest-waiting entry arrived."""
+        return min((item[4] for item in self._heap if item[5] is not _GONE), default=None)
+
+    def reprioritize(self, match: Callable[[Any], bool], priority: str) -> int:
+        """
+        Move queued entries for which match(entry) is true to another
+        priority class (e.g. a speculative job somebody is now waiting
+        for). They are re-tagged as if they arrived now.
+        """
+        moved = 0
+        for item in self._heap:
+            session, old = item[3]
+            if item[5] is _GONE or old == priority or not match(item[5]):
+                continue
+            flow = (session, priority)
+            item[2], item[0] = self._tag(flow)
+            item[3] = flow
+            stats = self._session(session)
+            stats.depth[old] -= 1
+            stats.depth[priority] += 1
+            moved += 1
+        if moved:
+            heapq.heapify(self._heap)
+        return moved
+
+    def stats(self) -> dict:
+        from app.utils.batcher import percentile  # batcher imports this module
+
+        def waits(values):
+            values = list(values)
+            return {
+                "avg": round(sum(values) / len(values), 2) if values else 0.0,
+                "p95": round(percentile(values, 95), 2),
+                "max": round(max(values), 2) if values else 0.0
+            }
+
+        return {
+            "weights": self.weights,
+            "depth_by_priority": {
+                priority: sum(s.depth[priority] for s in self._sessions.values()) for priority in self.weights
+            },
+            "wait_ms_by_priority": {priority: waits(values) for priority, values in self._class_waits.items()},
+            "sessions": {
+                session or "(none)": {
+                    "depth": sum(s.depth.values()),
+                    "depth_by_priority": {p: n for p, n in s.depth.items() if n},
+                    "served": s.served,
+                    "wait_ms": waits(s.waits_ms)
+                }
+                for session, s in reversed(self._sessions.items())  # most recently active first
+            }
+        }
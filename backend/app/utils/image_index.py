@@ -0,0 +1,177 @@
+"""
+In-memory index of uploaded images.
+
+session_id -> image_id -> (path, size, mime, width, height, mtime)
+
+Uploads add to it, cleanup prunes it, and it is rebuilt from disk at
+startup, so resolving an image never scans the upload directory.
+On disk every session has its own directory:
+
+    visionpulse_uploads/{session_id}/{image_id}.{ext}
+
+which keeps lookups and session deletion O(images in that session).
+Files from the old flat layout ({image_id}.{ext} directly in
+visionpulse_uploads) are moved into their session directory on rebuild.
+"""
+import mimetypes
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+UPLOAD_DIR = Path(tempfile.gettempdir()) / "visionpulse_uploads"
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+
+# image_ids come from requests and become path components
+SAFE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class ImageRecord(NamedTuple):
+    image_id: str
+    session_id: str
+    path: Path
+    size: int
+    mime: str
+    width: Optional[int]
+    height: Optional[int]
+    mtime: float
+
+
+def session_of(image_id: str) -> str:
+    """image_id is {session_id}_{timestamp_ms}."""
+    return image_id.rsplit("_", 1)[0]
+
+
+def record_for(path: Path, mime: Optional[str] = None, width: Optional[int] = None, height: Optional[int] = None) -> ImageRecord:
+    """Index entry for a file on disk (reads the header for anything not passed in)."""
+    stat = path.stat()
+    if width is None or height is None:
+        try:
+            from app.utils.images import image_size
+            width, height = image_size(path)
+        except Exception:
+            width = height = None
+    if mime is None:
+        mime = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return ImageRecord(path.stem, session_of(path.stem), path, stat.st_size, mime, width, height, stat.st_mtime)
+
+
+class ImageIndex:
+    def __init__(self, root: Path = UPLOAD_DIR):
+        self.root = root
+        self._sessions = {}  # session_id -> {image_id: ImageRecord}, in upload order
+        self._lock = threading.Lock()
+
+    def session_dir(self, session_id: str) -> Path:
+        return self.root / session_id
+
+    def add(self, record: ImageRecord):
+        with self._lock:
+            self._sessions.setdefault(record.session_id, {})[record.image_id] = record
+
+    def get(self, image_id: str) -> Optional[ImageRecord]:
+        """
+        Record for image_id. Falls back to the session directory on a miss
+        (e.g. a file written by another process) and indexes what it finds.
+        """
+        if not SAFE_ID.match(image_id):
+            return None
+        session_id = session_of(image_id)
+        with self._lock:
+            record = self._sessions.get(session_id, {}).get(image_id)
+        if record is not None:
+            return record
+        directory = self.session_dir(session_id)
+        if not directory.is_dir():
+            return None
+        for path in directory.glob(f"{image_id}.*"):
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                record = record_for(path)
+                self.add(record)
+                return record
+        return None
+
+    def session_images(self, session_id: str) -> List[ImageRecord]:
+        """Images of a session, oldest upload first."""
+        with self._lock:
+            records = list(self._sessions.get(session_id, {}).values())
+        return sorted(records, key=lambda r: r.mtime)
+
+    def latest(self, session_id: str) -> Optional[ImageRecord]:
+        records = self.session_images(session_id)
+        return records[-1] if records else None
+
+    def remove(self, image_id: str) -> Optional[ImageRecord]:
+        """Delete one image (file + entry)."""
+        session_id = session_of(image_id)
+        with self._lock:
+            images = self._sessions.get(session_id, {})
+            record = images.pop(image_id, None)
+            if not images:
+                self._sessions.pop(session_id, None)
+        if record is not None:
+            record.path.unlink(missing_ok=True)
+            self._remove_dir_if_empty(session_id)
+        return record
+
+    def remove_session(self, session_id: str) -> int:
+        """Delete every image of a session (one directory removal)."""
+        with self._lock:
+            images = self._sessions.pop(session_id, {})
+        shutil.rmtree(self.session_dir(session_id), ignore_errors=True)
+        return len(images)
+
+    def prune(self, cutoff: float) -> List[ImageRecord]:
+        """Delete images last modified before cutoff (a time.time() value)."""
+        with self._lock:
+            expired = [r for images in self._sessions.values() for r in images.values() if r.mtime < cutoff]
+        removed = []
+        for record in expired:
+            try:
+                if self.remove(record.image_id) is not None:
+                    removed.append(record)
+            except OSError as e:
+                print(f"Failed to delete {record.path}: {e}")
+        return removed
+
+    def _remove_dir_if_empty(self, session_id: str):
+        try:
+            self.session_dir(session_id).rmdir()
+        except OSError:
+            pass  # not empty, or already gone
+
+    def rebuild(self):
+        """Re-index everything on disk (startup), moving flat-layout files into session dirs."""
+        self.root.mkdir(exist_ok=True, parents=True)
+        for path in list(self.root.iterdir()):
+            if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES and "_" in path.stem:
+                target = self.session_dir(session_of(path.stem))
+                target.mkdir(exist_ok=True)
+                path.replace(target / path.name)
+
+        sessions = {}
+        for directory in self.root.iterdir():
+            if not directory.is_dir():
+                continue
+            for path in directory.iterdir():
+                if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES:
+                    record = record_for(path)
+                    sessions.setdefault(record.session_id, {})[record.image_id] = record
+        with self._lock:
+            self._sessions = sessions
+        return sum(len(images) for images in sessions.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "images": sum(len(images) for images in self._sessions.values()),
+                "bytes": sum(r.size for images in self._sessions.values() for r in images.values())
+            }
+
+
+# Global instance
+image_index = ImageIndex()
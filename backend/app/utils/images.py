@@ -0,0 +1,63 @@
+"""
+Image decoding and YOLO-style preprocessing helpers.
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def read_image(path) -> np.ndarray:
+    """Decode an image file into a BGR uint8 array (same layout YOLO uses)."""
+    import cv2
+    img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not decode image {path}")
+    return img
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """Decode in-memory image bytes (e.g. an upload) into a BGR uint8 array."""
+    import cv2
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image bytes")
+    return img
+
+
+def image_size(path) -> Tuple[int, int]:
+    """(width, height) from the file header, without decoding the pixels."""
+    from PIL import Image
+    with Image.open(path) as img:
+        return img.size
+
+
+def letterbox(img: np.ndarray, size: int = 640, pad_value: int = 114) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize keeping aspect ratio and pad to size x size (ultralytics LetterBox, centered).
+    Returns (image, scale, (pad_x, pad_y)) so boxes can be mapped back.
+    """
+    import cv2
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    out = np.full((size, size, 3), pad_value, dtype=np.uint8)
+    out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = img
+    return out, scale, (pad_x, pad_y)
+
+
+def unletterbox_boxes(rows: np.ndarray, scale: float, pad: Tuple[int, int], shape: Tuple[int, int]) -> np.ndarray:
+    """Map (N, 6) detection rows predicted on a letterboxed image back to the original (h, w) image."""
+    pad_x, pad_y = pad
+    h, w = shape
+    out = rows.copy()
+    out[:, [0, 2]] = np.clip((rows[:, [0, 2]] - pad_x) / scale, 0.0, w)
+    out[:, [1, 3]] = np.clip((rows[:, [1, 3]] - pad_y) / scale, 0.0, h)
+    return out
+
+
+def to_model_input(img: np.ndarray) -> np.ndarray:
+    """Letterboxed BGR uint8 HWC -> RGB float32 NCHW in [0, 1], the exported model's input."""
+    return np.ascontiguousarray(img[None, :, :, ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
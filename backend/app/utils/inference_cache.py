@@ -0,0 +1,160 @@
+"""
+Content-addressed cache of inference results.
+
+Keyed by a hash of the image bytes plus the model identity and predict
+parameters, so re-uploads of the same image (new image_id, same bytes)
+hit the cache too. Two tiers:
+- memory: size-bounded LRU
+- disk: JSON files that survive restarts, oldest evicted first
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from app.config.inference import (
+    INFERENCE_CACHE_MEMORY_ENTRIES,
+    INFERENCE_CACHE_DISK_ENTRIES
+)
+
+CACHE_DIR = Path(tempfile.gettempdir()) / "visionpulse_inference_cache"
+
+# Only these affect the boxes we get back
+KEY_PARAMS = ("conf", "iou", "imgsz", "max_det", "agnostic_nms")
+
+
+def cache_key(image_bytes: bytes, model_id: str, params: dict) -> str:
+    """sha256 over image bytes + model identity + the predict params that change output."""
+    h = hashlib.sha256(image_bytes)
+    h.update(model_id.encode())
+    h.update(json.dumps({k: params.get(k) for k in KEY_PARAMS}, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+class InferenceCache:
+    def __init__(
+        self,
+        max_memory_entries: int = INFERENCE_CACHE_MEMORY_ENTRIES,
+        max_disk_entries: int = INFERENCE_CACHE_DISK_ENTRIES,
+        cache_dir: Optional[Path] = CACHE_DIR
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.cache_dir = cache_dir
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()  # key -> None, oldest first
+        self._lock = threading.Lock()
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0
+        }
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(exist_ok=True, parents=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        """Rebuild the disk tier's LRU order from file mtimes (survives restarts)."""
+        files = sorted(self.cache_dir.glob("*.json"), key=lambda f: f.stat().st_mtime)
+        for f in files:
+            self._disk[f.stem] = None
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Cached detections for key (Detections.to_json() form; entries
+        written by older versions are box lists), or None on a miss.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self._memory[key]
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self._path(key), "r") as f:
+                    boxes = json.load(f)
+            except (OSError, ValueError):
+                boxes = None
+            with self._lock:
+                if boxes is None:
+                    self._disk.pop(key, None)
+                else:
+                    self._disk.move_to_end(key)
+                    self.counters["disk_hits"] += 1
+                    self._remember(key, boxes)
+                    return boxes
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, boxes: dict):
+        """Store detections (Detections.to_json() form) in both tiers."""
+        with self._lock:
+            self._remember(key, boxes)
+
+        if self.cache_dir is None or self.max_disk_entries <= 0:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w") as f:
+                json.dump(boxes, f)
+            os.replace(tmp, path)  # atomic - readers never see half a file
+        except OSError as e:
+            print(f"[CACHE] Failed to write {path.name}: {e}")
+            return
+
+        with self._lock:
+            self._disk[key] = None
+            self._disk.move_to_end(key)
+            while len(self._disk) > self.max_disk_entries:
+                old_key, _ = self._disk.popitem(last=False)
+                self._path(old_key).unlink(missing_ok=True)
+                self.counters["disk_evictions"] += 1
+
+    def _remember(self, key: str, boxes: dict):
+        # caller holds the lock
+        if self.max_memory_entries <= 0:
+            return
+        self._memory[key] = boxes
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["memory_evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            keys = list(self._disk)
+            self._disk.clear()
+        for key in keys:
+            self._path(key).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk),
+                "max_memory_entries": self.max_memory_entries,
+                "max_disk_entries": self.max_disk_entries
+            }
+
+
+# Global instance
+inference_cache = InferenceCache()
@@ -0,0 +1,137 @@
+"""
+Durable store for asynchronous inference jobs (/api/jobs).
+
+One SQLite row per job: what to run (session, image, model), where it
+is (queued -> running -> done | failed) and, once done, the exact JSON
+body /api/infer would have returned. Jobs are written before the
+submit call returns, so queued work survives a restart: on startup
+every unfinished job goes back into the queue.
+"""
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+JOB_DB = Path(tempfile.gettempdir()) / "visionpulse_jobs.sqlite3"
+
+STATUSES = ("queued", "running", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    image_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id, created_at);
+"""
+
+
+def _job(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class JobStore:
+    def __init__(self, path: Path = JOB_DB):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()  # the cleanup thread purges while the event loop writes
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._db().execute(sql, params)
+
+    def create(self, session_id: str, image_id: str, model: str) -> dict:
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (job_id, session_id, image_id, model, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+            (job_id, session_id, image_id, model, time.time())
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    def session_jobs(self, session_id: str, limit: int = 100) -> List[dict]:
+        rows = self._execute(
+            "SELECT * FROM jobs WHERE session_id = ? ORDER BY created_at DESC LIMIT ?", (session_id, limit)
+        ).fetchall()
+        return [_job(row) for row in rows]
+
+    def mark_running(self, job_id: str):
+        self._execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE job_id = ?",
+            (time.time(), job_id)
+        )
+
+    def finish(self, job_id: str, result: dict):
+        self._execute(
+            "UPDATE jobs SET status = 'done', finished_at = ?, result = ?, error = NULL WHERE job_id = ?",
+            (time.time(), json.dumps(result, default=str), job_id)
+        )
+
+    def fail(self, job_id: str, error: str):
+        self._execute(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE job_id = ?",
+            (time.time(), error, job_id)
+        )
+
+    def recover(self, max_attempts: int) -> List[str]:
+        """
+        After a restart: jobs that were running go back to queued (or fail
+        once they have been interrupted max_attempts times). Returns every
+        queued job_id, oldest first.
+        """
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Interrupted by restarts too often' "
+                "WHERE status = 'running' AND attempts >= ?",
+                (time.time(), max_attempts)
+            )
+            db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            rows = db.execute("SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row["job_id"] for row in rows]
+
+    def purge(self, cutoff: float) -> int:
+        """Delete finished jobs older than cutoff (a time.time() value)."""
+        cursor = self._execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        rows = self._execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+
+# Global instance
+job_store = JobStore()
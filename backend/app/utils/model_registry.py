@@ -0,0 +1,244 @@
+"""
+Registry of YOLO models that can be picked per request.
+
+Models are loaded lazily on first use and kept as a small pool of
+replicas each (YOLO predictors are not thread-safe, so every executor
+thread running a model checks out a replica of its own). The estimated
+memory of all loaded replicas is kept under a budget: loading past it
+evicts the least recently used models.
+"""
+import gc
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from app.config.inference import (
+    DEFAULT_MODEL,
+    INFERENCE_BACKEND,
+    INFERENCE_STATS_WINDOW,
+    MODEL_MEMORY_BUDGET_MB,
+    MODEL_MEMORY_OVERHEAD,
+    MODELS
+)
+from app.utils.backends import resolve_backend
+from app.utils.batcher import percentile
+
+
+class UnknownModel(ValueError):
+    pass
+
+
+def estimate_bytes(yolo, weights: str) -> int:
+    """
+    Rough resident size of one loaded replica: parameters + buffers for
+    torch models, the artifact size for exported ones, times
+    MODEL_MEMORY_OVERHEAD for activations and runtime workspace.
+    """
+    size = 0
+    model = getattr(yolo, "model", None)
+    if hasattr(model, "parameters") and hasattr(model, "buffers"):
+        size = sum(t.numel() * t.element_size() for t in itertools.chain(model.parameters(), model.buffers()))
+    if not size:
+        path = Path(str(getattr(yolo, "ckpt_path", None) or weights))
+        if path.is_file():
+            size = path.stat().st_size
+        elif path.is_dir():  # openvino_model/ directory
+            size = sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return int(size * MODEL_MEMORY_OVERHEAD)
+
+
+class _Entry:
+    """One model: its free replicas plus load and latency statistics."""
+
+    def __init__(self, name: str, weights: str, backend: str, window: int):
+        self.name = name
+        self.weights = weights
+        self.backend = backend
+        self.free = []
+        self.replicas = 0
+        self.bytes_per_replica = 0
+        self.evicted = False
+        self.last_used = time.time()
+        self.load_ms = deque(maxlen=window)
+        self.batch_run_ms = deque(maxlen=window)
+        self.batches = 0
+        self.images = 0
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, memory-bounded set of models.
+
+    loader(weights, backend, name) must return a ready (warmed) YOLO
+    object; it runs on whichever thread first needs a replica, so call
+    checkout() from the inference executor, never the event loop.
+    """
+
+    def __init__(
+        self,
+        loader: Callable,
+        models: Dict[str, str] = MODELS,
+        default: str = DEFAULT_MODEL,
+        backend: str = INFERENCE_BACKEND,
+        memory_budget_mb: float = MODEL_MEMORY_BUDGET_MB,
+        window: int = INFERENCE_STATS_WINDOW
+    ):
+        if default not in models:
+            raise ValueError(f"Default model {default} is not in MODELS")
+        self.loader = loader
+        self.models = dict(models)
+        self.default = default
+        self.backend = backend
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.window = window
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # least recently used first
+        self._history = {}  # name -> {"loads", "evictions"}, kept across evictions
+
+    def resolve(self, name: Optional[str]) -> str:
+        """Validated model name (the default when None)."""
+        name = name or self.default
+        if name not in self.models:
+            raise UnknownModel(f"Unknown model: {name} (choose from {', '.join(self.models)})")
+        return name
+
+    def backend_for(self, name: str) -> str:
+        """Backend that will serve this model (onnx_int8 may fall back to onnx per weights)."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                return entry.backend
+        return resolve_backend(self.backend, self.models[name])
+
+    def identity(self, name: str) -> str:
+        """Identifies whatever produces this model's boxes - part of every cache key."""
+        return f"{self.models[name]}:{self.backend_for(name)}"
+
+    def _entry(self, name: str) -> _Entry:
+        entry = self._entries.get(name)
+        if entry is None:
+            weights = self.models[name]
+            entry = self._entries[name] = _Entry(name, weights, resolve_backend(self.backend, weights), self.window)
+        self._entries.move_to_end(name)
+        entry.last_used = time.time()
+        return entry
+
+    @contextmanager
+    def checkout(self, name: str):
+        """Borrow a replica of the model, loading a new one if none is free."""
+        name = self.resolve(name)
+        with self._lock:
+            entry = self._entry(name)
+            yolo = entry.free.pop() if entry.free else None
+        if yolo is None:
+            yolo = self._load_replica(entry)
+        try:
+            yield yolo
+        finally:
+            with self._lock:
+                if not entry.evicted:
+                    entry.free.append(yolo)
+
+    def _load_replica(self, entry: _Entry):
+        t0 = time.perf_counter()
+        try:
+            yolo = self.loader(entry.weights, entry.backend, entry.name)
+        except Exception:
+            with self._lock:
+                if entry.replicas == 0 and self._entries.get(entry.name) is entry:
+                    del self._entries[entry.name]  # never loaded - don't list it as loaded
+            raise
+        load_ms = (time.perf_counter() - t0) * 1000
+        size = estimate_bytes(yolo, entry.weights)
+        with self._lock:
+            if entry.evicted and entry.name not in self._entries:
+                # evicted while we were loading - bring it back
+                entry.evicted = False
+                self._entries[entry.name] = entry
+                self._entries.move_to_end(entry.name)
+            entry.load_ms.append(load_ms)
+            entry.bytes_per_replica = max(entry.bytes_per_replica, size)
+            entry.replicas += 1
+            self._history.setdefault(entry.name, {"loads": 0, "evictions": 0})["loads"] += 1
+            self._enforce_budget(keep=entry.name)
+        return yolo
+
+    def _memory_used(self) -> int:
+        return sum(e.replicas * e.bytes_per_replica for e in self._entries.values())
+
+    def _enforce_budget(self, keep: str):
+        """Evict least recently used models until the loaded ones fit the budget (lock held)."""
+        evicted = False
+        for name in list(self._entries):
+            if self._memory_used() <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            self._evict_locked(name)
+            evicted = True
+        if self._memory_used() > self.memory_budget:
+            print(f"[MODELS] {keep} alone exceeds the {self.memory_budget // 2**20} MB budget")
+        if evicted:
+            gc.collect()
+
+    def _evict_locked(self, name: str):
+        entry = self._entries.pop(name)
+        entry.evicted = True
+        entry.free = []  # replicas still checked out are dropped when returned
+        entry.replicas = 0
+        self._history.setdefault(name, {"loads": 0, "evictions": 0})["evictions"] += 1
+        print(f"[MODELS] Evicted {name} (least recently used, over memory budget)")
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            if name not in self._entries:
+                return False
+            self._evict_locked(name)
+        gc.collect()
+        return True
+
+    def record(self, name: str, images: int, run_ms: float):
+        """Latency of one forward pass of this model."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            entry.batches += 1
+            entry.images += images
+            entry.batch_run_ms.append(run_ms)
+
+    def loaded(self) -> list:
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = {}
+            for name, weights in self.models.items():
+                entry = self._entries.get(name)
+                history = self._history.get(name, {"loads": 0, "evictions": 0})
+                info = {"weights": weights, "loaded": entry is not None, **history}
+                if entry is not None:
+                    runs = list(entry.batch_run_ms)
+                    info.update({
+                        "backend": entry.backend,
+                        "replicas": entry.replicas,
+                        "estimated_mb": round(entry.replicas * entry.bytes_per_replica / 2**20, 1),
+                        "load_ms_avg": round(sum(entry.load_ms) / len(entry.load_ms), 1) if entry.load_ms else None,
+                        "batches": entry.batches,
+                        "images": entry.images,
+                        "batch_run_ms_avg": round(sum(runs) / len(runs), 1) if runs else None,
+                        "batch_run_ms_p95": round(percentile(runs, 95), 1) if runs else None,
+                        "last_used": entry.last_used
+                    })
+                models[name] = info
+            return {
+                "default": self.default,
+                "memory_budget_mb": round(self.memory_budget / 2**20, 1),
+                "memory_used_mb": round(self._memory_used() / 2**20, 1),
+                "models": models
+            }
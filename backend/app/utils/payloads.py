@@ -0,0 +1,93 @@
+"""
+Detection response encodings.
+
+- objects: one JSON object per box (default, what the frontend uses)
+- columns: JSON with parallel arrays (xyxy, confidence, class_id)
+- msgpack: the columnar payload with arrays as raw little-endian buffers
+- float32: bare (N, 6) float32 buffer; the X-Detections header only
+  carries its shape and dtype (use columns/msgpack for names and metrics)
+
+The columnar formats are written straight from the Detections array;
+box dicts are only built for objects.
+
+Box ids are not sent in the columnar formats; box i of an image is
+always f"{image_id}_box_{i}" (box_id_prefix + index).
+"""
+import json
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+
+from app.utils.detections import Detections
+
+FORMATS = ("objects", "columns", "msgpack", "float32")
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def box_id_prefix(meta: dict) -> str:
+    return f"{meta['image_id']}_box_"
+
+
+def objects(meta: dict, detections: Detections) -> dict:
+    """Per-box payload: meta fields plus one box dict (with box_id) per detection."""
+    return {**meta, "boxes": detections.boxes(box_id_prefix(meta))}
+
+
+def _class_names(detections: Detections) -> dict:
+    """class_id -> label for the classes present (JSON keys are strings)."""
+    return {str(c): label for c, label in detections.names.items()}
+
+
+def columnar(meta: dict, detections: Detections) -> dict:
+    """Parallel-array payload: meta fields plus xyxy/confidence/class_id columns."""
+    rows = detections.array
+    return {
+        **meta,
+        "box_id_prefix": box_id_prefix(meta),
+        "names": _class_names(detections),
+        "xyxy": rows[:, :4].tolist(),
+        "confidence": rows[:, 4].tolist(),
+        "class_id": rows[:, 5].astype(np.int32).tolist()
+    }
+
+
+def encode_msgpack(meta: dict, detections: Detections) -> bytes:
+    try:
+        import msgpack
+    except ImportError:
+        raise UnsupportedFormat("msgpack is not installed on this server - use format=float32 or columns")
+    rows = detections.array
+    return msgpack.packb({
+        **meta,
+        "box_id_prefix": box_id_prefix(meta),
+        "names": _class_names(detections),
+        "xyxy": rows[:, :4].astype("<f4").tobytes(),  # N x 4
+        "confidence": rows[:, 4].astype("<f4").tobytes(),
+        "class_id": rows[:, 5].astype("<i4").tobytes()
+    })
+
+
+def encode_response(fmt: str, meta: dict, detections: Detections) -> Response:
+    """
+    Response for one image's detections in the requested format.
+    meta holds everything except the boxes (session_id, image_id, count,
+    metrics, cached).
+    """
+    if fmt == "objects":
+        return JSONResponse(objects(meta, detections))
+    if fmt == "columns":
+        return JSONResponse(columnar(meta, detections))
+    if fmt == "msgpack":
+        return Response(encode_msgpack(meta, detections), media_type="application/msgpack")
+    if fmt == "float32":
+        rows = detections.array.astype("<f4")
+        header = {"shape": list(rows.shape), "dtype": "<f4"}  # columns: COLUMNS order
+        return Response(
+            rows.tobytes(),
+            media_type="application/octet-stream",
+            headers={"X-Detections": json.dumps(header, separators=(",", ":"))}
+        )
+    raise UnsupportedFormat(f"Unknown format: {fmt} (choose from {', '.join(FORMATS)})")
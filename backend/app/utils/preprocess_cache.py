@@ -0,0 +1,127 @@
+"""
+Cache of decoded, letterboxed images between upload and inference.
+
+The upload handler already has the image bytes in memory, so it decodes
+and letterboxes them once (in the background) and inference picks the
+result up by image_id instead of decoding the file again. Images that
+were not cached at upload are filled on their first inference.
+
+Entries are uint8 640x640x3 (~1.2 MB each; the float32 NCHW tensor is
+4x that and cheap to derive). The cache is bounded by
+PREPROCESS_CACHE_MB (least recently used out first) and entries expire
+SESSION_TTL_MINUTES after their last use, like the session itself.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.config.inference import (
+    PREDICT_KWARGS,
+    PREPROCESS_CACHE_MB,
+    TILING_ENABLED,
+    TILING_MEGAPIXEL_THRESHOLD
+)
+from app.config.security import SESSION_TTL_MINUTES
+from app.utils.images import letterbox
+
+
+class Prepared(NamedTuple):
+    """A letterboxed image plus what is needed to map boxes back."""
+    image: np.ndarray
+    scale: float
+    pad: Tuple[int, int]
+    shape: Tuple[int, int]  # original (h, w)
+
+
+def prepare(img: np.ndarray, size: int = PREDICT_KWARGS["imgsz"]) -> Prepared:
+    boxed, scale, pad = letterbox(img, size)
+    return Prepared(boxed, scale, pad, img.shape[:2])
+
+
+def wants(img: np.ndarray) -> bool:
+    """Images that will be tiled never use the 640 letterbox - don't cache them."""
+    h, w = img.shape[:2]
+    return not (TILING_ENABLED and w * h > TILING_MEGAPIXEL_THRESHOLD * 1_000_000)
+
+
+class PreprocessCache:
+    def __init__(self, max_mb: float = PREPROCESS_CACHE_MB, ttl_minutes: float = SESSION_TTL_MINUTES):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_minutes * 60
+        self._entries = OrderedDict()  # image_id -> (Prepared, last_used), least recent first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, image_id: str) -> Optional[Prepared]:
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(image_id)
+            if item is None or now - item[1] > self.ttl_seconds:
+                if item is not None:
+                    self._drop(image_id)
+                    self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries[image_id] = (item[0], now)
+            self._entries.move_to_end(image_id)
+            self.counters["hits"] += 1
+            return item[0]
+
+    def put(self, image_id: str, prepared: Prepared):
+        size = prepared.image.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if image_id in self._entries:
+                self._drop(image_id)
+            self._entries[image_id] = (prepared, time.time())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.counters["evictions"] += 1
+
+    def fill(self, image_id: str, img: np.ndarray) -> Optional[Prepared]:
+        """Letterbox a decoded image and cache it (skipped for images that will be tiled)."""
+        if not wants(img):
+            return None
+        prepared = prepare(img)
+        self.put(image_id, prepared)
+        return prepared
+
+    def _drop(self, image_id: str):
+        prepared, _ = self._entries.pop(image_id)
+        self._bytes -= prepared.image.nbytes
+
+    def purge_expired(self) -> int:
+        """Drop entries unused for SESSION_TTL_MINUTES (called by the cleanup task)."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [image_id for image_id, (_, used) in self._entries.items() if used < cutoff]
+            for image_id in expired:
+                self._drop(image_id)
+            self.counters["expired"] += len(expired)
+        return len(expired)
+
+    def discard(self, image_id: str):
+        with self._lock:
+            if image_id in self._entries:
+                self._drop(image_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "used_mb": round(self._bytes / 2**20, 1),
+                "max_mb": round(self.max_bytes / 2**20, 1),
+                "ttl_minutes": self.ttl_seconds / 60
+            }
+
+
+# Global instance
+preprocess_cache = PreprocessCache()
@@ -0,0 +1,242 @@
+"""
+INT8 post-training quantization with an accuracy guardrail.
+
+Builds an INT8 ONNX model from the existing weights with ONNX Runtime:
+- static:  calibrated on images already in visionpulse_uploads (default)
+- dynamic: weights only, no calibration data needed
+
+The guardrail runs the FP32 and INT8 models over every image that users
+have validated through /api/validate and compares precision/recall
+against that ground truth. The onnx_int8 backend only serves the INT8
+model while the saved report says it passed - for that exact model file,
+so rebuilding the INT8 model needs a new report - and otherwise falls
+back to FP32 ONNX.
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config.inference import (
+    INT8_CALIBRATION_IMAGES,
+    INT8_MAX_PRECISION_DROP,
+    INT8_MAX_RECALL_DROP,
+    INT8_QUANTIZATION_MODE,
+    PREDICT_KWARGS,
+    YOLO_MODEL_WEIGHTS
+)
+from app.utils.backends import export_model, exported_path, forget_resolved
+from app.utils.detections import match_boxes, parse_result
+from app.utils.images import letterbox, read_image, to_model_input
+from app.utils.image_index import IMAGE_SUFFIXES, UPLOAD_DIR, image_index
+from app.utils.validation_store import validation_store
+
+# Detect head (box decode + concat) is very sensitive to INT8 - keep it in FP32
+HEAD_NODE_PREFIX = "/model.22/"
+
+
+def report_path(weights: str = YOLO_MODEL_WEIGHTS) -> Path:
+    return exported_path(weights, "onnx_int8").with_suffix(".report.json")
+
+
+def upload_images(limit: Optional[int] = None) -> List[Path]:
+    """Uploaded images, newest first."""
+    if not UPLOAD_DIR.exists():
+        return []
+    files = [f for f in UPLOAD_DIR.rglob("*") if f.suffix.lower() in IMAGE_SUFFIXES]
+    files.sort(key=lambda f: f.stat().st_mtime, reverse=True)
+    return files[:limit] if limit else files
+
+
+def _calibration_reader(paths: List[Path], input_name: str, imgsz: int):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class UploadCalibrationReader(CalibrationDataReader):
+        """Feeds letterboxed uploads to the calibrator one at a time."""
+
+        def __init__(self):
+            self._paths = iter(paths)
+
+        def get_next(self):
+            for path in self._paths:
+                try:
+                    img, _, _ = letterbox(read_image(path), imgsz)
+                except ValueError:
+                    continue
+                return {input_name: to_model_input(img)}
+            return None
+
+    return UploadCalibrationReader()
+
+
+def quantize_int8(
+    weights: str = YOLO_MODEL_WEIGHTS,
+    mode: str = INT8_QUANTIZATION_MODE,
+    calibration_images: int = INT8_CALIBRATION_IMAGES,
+    imgsz: int = PREDICT_KWARGS["imgsz"]
+) -> Path:
+    """Produce the INT8 ONNX model next to the weights. Blocking."""
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static
+    )
+
+    fp32_path = export_model(weights, "onnx", imgsz)
+    int8_path = exported_path(weights, "onnx_int8")
+    fp32_model = onnx.load(str(fp32_path))
+    head_nodes = [n.name for n in fp32_model.graph.node if n.name.startswith(HEAD_NODE_PREFIX)]
+
+    if mode == "dynamic":
+        quantize_dynamic(
+            str(fp32_path), str(int8_path),
+            weight_type=QuantType.QUInt8,
+            nodes_to_exclude=head_nodes
+        )
+    elif mode == "static":
+        paths = upload_images(calibration_images)
+        if not paths:
+            raise RuntimeError(f"No uploaded images in {UPLOAD_DIR} to calibrate on - upload some or use mode='dynamic'")
+        print(f"[INT8] Calibrating on {len(paths)} uploaded images...")
+        reader = _calibration_reader(paths, fp32_model.graph.input[0].name, imgsz)
+        quantize_static(
+            str(fp32_path), str(int8_path), reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=head_nodes
+        )
+    else:
+        raise ValueError(f"Unknown quantization mode: {mode} (use 'static' or 'dynamic')")
+
+    # ultralytics reads class names/stride from the ONNX metadata - carry it over
+    int8_model = onnx.load(str(int8_path))
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, str(int8_path))
+    forget_resolved()  # any earlier report is stale now
+    print(f"[INT8] Wrote {int8_path}")
+    return int8_path
+
+
+def load_ground_truth() -> Dict[str, dict]:
+    """
+    Ground truth recorded through /api/validate, per image_id:
+    - truth:  boxes marked correct (TP) + manually added boxes (FN)
+    - ignore: boxes nobody has reviewed yet (neither right nor wrong)
+    Boxes marked incorrect (FP) are in neither list.
+    Only images with at least one reviewed or manual box are returned.
+    """
+    ground_truth = {}
+    for session_id in validation_store.session_ids():
+        try:
+            session_data = validation_store.load(session_id)
+        except (OSError, ValueError):
+            continue
+        if session_data is None:
+            continue
+        for img in session_data.get("images", []):
+            boxes = img.get("boxes", [])
+            if not any(b.get("is_verified") or b.get("is_manual") for b in boxes):
+                continue
+            ground_truth[img["image_id"]] = {
+                "truth": [b for b in boxes if b.get("is_manual") or (b.get("is_verified") and b.get("is_correct", True))],
+                "ignore": [b for b in boxes if not b.get("is_verified") and not b.get("is_manual")]
+            }
+    return ground_truth
+
+
+def find_upload(image_id: str) -> Optional[Path]:
+    record = image_index.get(image_id)
+    return record.path if record is not None else None
+
+
+def evaluate(model, ground_truth: Dict[str, dict]) -> dict:
+    """Precision/recall of model against user ground truth (IoU >= 0.5, same class)."""
+    tp = fp = fn = images = 0
+    for image_id, gt in ground_truth.items():
+        path = find_upload(image_id)
+        if path is None:
+            continue
+        images += 1
+        predicted = parse_result(model.predict(read_image(path), **PREDICT_KWARGS)[0])
+
+        matched = match_boxes(predicted, gt["truth"])
+        matched_pred = {p for p, _ in matched}
+        # predictions that only overlap unreviewed boxes don't count either way
+        rest = [i for i in range(len(predicted)) if i not in matched_pred]
+        ignored = {rest[p] for p, _ in match_boxes([predicted[i] for i in rest], gt["ignore"])}
+
+        tp += len(matched)
+        fp += len(predicted) - len(matched) - len(ignored)
+        fn += len(gt["truth"]) - len(matched)
+
+    return {
+        "images": images,
+        "true_positives": tp,
+        "false_positives": fp,
+        "false_negatives": fn,
+        "precision": round(tp / (tp + fp), 4) if tp + fp else 0.0,
+        "recall": round(tp / (tp + fn), 4) if tp + fn else 0.0
+    }
+
+
+def guardrail_verdict(fp32: dict, int8: dict) -> dict:
+    """Precision/recall drop from FP32 to INT8 and whether it stays within the allowed drops."""
+    precision_drop = round(fp32["precision"] - int8["precision"], 4)
+    recall_drop = round(fp32["recall"] - int8["recall"], 4)
+    return {
+        "precision_drop": precision_drop,
+        "recall_drop": recall_drop,
+        "max_precision_drop": INT8_MAX_PRECISION_DROP,
+        "max_recall_drop": INT8_MAX_RECALL_DROP,
+        "passed": (
+            fp32["images"] > 0
+            and precision_drop <= INT8_MAX_PRECISION_DROP
+            and recall_drop <= INT8_MAX_RECALL_DROP
+        )
+    }
+
+
+def run_guardrail(weights: str = YOLO_MODEL_WEIGHTS) -> dict:
+    """Compare FP32 vs INT8 on user ground truth and save the verdict next to the model."""
+    from ultralytics import YOLO
+
+    ground_truth = load_ground_truth()
+    int8_path = exported_path(weights, "onnx_int8")
+    fp32 = evaluate(YOLO(str(export_model(weights, "onnx")), task="detect"), ground_truth)
+    int8 = evaluate(YOLO(str(int8_path), task="detect"), ground_truth)
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "weights": weights,
+        "int8_model_mtime": int8_path.stat().st_mtime,  # which INT8 build this verdict is about
+        "fp32": fp32,
+        "int8": int8,
+        **guardrail_verdict(fp32, int8)
+    }
+    with open(report_path(weights), "w") as f:
+        json.dump(report, f, indent=2)
+    forget_resolved()
+    return report
+
+
+def guardrail_passed(weights: str = YOLO_MODEL_WEIGHTS) -> bool:
+    """True only if an INT8 model exists and its saved guardrail report passed for that model."""
+    int8_path = exported_path(weights, "onnx_int8")
+    if not int8_path.exists():
+        return False
+    try:
+        with open(report_path(weights), "r") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if report.get("int8_model_mtime") != int8_path.stat().st_mtime:
+        print(f"[INT8] Guardrail report predates {int8_path.name} - rerun the guardrail")
+        return False
+    return bool(report.get("passed"))
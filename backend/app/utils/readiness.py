@@ -0,0 +1,74 @@
+"""
+Model readiness tracking for the /ready probe.
+
+/health only says the process is alive. /ready says whether the model
+is loaded and warmed, so an orchestrator can hold traffic back until the
+first request will not pay for loading weights and the dummy warmup.
+"""
+import threading
+import time
+from typing import Optional
+
+# Lifecycle: cold -> loading -> ready | failed
+COLD = "cold"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class Readiness:
+    """
+    Load state plus load/warmup timings, one entry per loaded model
+    (per executor thread, replica pool or alternate backend).
+    Thread-safe: models are loaded on executor threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = COLD
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.models = {}
+
+    def begin(self):
+        with self._lock:
+            self.state = LOADING
+            self.error = None
+            self.started_at = time.perf_counter()
+            self.finished_at = None
+
+    def record(self, name: str, load_ms: float, warmup_ms: float):
+        """Timings for one model that has finished loading and warming up."""
+        with self._lock:
+            self.models[name] = {
+                "load_ms": round(load_ms, 1),
+                "warmup_ms": round(warmup_ms, 1)
+            }
+
+    def finish(self):
+        with self._lock:
+            self.state = READY
+            self.finished_at = time.perf_counter()
+
+    def fail(self, error: str):
+        with self._lock:
+            self.state = FAILED
+            self.error = error
+            self.finished_at = time.perf_counter()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total_ms = None
+            if self.started_at is not None and self.finished_at is not None:
+                total_ms = round((self.finished_at - self.started_at) * 1000, 1)
+            return {
+                "state": self.state,
+                "error": self.error,
+                "startup_ms": total_ms,
+                "models": {name: dict(timings) for name, timings in self.models.items()}
+            }
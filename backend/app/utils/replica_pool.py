@@ -0,0 +1,281 @@
+"""
+Multi-process YOLO replica pool.
+
+A single interpreter can only use so much CPU, and torch intra-op threads
+stop scaling well past a few cores. The pool runs N worker processes, each
+with its own YOLO replica pinned to a slice of cores.
+
+Decoded images are handed over through shared memory; only the small
+segment names and the resulting Detections (one small array per image)
+cross the process boundary.
+A replica that dies is respawned before the next batch is sent.
+"""
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+from app.utils.backends import export_model
+from app.utils.detections import Detections
+from app.config.inference import (
+    INFERENCE_BACKEND,
+    INFERENCE_REPLICAS,
+    INFERENCE_THREADS_PER_REPLICA,
+    REPLICA_START_TIMEOUT_SECONDS,
+    REPLICA_RESULT_TIMEOUT_SECONDS,
+    YOLO_MODEL_WEIGHTS
+)
+
+
+def core_slices(replicas: int, threads: int) -> List[List[int]]:
+    """Split the cores we may run on into one slice per replica."""
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    slices = []
+    for i in range(replicas):
+        start = (i * threads) % len(cores)
+        slices.append([cores[(start + j) % len(cores)] for j in range(min(threads, len(cores)))])
+    return slices
+
+
+def _serve(index, predict, tasks, results):
+    """Replica loop: run each batch's images through predict() until told to stop."""
+    results.put(("ready", index, None))
+    while True:
+        message = tasks.get()
+        if message is None:
+            break
+        job_id, specs = message
+        segments = []
+        images = None
+        try:
+            segments = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+            images = [
+                np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+                for shm, (_, shape, dtype) in zip(segments, specs)
+            ]
+            results.put((job_id, index, predict(images)))
+        except FileNotFoundError:
+            # The caller timed out and unlinked the segments while the job sat in the queue
+            results.put((job_id, index, RuntimeError(f"Replica {index}: batch {job_id} was abandoned")))
+        except Exception as e:
+            results.put((job_id, index, RuntimeError(f"Replica {index} failed: {e}")))
+        finally:
+            # Drop every view before closing the segments
+            images = None
+            for shm in segments:
+                shm.close()
+
+
+def _worker_main(index, cores, threads, backend, weights, predict_kwargs, tasks, results):
+    """Replica process: load the model once, then serve batches until told to stop."""
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    import torch
+    from app.utils.backends import load_backend_model
+
+    torch.set_num_threads(threads)
+    torch.manual_seed(42)
+    yolo = load_backend_model(backend, weights)
+    yolo.predict(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+
+    def predict(images):
+        # Results keep a reference to orig_img - only the (N, 6) detection arrays leave this function
+        return [Detections.from_result(r) for r in yolo.predict(images, **predict_kwargs)]
+
+    _serve(index, predict, tasks, results)
+
+
+class ReplicaPool:
+    """
+    Pool of YOLO worker processes fed through shared memory.
+
+    predict() is blocking and thread-safe; call it from the inference
+    executor. The pool starts lazily on first use. Every replica has its
+    own task queue and a batch goes to the replica with the fewest batches
+    in flight, so a replica that dies - even while blocked reading its
+    queue - can be replaced by a fresh process and queue.
+    """
+
+    def __init__(
+        self,
+        size: int = INFERENCE_REPLICAS,
+        threads_per_replica: int = INFERENCE_THREADS_PER_REPLICA,
+        weights: str = YOLO_MODEL_WEIGHTS,
+        backend: str = INFERENCE_BACKEND,
+        predict_kwargs: Optional[dict] = None,
+        result_timeout: float = REPLICA_RESULT_TIMEOUT_SECONDS,
+        worker=_worker_main
+    ):
+        self.size = max(1, size)
+        self.threads_per_replica = max(1, threads_per_replica)
+        self.weights = weights
+        self.backend = backend
+        self.predict_kwargs = predict_kwargs or {}
+        self.result_timeout = result_timeout
+        self.worker = worker
+        self._lock = threading.RLock()
+        self._jobs = {}  # job_id -> (Future, replica index)
+        self._ids = itertools.count()
+        self._processes = []
+        self._tasks = []  # one queue per replica
+        self._inflight = [0] * self.size
+        self._ready = set()
+        self._served = [0] * self.size
+        self._respawned = 0
+        self._cores = []
+        self._ctx = None
+        self._results = None
+        self._collector = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self._processes)
+
+    def start(self):
+        with self._lock:
+            if self._processes:
+                return
+            # Export once here so replicas don't race to write the same artifact
+            export_model(self.weights, self.backend)
+            # spawn, not fork: forking a process that already has torch threads is unsafe
+            self._ctx = mp.get_context("spawn")
+            self._results = self._ctx.Queue()
+            self._cores = core_slices(self.size, self.threads_per_replica)
+            self._tasks = [None] * self.size
+            self._processes = [self._spawn(index) for index in range(self.size)]
+
+            # Wait until every replica has loaded and warmed its model
+            while len(self._ready) < self.size:
+                try:
+                    kind, index, _ = self._results.get(timeout=REPLICA_START_TIMEOUT_SECONDS)
+                except queue.Empty:
+                    raise RuntimeError(f"Only {len(self._ready)}/{self.size} replicas started")
+                if kind == "ready":
+                    self._ready.add(index)
+
+            self._collector = threading.Thread(target=self._collect, name="replica-collector", daemon=True)
+            self._collector.start()
+            print(f"[REPLICAS] Started {self.size} replicas x {self.threads_per_replica} threads")
+
+    def _spawn(self, index: int):
+        self._tasks[index] = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=self.worker,
+            args=(index, self._cores[index], self.threads_per_replica, self.backend, self.weights,
+                  self.predict_kwargs, self._tasks[index], self._results),
+            name=f"yolo-replica-{index}",
+            daemon=True
+        )
+        proc.start()
+        return proc
+
+    def _revive(self):
+        """Respawn replicas that died (crash, OOM kill) and fail the batches they held."""
+        with self._lock:
+            for index, proc in enumerate(self._processes):
+                if proc.is_alive():
+                    continue
+                print(f"[REPLICAS] Replica {index} exited ({proc.exitcode}) - respawning")
+                for job_id, (future, owner) in list(self._jobs.items()):
+                    if owner == index:
+                        del self._jobs[job_id]
+                        future.set_exception(RuntimeError(f"Replica {index} exited ({proc.exitcode})"))
+                self._ready.discard(index)
+                self._processes[index] = self._spawn(index)
+                self._respawned += 1
+
+    def _collect(self):
+        """Route results coming back from the workers to the waiting callers."""
+        while True:
+            try:
+                job_id, index, payload = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._revive()  # notice dead replicas even when nobody is calling predict()
+                continue
+            except (EOFError, OSError):
+                return
+            if job_id is None:
+                return
+            if job_id == "ready":  # a respawned replica finished loading
+                self._ready.add(index)
+                continue
+            self._served[index] += 1
+            with self._lock:
+                future, _ = self._jobs.pop(job_id, (None, None))
+            if future is None:
+                continue  # the caller already gave up
+            if isinstance(payload, Exception):
+                future.set_exception(payload)
+            else:
+                future.set_result(payload)
+
+    def predict(self, images: List[np.ndarray]) -> List[Detections]:
+        """Run one batch of decoded images on the least busy replica."""
+        if not self.started:
+            self.start()
+        self._revive()
+
+        segments = []
+        try:
+            specs = []
+            for img in images:
+                img = np.ascontiguousarray(img)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, img.nbytes))
+                segments.append(shm)
+                np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[:] = img
+                specs.append((shm.name, img.shape, img.dtype.str))
+
+            job_id = next(self._ids)
+            future = Future()
+            with self._lock:
+                index = min(range(self.size), key=lambda i: self._inflight[i])
+                self._inflight[index] += 1
+                self._jobs[job_id] = (future, index)
+                self._tasks[index].put((job_id, specs))
+            try:
+                return future.result(timeout=self.result_timeout)
+            finally:
+                with self._lock:
+                    self._jobs.pop(job_id, None)
+                    self._inflight[index] -= 1
+        finally:
+            # A replica that still gets to this batch finds the segments gone and reports it abandoned
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+
+    def stats(self) -> dict:
+        return {
+            "replicas": self.size,
+            "backend": self.backend,
+            "threads_per_replica": self.threads_per_replica,
+            "started": self.started,
+            "alive": sum(1 for p in self._processes if p.is_alive()),
+            "respawned": self._respawned,
+            "in_flight": list(self._inflight),
+            "batches_served": list(self._served)
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if not self._processes:
+                return
+            processes, self._processes = self._processes, []  # the collector stops respawning
+            for tasks in self._tasks:
+                tasks.put(None)
+            for proc in processes:
+                proc.join(timeout=5)
+                if proc.is_alive():
+                    proc.terminate()
+            self._results.put((None, 0, None))
+            self._ready = set()
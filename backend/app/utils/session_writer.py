@@ -0,0 +1,149 @@
+"""
+Per-session write coalescing and optimistic concurrency for validation edits.
+
+Routes hand their store calls to session_writer.submit() instead of
+calling the store directly. Writes for a session that arrive within
+VALIDATION_COALESCE_MS of each other are applied together inside one
+store batch() - one transaction / file write / journal write - on a
+worker thread, and every caller then gets its own results. Flushes of
+one session never overlap (per-session asyncio lock), so edits from two
+tabs are applied one after the other instead of overwriting each other.
+
+Every applied write bumps the session's version, exposed as an ETag.
+A write sent with If-Match is only applied if the session is still at
+that version; otherwise the caller gets PreconditionFailed (412) and
+should reload. The versions live in memory, prefixed with a per-process
+epoch, so ETags from before a restart simply stop matching.
+"""
+import asyncio
+import threading
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config.inference import VALIDATION_COALESCE_MS
+from app.utils.validation_store import (
+    BoxNotFound,
+    ImageNotFound,
+    SessionNotFound,
+    ValidationStore,
+    validation_store
+)
+
+# ("update_box", (box_id, changes)) -> validation_store.update_box(session_id, box_id, changes)
+StoreCall = Tuple[str, tuple]
+
+# Per-call failures handed back as results; anything else fails the whole flush
+NOT_FOUND = (SessionNotFound, ImageNotFound, BoxNotFound)
+
+
+class PreconditionFailed(Exception):
+    """If-Match didn't match the session's current version."""
+
+    def __init__(self, etag: str):
+        super().__init__(f"Session changed (now {etag}) - reload and retry")
+        self.etag = etag
+
+
+def etag_matches(if_match: str, etag: str) -> bool:
+    candidates = [tag.strip().removeprefix("W/") for tag in if_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class SessionWriter:
+    def __init__(self, store: ValidationStore = validation_store, window_ms: float = VALIDATION_COALESCE_MS):
+        self.store = store
+        self.window = window_ms / 1000
+        self._epoch = uuid.uuid4().hex[:8]
+        self._versions = {}  # session_id -> int
+        self._versions_lock = threading.Lock()  # bumped on flush threads and by inference on the event loop
+        self._pending = {}  # session_id -> [(calls, if_match, future)]
+        self._locks = {}  # session_id -> [asyncio.Lock, users] (one flush at a time per session)
+        self.counters = {"writes": 0, "flushes": 0, "conflicts": 0}
+
+    def etag(self, session_id: str) -> str:
+        return f'"{self._epoch}-{self._versions.get(session_id, 0)}"'
+
+    def touch(self, session_id: str):
+        """Record a change made outside submit() (e.g. inference adding images)."""
+        with self._versions_lock:
+            self._versions[session_id] = self._versions.get(session_id, 0) + 1
+
+    async def submit(
+        self,
+        session_id: str,
+        calls: Sequence[StoreCall],
+        if_match: Optional[str] = None
+    ) -> Tuple[List, str]:
+        """
+        Apply store calls for the session as one write, coalesced with
+        other writes arriving in the same window. Returns (results, etag):
+        one result per call - its return value, or the *NotFound error it
+        raised - and the session's ETag right after this write.
+        Raises PreconditionFailed if if_match is stale.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(session_id)
+        if batch is None:
+            batch = self._pending[session_id] = []
+            loop.call_later(self.window, lambda: asyncio.ensure_future(self._flush(session_id, batch)))
+        batch.append((list(calls), if_match, future))
+        self.counters["writes"] += 1
+        outcome = await future
+        if isinstance(outcome, PreconditionFailed):
+            raise outcome
+        return outcome
+
+    async def _flush(self, session_id: str, batch: list):
+        if self._pending.get(session_id) is batch:
+            del self._pending[session_id]  # later writes start the next batch
+        entry = self._locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1  # flushes holding or waiting for the lock
+        try:
+            async with entry[0]:
+                await self._run(session_id, batch)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+    async def _run(self, session_id: str, batch: list):
+        try:
+            outcomes = await asyncio.get_running_loop().run_in_executor(None, self._apply, session_id, batch)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), outcome in zip(batch, outcomes):
+                if not future.done():  # the caller may have gone away
+                    future.set_result(outcome)
+
+    def _apply(self, session_id: str, batch: list) -> list:
+        """Run on a worker thread: every write of the batch inside one store batch."""
+        outcomes = []
+        with self.store.batch(session_id):
+            for calls, if_match, _ in batch:
+                if if_match is not None and not etag_matches(if_match, self.etag(session_id)):
+                    self.counters["conflicts"] += 1
+                    outcomes.append(PreconditionFailed(self.etag(session_id)))
+                    continue
+                results = []
+                for method, args in calls:
+                    try:
+                        results.append(getattr(self.store, method)(session_id, *args))
+                    except NOT_FOUND as e:
+                        results.append(e)
+                if any(not isinstance(result, NOT_FOUND) for result in results):
+                    self.touch(session_id)
+                outcomes.append((results, self.etag(session_id)))
+        self.counters["flushes"] += 1
+        return outcomes
+
+    def stats(self) -> Dict[str, float]:
+        writes, flushes = self.counters["writes"], self.counters["flushes"]
+        return {**self.counters, "writes_per_flush": round(writes / flushes, 2) if flushes else 0.0}
+
+
+# Global instance
+session_writer = SessionWriter()
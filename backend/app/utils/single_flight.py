@@ -0,0 +1,60 @@
+"""
+Single-flight coalescing of identical concurrent work.
+
+Double-clicks and frontend retries send the same /api/infer twice at
+once. The first call for a key starts the computation; calls for the
+same key arriving while it runs wait for that computation and get its
+result instead of starting their own. The computation is only
+cancelled once every caller waiting for it has gone away, so one
+impatient client can't take the result away from the others.
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable, Tuple
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}  # key -> _Flight
+        self.counters = {"leaders": 0, "followers": 0, "abandoned": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """
+        Result of fn() for key, shared with concurrent callers of the same
+        key. Returns (result, shared) - shared is True when this call
+        joined a computation another caller started.
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda _: self._finished(key, flight))
+            self.counters["leaders"] += 1
+        else:
+            self.counters["followers"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()  # every caller gave up - drop the work
+                self.counters["abandoned"] += 1
+
+    def _finished(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Retrieve the exception so a failure nobody waits for isn't logged as "never retrieved"
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> dict:
+        return {**self.counters, "in_flight": len(self._flights)}
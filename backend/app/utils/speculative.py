@@ -0,0 +1,92 @@
+"""
+Speculative inference started at upload time.
+
+Users almost always ask for detections right after uploading, so with
+SPECULATIVE_INFERENCE on, the upload handler starts the inference job
+itself. A later /api/infer for the same (image_id, model) takes the job
+over: it waits for it if it is still running, or uses its result if it
+already finished. Nothing is persisted until that request arrives.
+
+Speculative jobs are low priority: one is only started while the model
+is idle and at most SPECULATIVE_MAX_INFLIGHT run at once, so they never
+hold up requests somebody is actually waiting for. Unclaimed results
+are dropped after SPECULATIVE_RESULT_TTL_SECONDS.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Hashable, Optional
+
+from app.config.inference import SPECULATIVE_MAX_INFLIGHT, SPECULATIVE_RESULT_TTL_SECONDS
+
+
+class Speculator:
+    def __init__(self, max_inflight: int = SPECULATIVE_MAX_INFLIGHT, ttl_seconds: float = SPECULATIVE_RESULT_TTL_SECONDS):
+        self.max_inflight = max_inflight
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}  # key -> (task, started_at)
+        self.counters = {
+            "started": 0,
+            "skipped_busy": 0,
+            "attached": 0,  # claimed while still running
+            "completed_hits": 0,  # claimed after it finished
+            "failed": 0,
+            "expired": 0
+        }
+
+    def inflight(self) -> int:
+        return sum(1 for task, _ in self._jobs.values() if not task.done())
+
+    def start(self, key: Hashable, job: Callable[[], Awaitable], busy: bool = False) -> bool:
+        """
+        Start job() as a background task under key, unless the model is
+        busy, too many speculative jobs run already, or key has one.
+        Must be called on the event loop.
+        """
+        self.purge_expired()
+        if key in self._jobs:
+            return False
+        if busy or self.inflight() >= self.max_inflight:
+            self.counters["skipped_busy"] += 1
+            return False
+        task = asyncio.ensure_future(job())
+        task.add_done_callback(self._finished)
+        self._jobs[key] = (task, time.monotonic())
+        self.counters["started"] += 1
+        return True
+
+    def _finished(self, task: asyncio.Task):
+        # Retrieve the exception so an unclaimed failure isn't logged as "never retrieved"
+        if not task.cancelled() and task.exception() is not None:
+            self.counters["failed"] += 1
+
+    def take(self, key: Hashable) -> Optional[asyncio.Task]:
+        """Claim the job for key (running or finished), or None. A job is only handed out once."""
+        item = self._jobs.pop(key, None)
+        if item is None:
+            return None
+        task, started = item
+        if task.done() and time.monotonic() - started > self.ttl_seconds:
+            self.counters["expired"] += 1
+            return None
+        self.counters["completed_hits" if task.done() else "attached"] += 1
+        return task
+
+    def purge_expired(self) -> int:
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, (task, started) in self._jobs.items() if task.done() and started < cutoff]
+        for key in expired:
+            del self._jobs[key]
+        self.counters["expired"] += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "inflight": self.inflight(),
+            "unclaimed": len(self._jobs),
+            "max_inflight": self.max_inflight
+        }
+
+
+# Global instance
+speculator = Speculator()
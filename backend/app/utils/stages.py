@@ -0,0 +1,103 @@
+"""
+Per-stage latency breakdown of the inference path.
+
+Every /api/infer request carries a StageTimer through file read,
+decode, preprocessing, the batcher queue, the forward pass, NMS, box
+parsing and the validation JSON write ("speculative" is time spent
+waiting on a job started at upload, see app/utils/speculative.py).
+The request's breakdown goes into its response metrics and into
+rolling per-stage windows (StageHistograms) served by
+/api/inference/stages.
+
+Timers are plain perf_counter_ns() differences appended to lists
+(list.append is atomic, so tiles running on several executor threads
+can report into the same timer without a lock).
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from app.config.inference import INFERENCE_STATS_WINDOW
+from app.utils.batcher import percentile
+
+STAGES = ("read", "decode", "preprocess", "queue", "forward", "nms", "parse", "speculative", "write")
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+
+class StageTimer:
+    """Time spent per stage by one request (a stage may be entered several times)."""
+
+    __slots__ = ("ns", "started_ns", "queued_ns")
+
+    def __init__(self):
+        self.ns: Dict[str, List[int]] = {}
+        self.started_ns = time.perf_counter_ns()
+        self.queued_ns: Optional[int] = None  # set when the request enters the batcher
+
+    def add(self, stage: str, ns: int):
+        self.ns.setdefault(stage, []).append(ns)
+
+    def since(self, stage: str, t0_ns: int) -> int:
+        """Charge everything since t0_ns (a perf_counter_ns() value) to stage; returns now."""
+        now = time.perf_counter_ns()
+        self.add(stage, now - t0_ns)
+        return now
+
+    def breakdown(self) -> dict:
+        """{stage: ms} for the stages this request went through, plus total and unaccounted time."""
+        total = time.perf_counter_ns() - self.started_ns
+        stages = {stage: sum(self.ns[stage]) for stage in STAGES if stage in self.ns}
+        return {
+            "stages_ms": {stage: round(ns / 1e6, 3) for stage, ns in stages.items()},
+            "total_ms": round(total / 1e6, 3),
+            "other_ms": round(max(0, total - sum(stages.values())) / 1e6, 3)
+        }
+
+
+class StageHistograms:
+    """Rolling per-stage latency windows over the last `window` requests."""
+
+    def __init__(self, window: int = INFERENCE_STATS_WINDOW):
+        self.window = window
+        self.requests = 0
+        self._samples = {stage: deque(maxlen=window) for stage in (*STAGES, "total")}
+        self._lock = threading.Lock()
+
+    def record(self, breakdown: dict):
+        with self._lock:
+            self.requests += 1
+            for stage, ms in breakdown["stages_ms"].items():
+                self._samples[stage].append(ms)
+            self._samples["total"].append(breakdown["total_ms"])
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+        total_sum = sum(samples["total"])
+        stages = {}
+        for stage, values in samples.items():
+            if not values:
+                continue
+            counts = [0] * (len(BUCKETS_MS) + 1)
+            for ms in values:
+                counts[next((i for i, bound in enumerate(BUCKETS_MS) if ms <= bound), len(BUCKETS_MS))] += 1
+            labels = [f"<={bound}" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+            stages[stage] = {
+                "count": len(values),
+                "avg": round(sum(values) / len(values), 3),
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "p99": round(percentile(values, 99), 3),
+                "max": round(max(values), 3),
+                # share of all request time in the window spent in this stage
+                "share": round(sum(values) / total_sum, 3) if total_sum and stage != "total" else None,
+                "histogram_ms": dict(zip(labels, counts))
+            }
+        return {"requests": self.requests, "window": self.window, "stages": stages}
+
+
+# Global instance
+stage_stats = StageHistograms()
@@ -0,0 +1,100 @@
+"""
+Tiled inference for high-resolution images.
+
+At imgsz=640 a 6000x4000 photo is shrunk ~9x and small objects vanish.
+Instead the image is cut into overlapping tiles at native resolution,
+the tiles are predicted in batches, their boxes are shifted back into
+full-image coordinates, and duplicates along tile borders are merged.
+
+Merging compares boxes with IoS (intersection over the smaller box) by
+default: an object cut by a tile border shows up whole in one tile and
+as a sliver in the next, and the sliver barely overlaps in IoU terms
+but sits entirely inside the whole box.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from app.utils.detections import iou_matrix
+
+
+def tile_grid(width: int, height: int, tile: int = 640, overlap: float = 0.2) -> List[Tuple[int, int, int, int]]:
+    """
+    (x0, y0, x1, y1) windows covering the image. Neighbours overlap by
+    at least overlap * tile pixels; the last row/column is aligned to the
+    image edge instead of running past it.
+    """
+    def starts(size: int) -> List[int]:
+        if size <= tile:
+            return [0]
+        stride = max(1, int(tile * (1 - overlap)))
+        positions = list(range(0, size - tile, stride))
+        positions.append(size - tile)
+        return positions
+
+    return [
+        (x0, y0, min(x0 + tile, width), min(y0 + tile, height))
+        for y0 in starts(height)
+        for x0 in starts(width)
+    ]
+
+
+def shift_boxes(rows: np.ndarray, dx: float, dy: float) -> np.ndarray:
+    """Move tile-local (N, 6) detection rows into full-image coordinates."""
+    return rows + np.array([dx, dy, dx, dy, 0, 0], dtype=rows.dtype)
+
+
+def ios_matrix(a, b):
+    """Pairwise intersection over the smaller box's area -> (N, M)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    smaller = np.minimum(area_a[:, None], area_b[None, :])
+    return np.where(smaller > 0, inter / np.maximum(smaller, 1e-9), 0.0)
+
+
+def merge_boxes(
+    rows: np.ndarray,
+    method: str = "nms",
+    metric: str = "ios",
+    threshold: float = 0.5
+) -> np.ndarray:
+    """
+    Merge duplicates of the same class among (N, 6) detection rows
+    (COLUMNS order), highest confidence first.
+
+    - nms: keep the most confident box of each overlapping group
+    - wbf: replace the group by its confidence-weighted mean box
+      (keeps the top confidence)
+
+    Returns rows sorted by confidence, like YOLO's own output.
+    """
+    if method not in ("nms", "wbf"):
+        raise ValueError(f"Unknown merge method: {method} (use 'nms' or 'wbf')")
+    if metric not in ("iou", "ios"):
+        raise ValueError(f"Unknown merge metric: {metric} (use 'iou' or 'ios')")
+    if not len(rows):
+        return rows.reshape(-1, 6)
+
+    rows = rows[np.argsort(-rows[:, 4], kind="stable")]
+    coords, confs, classes = rows[:, :4], rows[:, 4], rows[:, 5]
+    overlap = (ios_matrix if metric == "ios" else iou_matrix)(coords, coords)
+    overlap = np.where(classes[:, None] == classes[None, :], overlap, 0.0)
+
+    merged = []
+    taken = np.zeros(len(rows), dtype=bool)
+    for i in range(len(rows)):
+        if taken[i]:
+            continue
+        group = np.union1d(np.flatnonzero(~taken & (overlap[i] >= threshold)), [i])
+        taken[group] = True
+        row = rows[i].copy()
+        if method == "wbf" and len(group) > 1:
+            weights = confs[group][:, None]
+            row[:4] = (coords[group] * weights).sum(axis=0) / weights.sum()
+        merged.append(row)
+    return np.stack(merged)
@@ -7,31 +7,114 @@ Replaces proxy metrics with real classification metrics:
 - False Negatives (FN): Missed objects
 - Precision, Recall, F1 Score
 """
-from typing import List
+from typing import Dict, Iterable, List, Optional, Union
 from app.schemas.validation import GroundTruthBox, TrueMetrics
 
+Box = Union[GroundTruthBox, dict]
 
-def calculate_true_metrics(
-    boxes: List[GroundTruthBox],
-    yolo_metrics: dict
-) -> TrueMetrics:
+
+def _flag(box: Box, name: str, default: bool) -> bool:
+    if isinstance(box, dict):
+        value = box.get(name)
+        return default if value is None else bool(value)
+    return bool(getattr(box, name))
+
+
+class Counts:
+    """
+    Running TP/FP/FN/verified counts. A box's contribution depends only
+    on its own flags, so every state change (review, re-review, manual
+    add, delete) is one remove() + add() - O(1) however many boxes there are.
+    """
+    __slots__ = ("true_positives", "false_positives", "false_negatives", "verified", "boxes")
+
+    def __init__(self):
+        self.true_positives = self.false_positives = self.false_negatives = self.verified = self.boxes = 0
+
+    def _apply(self, box: Box, sign: int):
+        verified = _flag(box, "is_verified", False)
+        manual = _flag(box, "is_manual", False)
+        correct = _flag(box, "is_correct", True)
+        self.boxes += sign
+        self.verified += sign * verified
+        # TP/FP count reviewed model detections; every manual box is a missed object (FN)
+        self.true_positives += sign * (verified and correct and not manual)
+        self.false_positives += sign * (verified and not correct and not manual)
+        self.false_negatives += sign * manual
+
+    def add(self, box: Box):
+        self._apply(box, 1)
+
+    def remove(self, box: Box):
+        self._apply(box, -1)
+
+    def copy(self) -> "Counts":
+        counts = Counts()
+        for name in self.__slots__:
+            setattr(counts, name, getattr(self, name))
+        return counts
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SessionCounts:
+    """Counts for a whole session plus one Counts per image."""
+
+    def __init__(self):
+        self.total = Counts()
+        self.images: Dict[str, Counts] = {}
+        self.yolo_metrics = {}  # of the most recent image, reported next to the true metrics
+
+    @classmethod
+    def from_session(cls, session_data: dict) -> "SessionCounts":
+        """Full scan - done once, then kept current with change()."""
+        counts = cls()
+        counts.add_images(session_data.get("images", []))
+        return counts
+
+    def add_images(self, images: Iterable[dict]):
+        for img in images:
+            image = self.images.setdefault(img["image_id"], Counts())
+            for box in img.get("boxes", []):
+                image.add(box)
+                self.total.add(box)
+            if img.get("yolo_metrics"):
+                self.yolo_metrics = img["yolo_metrics"]
+
+    def change(self, image_id: str, old: Optional[Box], new: Optional[Box]):
+        """One box changed state: old=None for an added box, new=None for a deleted one."""
+        image = self.images.setdefault(image_id, Counts())
+        if old is not None:
+            image.remove(old)
+            self.total.remove(old)
+        if new is not None:
+            image.add(new)
+            self.total.add(new)
+
+    def copy(self) -> "SessionCounts":
+        counts = SessionCounts()
+        counts.total = self.total.copy()
+        counts.images = {image_id: image.copy() for image_id, image in self.images.items()}
+        counts.yolo_metrics = self.yolo_metrics
+        return counts
+
+    def metrics(self) -> TrueMetrics:
+        return metrics_from_counts(self.total, self.yolo_metrics)
+
+
+def metrics_from_counts(counts: Counts, yolo_metrics: dict) -> TrueMetrics:
     """
-    Calculate true classification metrics from verified boxes.
+    Precision, recall, F1 and true FP rate from running counts.
     
     Args:
-        boxes: List of boxes with ground truth validation
+        counts: TP/FP/FN/verified counts
         yolo_metrics: Original YOLO metrics (fps, avg_conf, box_count)
     
     Returns:
         TrueMetrics with precision, recall, F1, true FP rate
-    
-    Security: All inputs validated by Pydantic schemas.
     """
-    
-    # Filter verified boxes only
-    verified_boxes = [b for b in boxes if b.is_verified]
-    
-    if not verified_boxes:
+    if counts.verified == 0:
         # No verification yet - return empty metrics
         return TrueMetrics(
             true_positives=0,
@@ -47,15 +130,10 @@ def calculate_true_metrics(
             yolo_fps=yolo_metrics.get('fps', 0.0)
         )
     
-    # Count TP and FP from YOLO detections
-    true_positives = sum(1 for b in verified_boxes if b.is_correct and not b.is_manual)
-    false_positives = sum(1 for b in verified_boxes if not b.is_correct and not b.is_manual)
-    
-    # Count FN: Manually added boxes represent objects YOLO missed
-    false_negatives = sum(1 for b in boxes if b.is_manual)
-    
-    # Calculate metrics
-    total_verified = len(verified_boxes)
+    true_positives = counts.true_positives
+    false_positives = counts.false_positives
+    false_negatives = counts.false_negatives
+    total_verified = counts.verified
     
     # Precision: TP / (TP + FP)
     # "Of all detections, how many were correct?"
@@ -95,6 +173,29 @@ def calculate_true_metrics(
     )
 
 
+def calculate_true_metrics(
+    boxes: List[Box],
+    yolo_metrics: dict
+) -> TrueMetrics:
+    """
+    Calculate true classification metrics from verified boxes (full
+    recompute - the API keeps SessionCounts current instead).
+    
+    Args:
+        boxes: List of boxes with ground truth validation
+        yolo_metrics: Original YOLO metrics (fps, avg_conf, box_count)
+    
+    Returns:
+        TrueMetrics with precision, recall, F1, true FP rate
+    
+    Security: All inputs validated by Pydantic schemas.
+    """
+    counts = Counts()
+    for box in boxes:
+        counts.add(box)
+    return metrics_from_counts(counts, yolo_metrics)
+
+
 def update_box_validation(
     boxes: List[GroundTruthBox],
     box_id: str,
@@ -107,7 +208,8 @@ def update_box_validation(
     
     Args:
         boxes: List of all boxes
-        box_id: ID of box to update (format: "session_id_index")
+        box_id: ID of box to update - matched against each box's box_id;
+            boxes without ids fall back to the trailing index ("session_id_index")
         is_correct: Whether this is a true positive
         confidence_override: Optional user-adjusted confidence
         notes: Optional annotation notes
@@ -120,14 +222,16 @@ def update_box_validation(
     """
     from datetime import datetime
     
-    # Find box by ID
-    # Box ID format: "session_id_0", "session_id_1", etc.
+    # Find box by ID - positions shift once a box is deleted, ids don't
+    box = next((b for b in boxes if b.box_id == box_id), None)
     try:
-        index = int(box_id.split('_')[-1])
-        if index < 0 or index >= len(boxes):
-            raise ValueError(f"Box index {index} out of range")
+        if box is None:
+            # Legacy box ID format: "session_id_0", "session_id_1", etc.
+            index = int(box_id.split('_')[-1])
+            if index < 0 or index >= len(boxes) or boxes[index].box_id is not None:
+                raise ValueError(f"Box index {index} out of range")
+            box = boxes[index]
         
-        box = boxes[index]
         box.is_verified = True
         box.is_correct = is_correct
         box.verified_at = datetime.utcnow()
@@ -0,0 +1,459 @@
+"""
+Journal engine for validation data: snapshot + append-only event log.
+
+Every change (inferred images, a box marked TP/FP, a manual box, a
+deleted box, an undo) is one JSON line appended to
+{session_id}.journal, so an edit costs the same however big the session
+is. A session's state is its last snapshot with the journal replayed on
+top; loaded sessions stay in memory.
+
+Appends reach the OS immediately (a crashed process loses nothing) and
+are fsynced in batches every JOURNAL_FSYNC_INTERVAL_MS by a background
+thread, so a burst of clicks costs one fsync (outside the store lock).
+The same thread compacts: once JOURNAL_COMPACT_EVENTS events are
+waiting, or the session has been idle for JOURNAL_IDLE_SECONDS, the
+state is written as a new snapshot and the journal is moved onto
+{session_id}.history. History + journal is the session's full audit
+trail. Undo reads it once per loaded session, then keeps the undoable
+events in memory.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+from app.config.inference import (
+    JOURNAL_COMPACT_EVENTS,
+    JOURNAL_COMPACT_INTERVAL_SECONDS,
+    JOURNAL_FSYNC_INTERVAL_MS,
+    JOURNAL_IDLE_SECONDS
+)
+from app.utils.validation_store import (
+    VALIDATION_DIR,
+    BoxIndex,
+    SessionNotFound,
+    ValidationStore,
+    empty_session,
+    next_box_index
+)
+
+JOURNAL_DIR = Path(tempfile.gettempdir()) / "visionpulse_journal"
+
+UNDOABLE = ("update_box", "add_box", "delete_box")
+
+
+def apply_event(index: BoxIndex, event: dict):
+    """Replay one journal event onto the indexed session document."""
+    op = event["op"]
+    if op == "add_images":
+        index.add_images(event["images"])
+    elif op == "update_box":
+        index.box(event["box_id"])[1].update(event["changes"])
+    elif op == "add_box":
+        index.add_box(event["image_id"], event["box"], event.get("index"))
+    elif op == "delete_box":
+        index.delete_box(event["image_id"], event["box_id"])
+    else:
+        raise ValueError(f"Unknown journal event: {op}")
+
+
+def inverse(event: dict) -> dict:
+    """The event that takes an UNDOABLE event back."""
+    op = event["op"]
+    if op == "update_box":
+        return {"op": "update_box", "box_id": event["box_id"], "changes": event["before"], "before": event["changes"]}
+    if op == "add_box":
+        return {"op": "delete_box", "image_id": event["image_id"], "box_id": event["box"]["box_id"],
+                "box": event["box"], "index": event["index"]}
+    return {"op": "add_box", "image_id": event["image_id"], "box": event["box"], "index": event["index"]}
+
+
+class _Session:
+    __slots__ = ("data", "index", "seq", "next_box", "pending", "journal", "unsynced", "touched", "undoable")
+
+    def __init__(self, data: dict, seq: int, next_box: dict):
+        self.data = data
+        self.index = BoxIndex(data)  # box_id -> (image, box), kept current by apply_event
+        self.seq = seq  # last event applied
+        self.next_box = next_box  # image_id -> next manual box idx (never reuses a deleted box's id)
+        self.pending = 0  # events in the journal since the snapshot
+        self.journal = None
+        self.unsynced = False
+        self.touched = time.monotonic()
+        self.undoable = None  # UNDOABLE events not undone yet, oldest first (read from disk on the first undo)
+
+
+class JournalValidationStore(ValidationStore):
+    """Per-session snapshot + append-only journal, fsynced in batches."""
+
+    journaled = True
+
+    def __init__(
+        self,
+        directory: Path = JOURNAL_DIR,
+        legacy_dir: Path = VALIDATION_DIR,
+        fsync_interval_ms: float = JOURNAL_FSYNC_INTERVAL_MS,
+        compact_events: int = JOURNAL_COMPACT_EVENTS,
+        compact_interval: float = JOURNAL_COMPACT_INTERVAL_SECONDS,
+        idle_seconds: float = JOURNAL_IDLE_SECONDS
+    ):
+        super().__init__()
+        self.directory = directory
+        self.legacy_dir = legacy_dir
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.compact_events = compact_events
+        self.compact_interval = compact_interval
+        self.idle_seconds = idle_seconds
+        self._sessions = {}  # session_id -> _Session
+        self._batching = False
+        self._thread = None
+        self._stop = threading.Event()
+        self.counters = {"events": 0, "fsyncs": 0, "compactions": 0}
+
+    # -- files --
+
+    def _snapshot_path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.snapshot.json"
+
+    def _journal_path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.journal"
+
+    def _history_path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.history"
+
+    @staticmethod
+    def _read_events(path: Path, repair: bool = False) -> List[dict]:
+        if not path.exists():
+            return []
+        events = []
+        good = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated line")
+                    events.append(json.loads(line))
+                except ValueError:
+                    # torn last line from a crash mid-append - cut it off so new appends start clean
+                    if repair:
+                        os.truncate(path, good)
+                    break
+                good += len(line)
+        return events
+
+    def _state(self, session_id: str) -> Optional[_Session]:
+        """The session's in-memory state, loading (snapshot + journal replay) on first use."""
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._load(session_id)
+            if state is not None:
+                self._sessions[session_id] = state
+        if state is not None:
+            state.touched = time.monotonic()
+        return state
+
+    def _load(self, session_id: str) -> Optional[_Session]:
+        snapshot_path = self._snapshot_path(session_id)
+        journal_path = self._journal_path(session_id)
+        legacy = self.legacy_dir / f"{session_id}.json"
+        if snapshot_path.exists():
+            with open(snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            state = _Session(snapshot["session"], snapshot["seq"], snapshot["next_box"])
+        elif journal_path.exists():
+            state = _Session(empty_session(session_id), 0, {})
+        elif legacy.exists():
+            with open(legacy, "r") as f:
+                session_data = json.load(f)
+            session_data.pop("true_metrics", None)  # derived - /api/validations recomputes it
+            state = _Session(session_data, 0, {})
+            self._write_snapshot(session_id, state)
+            legacy.rename(legacy.with_suffix(".json.migrated"))
+            print(f"[VALIDATION JOURNAL] Imported {legacy.name} ({len(session_data['images'])} images)")
+            return state
+        else:
+            return None
+
+        for event in self._read_events(journal_path, repair=True):
+            if event["seq"] <= state.seq:
+                continue  # already folded into the snapshot
+            self._replay(state, event)
+            state.pending += 1
+        return state
+
+    def _replay(self, state: _Session, event: dict):
+        apply_event(state.index, event)
+        state.seq = event["seq"]
+        if state.undoable is not None:
+            self._track_undo(state.undoable, event)
+        if event["op"] == "add_box":
+            image_id = event["image_id"]
+            boxes = state.index.image(image_id)["boxes"]
+            state.next_box[image_id] = max(state.next_box.get(image_id, 0), next_box_index(image_id, boxes))
+
+    def _append(self, session_id: str, state: _Session, event: dict) -> dict:
+        """Apply an event and append it to the journal (fsynced by the background thread)."""
+        event = {"seq": state.seq + 1, "at": time.time(), **event}
+        counted = session_id in self._counts
+        before = self._changed_box(state, event) if counted else None
+        self._replay(state, event)  # raises before anything is written if the event doesn't apply
+        if counted:
+            self._count_event(session_id, event, before)
+        if state.journal is None:
+            self.directory.mkdir(exist_ok=True, parents=True)
+            state.journal = open(self._journal_path(session_id), "a")
+        state.journal.write(json.dumps(event, default=str) + "\n")
+        if not self._batching:
+            state.journal.flush()
+        state.pending += 1
+        state.unsynced = True
+        self.counters["events"] += 1
+        self._ensure_thread()
+        return event
+
+    @staticmethod
+    def _track_undo(undoable: List[dict], event: dict):
+        if "undoes" in event:
+            for i in range(len(undoable) - 1, -1, -1):
+                if undoable[i]["seq"] == event["undoes"]:
+                    del undoable[i]
+                    break
+        elif event["op"] in UNDOABLE:
+            undoable.append(event)
+
+    def _flush(self, state: _Session):
+        # Lines written inside batch() sit in the file buffer until the batch ends
+        if state.journal is not None:
+            state.journal.flush()
+
+    def _events(self, session_id: str) -> List[dict]:
+        """The session's whole audit trail (history + journal), in seq order."""
+        events = {}
+        for path in (self._history_path(session_id), self._journal_path(session_id)):
+            events.update((event["seq"], event) for event in self._read_events(path))
+        return [events[seq] for seq in sorted(events)]
+
+    @staticmethod
+    def _changed_box(state: _Session, event: dict) -> Optional[tuple[str, dict]]:
+        """(image_id, box) of the box an update/delete event is about to change, as it is now."""
+        if event["op"] not in ("update_box", "delete_box"):
+            return None
+        img, box = state.index.box(event["box_id"])
+        return img["image_id"], dict(box)
+
+    def _count_event(self, session_id: str, event: dict, before: Optional[tuple[str, dict]]):
+        # Only events appended here are counted - replays at load time are covered by the scan counts() starts from
+        op = event["op"]
+        if op == "add_images":
+            self._count_images(session_id, event["images"])
+        elif op == "add_box":
+            self._count(session_id, event["image_id"], None, event["box"])
+        elif op == "update_box":
+            image_id, box = before
+            self._count(session_id, image_id, box, {**box, **event["changes"]})
+        elif op == "delete_box":
+            image_id, box = before
+            self._count(session_id, image_id, box, None)
+
+    def _write_snapshot(self, session_id: str, state: _Session):
+        self.directory.mkdir(exist_ok=True, parents=True)
+        path = self._snapshot_path(session_id)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"seq": state.seq, "next_box": state.next_box, "session": state.data}, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    # -- background fsync + compaction --
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="validation-journal", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        next_compaction = time.monotonic() + self.compact_interval
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self.sync()
+                if time.monotonic() >= next_compaction:
+                    self.compact_due()
+                    next_compaction = time.monotonic() + self.compact_interval
+            except Exception as e:  # keep syncing other sessions
+                print(f"[VALIDATION JOURNAL] Background pass failed: {e}")
+
+    def sync(self):
+        """fsync every journal appended to since the last call."""
+        # fsync outside the store lock, on duplicated fds (compaction may close the journal meanwhile)
+        with self._lock:
+            fds = []
+            for state in self._sessions.values():
+                if state.unsynced:
+                    state.journal.flush()
+                    fds.append(os.dup(state.journal.fileno()))
+                    state.unsynced = False
+        for fd in fds:
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        with self._lock:
+            self.counters["fsyncs"] += len(fds)
+
+    def compact(self, session_id: str) -> bool:
+        """Fold the session's journal into a new snapshot; the journal moves onto its history."""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or state.pending == 0:
+                return False
+            # snapshot first: if we crash before the journal is moved, replay skips the folded events
+            self._write_snapshot(session_id, state)
+            if state.journal is not None:
+                state.journal.close()
+                state.journal = None
+            journal_path = self._journal_path(session_id)
+            with open(journal_path, "r") as src, open(self._history_path(session_id), "a") as history:
+                history.write(src.read())
+                history.flush()
+                os.fsync(history.fileno())
+            journal_path.unlink()
+            state.pending = 0
+            state.unsynced = False
+            self.counters["compactions"] += 1
+            return True
+
+    def compact_due(self):
+        """Compact sessions with a long journal; compact and unload idle ones."""
+        now = time.monotonic()
+        with self._lock:
+            for session_id, state in list(self._sessions.items()):
+                idle = now - state.touched >= self.idle_seconds
+                if state.pending >= self.compact_events or idle:
+                    self.compact(session_id)
+                if idle:
+                    del self._sessions[session_id]
+                    self.forget(session_id)
+
+    def close(self):
+        """Stop the background thread and compact everything (tests, shutdown)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            for session_id in list(self._sessions):
+                self.compact(session_id)
+            self._sessions.clear()
+
+    # -- ValidationStore --
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            return self._state(session_id) is not None
+
+    def load(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            state = self._state(session_id)
+            return json.loads(json.dumps(state.data, default=str)) if state is not None else None
+
+    def image_ids(self, session_id: str) -> set:
+        with self._lock:
+            state = self._state(session_id)
+            return set(state.index.images) if state is not None else set()
+
+    def image_model(self, session_id: str, image_id: str) -> Optional[str]:
+        with self._lock:
+            state = self._state(session_id)
+            if state is None:
+                raise SessionNotFound(session_id)
+            return state.index.image(image_id).get("model")
+
+    def add_images(self, session_id: str, entries: List[dict]) -> int:
+        with self._lock:
+            state = self._state(session_id)
+            if state is None:
+                state = self._sessions[session_id] = _Session(empty_session(session_id), 0, {})
+            entries = [e for e in entries if e["image_id"] not in state.index.images]
+            if entries:
+                self._append(session_id, state, {"op": "add_images", "images": entries})
+            return len(entries)
+
+    def update_box(self, session_id: str, box_id: str, changes: dict):
+        with self._lock:
+            state = self._state(session_id)
+            if state is None:
+                raise SessionNotFound(session_id)
+            _, box = state.index.box(box_id)
+            before = {field: box.get(field) for field in changes}
+            self._append(session_id, state, {"op": "update_box", "box_id": box_id, "changes": changes, "before": before})
+
+    def add_box(self, session_id: str, image_id: str, box: dict) -> dict:
+        with self._lock:
+            state = self._state(session_id)
+            if state is None:
+                raise SessionNotFound(session_id)
+            boxes = state.index.image(image_id)["boxes"]
+            idx = max(state.next_box.get(image_id, 0), next_box_index(image_id, boxes))
+            box = {**box, "box_id": f"{image_id}_box_{idx}"}
+            self._append(session_id, state, {"op": "add_box", "image_id": image_id, "box": box, "index": len(boxes)})
+            return box
+
+    def delete_box(self, session_id: str, image_id: str, box_id: str) -> int:
+        with self._lock:
+            state = self._state(session_id)
+            if state is None:
+                raise SessionNotFound(session_id)
+            box, i = state.index.position(image_id, box_id)  # undo puts it back at i
+            self._append(session_id, state, {"op": "delete_box", "image_id": image_id, "box_id": box_id, "box": box, "index": i})
+            return len(state.index.image(image_id)["boxes"])
+
+    @contextmanager
+    def batch(self, session_id: str):
+        # One write() of all the batch's lines instead of one per event
+        with self._lock:
+            self._batching = True
+            try:
+                yield
+            finally:
+                self._batching = False
+                state = self._sessions.get(session_id)
+                if state is not None and state.journal is not None:
+                    state.journal.flush()
+
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            ids = set(self._sessions)
+        for directory, pattern in ((self.directory, "*.snapshot.json"), (self.directory, "*.journal"), (self.legacy_dir, "*.json")):
+            if directory.exists():
+                ids.update(path.name.split(".", 1)[0] for path in directory.glob(pattern))
+        return sorted(ids)
+
+    def history(self, session_id: str, limit: int = 100) -> List[dict]:
+        with self._lock:
+            state = self._state(session_id)
+            if state is None:
+                raise SessionNotFound(session_id)
+            self._flush(state)
+            events = self._events(session_id)
+        return events[max(0, len(events) - limit):]
+
+    def undo(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            state = self._state(session_id)
+            if state is None:
+                raise SessionNotFound(session_id)
+            if state.undoable is None:
+                self._flush(state)
+                undoable = []
+                for event in self._events(session_id):
+                    self._track_undo(undoable, event)
+                state.undoable = undoable
+            if not state.undoable:
+                return None
+            event = state.undoable[-1]
+            return self._append(session_id, state, {**inverse(event), "undoes": event["seq"]})
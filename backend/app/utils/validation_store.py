@@ -0,0 +1,655 @@
+"""
+Selectable storage engines for validation data (detections + reviews).
+
+A session is the document /api/validations returns:
+{"session_id", "images": [{"image_id", "timestamp", "model", "boxes",
+"yolo_metrics"}]}. Routes change it through small operations - add
+images, update a box, add a box, delete a box - so an engine only has
+to write what changed, and batch() groups several changes into one
+persisted write (see app/utils/session_writer.py).
+
+- sqlite: sessions, images and boxes as rows of one WAL database,
+          indexed by session_id, image_id and box_id (primary key). Every box update
+          is a single-row transaction. Sessions still stored as JSON
+          files by older versions are imported on first access.
+- journal: per-session snapshot + append-only event log with undo and
+          an audit trail (app/utils/validation_journal.py).
+- json:   the original one-file-per-session layout; every change
+          rewrites the session's file.
+
+The document engines (journal, json) find boxes through a BoxIndex
+(box_id -> its image and box) instead of scanning every image, so a
+batch of N reviews costs O(N).
+
+Every engine also keeps the session's TP/FP/FN/verified counters
+(app/utils/true_metrics.py SessionCounts) current as boxes change, so
+the metrics after an edit cost O(1) instead of a pass over every box.
+"""
+import json
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from app.config.inference import VALIDATION_STORE
+from app.utils.true_metrics import SessionCounts
+
+STORES = ("sqlite", "journal", "json")
+
+VALIDATION_DIR = Path(tempfile.gettempdir()) / "visionpulse_validations"
+VALIDATION_DB = Path(tempfile.gettempdir()) / "visionpulse_validations.sqlite3"
+
+# GroundTruthBox fields, in the order boxes are stored and returned
+BOX_FIELDS = (
+    "x1", "y1", "x2", "y2", "confidence", "label", "class_id", "box_id", "model",
+    "is_verified", "is_correct", "is_manual", "verified_at", "notes"
+)
+BOOL_FIELDS = {"is_verified", "is_correct", "is_manual"}
+
+
+class SessionNotFound(LookupError):
+    pass
+
+
+class ImageNotFound(LookupError):
+    pass
+
+
+class BoxNotFound(LookupError):
+    pass
+
+
+def empty_session(session_id: str) -> dict:
+    return {"session_id": session_id, "images": []}
+
+
+def next_box_index(image_id: str, boxes: Iterable[dict]) -> int:
+    """First idx after every {image_id}_box_{idx} in boxes."""
+    prefix = f"{image_id}_box_"
+    taken = [-1]
+    for box in boxes:
+        box_id = box.get("box_id") or ""
+        if box_id.startswith(prefix) and box_id[len(prefix):].isdigit():
+            taken.append(int(box_id[len(prefix):]))
+    return max(taken) + 1
+
+
+class BoxIndex:
+    """
+    box_id -> (image, box) and image_id -> image for one session document.
+    Entries point at the document's own dicts, so they stay valid however
+    an image's boxes shift; add_images / add_box / delete_box change the
+    document and the index together.
+    """
+
+    def __init__(self, session_data: dict):
+        self.session_data = session_data
+        self.images = {}
+        self.boxes = {}
+        for img in session_data["images"]:
+            self._index_image(img)
+
+    def _index_image(self, img: dict):
+        self.images.setdefault(img["image_id"], img)
+        for box in img["boxes"]:
+            if box.get("box_id"):
+                self.boxes.setdefault(box["box_id"], (img, box))
+
+    def image(self, image_id: str) -> dict:
+        try:
+            return self.images[image_id]
+        except KeyError:
+            raise ImageNotFound(image_id) from None
+
+    def box(self, box_id: str) -> tuple[dict, dict]:
+        """(image, box) holding box_id. Raises BoxNotFound."""
+        try:
+            return self.boxes[box_id]
+        except KeyError:
+            raise BoxNotFound(box_id) from None
+
+    def add_images(self, entries: List[dict]) -> List[dict]:
+        """Append the images not stored yet; returns those."""
+        added = [e for e in entries if e["image_id"] not in self.images]
+        for img in added:
+            self.session_data["images"].append(img)
+            self._index_image(img)
+        return added
+
+    def add_box(self, image_id: str, box: dict, index: Optional[int] = None):
+        img = self.image(image_id)
+        img["boxes"].insert(len(img["boxes"]) if index is None else index, box)
+        self.boxes[box["box_id"]] = (img, box)
+
+    def position(self, image_id: str, box_id: str) -> tuple[dict, int]:
+        """A box of the image and its position in the image's boxes. Raises *NotFound."""
+        img = self.image(image_id)
+        found, box = self.box(box_id)
+        if found is not img:
+            raise BoxNotFound(box_id)
+        return box, next(i for i, b in enumerate(img["boxes"]) if b is box)
+
+    def delete_box(self, image_id: str, box_id: str) -> dict:
+        box, i = self.position(image_id, box_id)
+        del self.images[image_id]["boxes"][i]
+        del self.boxes[box_id]
+        return box
+
+
+class ValidationStore:
+    """Operations every engine implements."""
+
+    journaled = False  # keeps an event history (history() / undo())
+
+    def __init__(self):
+        self._lock = threading.RLock()  # shared by the event loop and executor threads
+        self._counts = {}  # session_id -> SessionCounts, built on first counts() and kept current by every change
+
+    def exists(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def load(self, session_id: str) -> Optional[dict]:
+        """The session document, or None if nothing is stored for it."""
+        raise NotImplementedError
+
+    def image_ids(self, session_id: str) -> set:
+        raise NotImplementedError
+
+    def image_model(self, session_id: str, image_id: str) -> Optional[str]:
+        """Model a stored image was inferred with (None if not recorded). Raises SessionNotFound / ImageNotFound."""
+        raise NotImplementedError
+
+    def add_images(self, session_id: str, entries: List[dict]) -> int:
+        """Store inferred images, skipping ones already stored. Returns how many were added."""
+        raise NotImplementedError
+
+    def update_box(self, session_id: str, box_id: str, changes: dict):
+        """Set fields of one box. Raises BoxNotFound."""
+        raise NotImplementedError
+
+    def add_box(self, session_id: str, image_id: str, box: dict) -> dict:
+        """Append a box to an image, assigning its box_id. Raises SessionNotFound / ImageNotFound."""
+        raise NotImplementedError
+
+    def delete_box(self, session_id: str, image_id: str, box_id: str) -> int:
+        """Remove one box; returns the image's remaining box count. Raises *NotFound."""
+        raise NotImplementedError
+
+    def session_ids(self) -> List[str]:
+        raise NotImplementedError
+
+    def history(self, session_id: str, limit: int = 100) -> List[dict]:
+        """The session's latest change events, oldest first (engines with a journal only)."""
+        raise NotImplementedError
+
+    def undo(self, session_id: str) -> Optional[dict]:
+        """Take back the latest box change not undone yet; returns the undo event, None if nothing is left."""
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self, session_id: str):
+        """Persist every change made to the session inside the block in one write."""
+        yield
+
+    def close(self):
+        """Flush anything still buffered (server shutdown)."""
+
+    def counts(self, session_id: str) -> Optional[SessionCounts]:
+        """
+        The session's TP/FP/FN/verified counters, or None if nothing is
+        stored for it. The first call scans the session; after that the
+        engine updates them on every change.
+        """
+        with self._lock:
+            counts = self._counts.get(session_id)
+            if counts is None:
+                session_data = self.load(session_id)
+                if session_data is None:
+                    return None
+                counts = self._counts[session_id] = SessionCounts.from_session(session_data)
+            return counts.copy()
+
+    def forget(self, session_id: str):
+        """Drop the session's cached counters (idle or cleaned-up sessions); the next counts() rescans."""
+        with self._lock:
+            self._counts.pop(session_id, None)
+
+    def _count(self, session_id: str, image_id: str, old: Optional[dict], new: Optional[dict]):
+        """Engines call this for every box change (old=None: added, new=None: deleted)."""
+        counts = self._counts.get(session_id)
+        if counts is not None:
+            counts.change(image_id, old, new)
+
+    def _count_images(self, session_id: str, entries: List[dict]):
+        counts = self._counts.get(session_id)
+        if counts is not None:
+            counts.add_images(entries)
+
+
+class JsonValidationStore(ValidationStore):
+    """One JSON file per session, rewritten on every change."""
+
+    def __init__(self, directory: Path = VALIDATION_DIR):
+        super().__init__()
+        self.directory = directory
+        self._batch = None  # [session_id, document, dirty, BoxIndex] while batch() is open
+
+    def _path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.json"
+
+    def _read(self, session_id: str) -> Optional[dict]:
+        if self._batch is not None and self._batch[0] == session_id:
+            return self._batch[1]
+        path = self._path(session_id)
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _write(self, session_data: dict):
+        if self._batch is not None and self._batch[0] == session_data["session_id"]:
+            self._batch[1:3] = [session_data, True]  # written once when the batch closes
+            return
+        self.directory.mkdir(exist_ok=True, parents=True)
+        with open(self._path(session_data["session_id"]), "w") as f:
+            json.dump(session_data, f, default=str)
+
+    def _indexed(self, session_id: str) -> tuple[dict, BoxIndex]:
+        """The session document and its index; a batch reuses both for all its changes."""
+        session_data = self._read(session_id)
+        if session_data is None:
+            raise SessionNotFound(session_id)
+        batch = self._batch
+        if batch is not None and batch[0] == session_id:
+            if batch[3] is None or batch[3].session_data is not session_data:
+                batch[3] = BoxIndex(session_data)
+            return session_data, batch[3]
+        return session_data, BoxIndex(session_data)
+
+    def exists(self, session_id: str) -> bool:
+        return self._path(session_id).exists()
+
+    def load(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._read(session_id)
+
+    def image_ids(self, session_id: str) -> set:
+        session_data = self.load(session_id) or empty_session(session_id)
+        return {img["image_id"] for img in session_data["images"]}
+
+    def image_model(self, session_id: str, image_id: str) -> Optional[str]:
+        session_data = self.load(session_id)
+        if session_data is None:
+            raise SessionNotFound(session_id)
+        for img in session_data["images"]:
+            if img["image_id"] == image_id:
+                return img.get("model")
+        raise ImageNotFound(image_id)
+
+    def add_images(self, session_id: str, entries: List[dict]) -> int:
+        with self._lock:
+            if self._read(session_id) is None:
+                session_data = empty_session(session_id)
+                index = BoxIndex(session_data)
+            else:
+                session_data, index = self._indexed(session_id)
+            added = index.add_images(entries)
+            if added:
+                self._write(session_data)
+                self._count_images(session_id, added)
+            return len(added)
+
+    def update_box(self, session_id: str, box_id: str, changes: dict):
+        with self._lock:
+            session_data, index = self._indexed(session_id)
+            img, box = index.box(box_id)
+            old = dict(box)
+            box.update(changes)
+            self._write(session_data)
+            self._count(session_id, img["image_id"], old, box)
+
+    def add_box(self, session_id: str, image_id: str, box: dict) -> dict:
+        with self._lock:
+            session_data, index = self._indexed(session_id)
+            img = index.image(image_id)
+            box = {**box, "box_id": f"{image_id}_box_{next_box_index(image_id, img['boxes'])}"}
+            index.add_box(image_id, box)
+            self._write(session_data)
+            self._count(session_id, image_id, None, box)
+            return box
+
+    def delete_box(self, session_id: str, image_id: str, box_id: str) -> int:
+        with self._lock:
+            session_data, index = self._indexed(session_id)
+            box = index.delete_box(image_id, box_id)
+            self._write(session_data)
+            self._count(session_id, image_id, box, None)
+            return len(index.image(image_id)["boxes"])
+
+    @contextmanager
+    def batch(self, session_id: str):
+        with self._lock:
+            self._batch = [session_id, self._read(session_id), False, None]
+            try:
+                yield
+                session_data, dirty = self._batch[1:3]
+            except BaseException:
+                self._counts.pop(session_id, None)  # counted changes that are never written
+                raise
+            finally:
+                self._batch = None
+            if dirty:
+                self._write(session_data)
+
+    def session_ids(self) -> List[str]:
+        if not self.directory.exists():
+            return []
+        return sorted(path.stem for path in self.directory.glob("*.json"))
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS images (
+    image_id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    timestamp TEXT,
+    model TEXT,
+    yolo_metrics TEXT,
+    next_box INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS images_session ON images (session_id);
+CREATE TABLE IF NOT EXISTS boxes (
+    box_id TEXT PRIMARY KEY,
+    image_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    confidence REAL,
+    label TEXT,
+    class_id INTEGER,
+    model TEXT,
+    is_verified INTEGER NOT NULL DEFAULT 0,
+    is_correct INTEGER NOT NULL DEFAULT 1,
+    is_manual INTEGER NOT NULL DEFAULT 0,
+    verified_at TEXT,
+    notes TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS boxes_image ON boxes (image_id);
+CREATE INDEX IF NOT EXISTS boxes_session ON boxes (session_id);
+"""
+
+# Rows come back in insertion order (rowid), which is the order the JSON layout kept
+BOX_COLUMNS = ", ".join(BOX_FIELDS)
+INSERT_BOX = (
+    f"INSERT OR REPLACE INTO boxes (image_id, session_id, {BOX_COLUMNS}, extra) "
+    f"VALUES (?, ?, {', '.join('?' for _ in BOX_FIELDS)}, ?)"
+)
+
+
+def _column_value(field: str, value):
+    if value is None:
+        return None
+    if field in BOOL_FIELDS:
+        return int(bool(value))
+    if field == "verified_at" and not isinstance(value, str):
+        return str(value)  # what json.dump(default=str) stored
+    return value
+
+
+def _box_row(session_id: str, image_id: str, box: dict) -> tuple:
+    extra = {k: v for k, v in box.items() if k not in BOX_FIELDS}
+    return (
+        image_id, session_id,
+        *(_column_value(field, box.get(field)) for field in BOX_FIELDS),
+        json.dumps(extra, default=str) if extra else None
+    )
+
+
+def _box(row: sqlite3.Row) -> dict:
+    box = {field: row[field] for field in BOX_FIELDS}
+    for field in BOOL_FIELDS:
+        box[field] = bool(box[field])
+    if row["extra"]:
+        box.update(json.loads(row["extra"]))
+    return box
+
+
+class SqliteValidationStore(ValidationStore):
+    """Sessions, images and boxes as rows of one SQLite (WAL) database."""
+
+    def __init__(self, path: Path = VALIDATION_DB, legacy_dir: Path = VALIDATION_DIR):
+        super().__init__()
+        self.path = path
+        self.legacy_dir = legacy_dir
+        self._conn = None
+        self._checked = set()  # session_ids whose legacy JSON file has been looked for
+        self._batching = False  # inside batch(): one transaction is already open
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _session(self, session_id: str) -> sqlite3.Connection:
+        """The connection, after importing the session's legacy JSON file if there is one."""
+        db = self._db()
+        if session_id not in self._checked:
+            self._migrate(db, session_id)
+            self._checked.add(session_id)
+        return db
+
+    def _migrate(self, db: sqlite3.Connection, session_id: str):
+        legacy = self.legacy_dir / f"{session_id}.json"
+        if not legacy.exists():
+            return
+        if db.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone() is None:
+            with open(legacy, "r") as f:
+                session_data = json.load(f)
+            with self._transaction(db):
+                self._insert_images(db, session_id, session_data.get("images", []))
+            print(f"[VALIDATION STORE] Imported {legacy.name} ({len(session_data.get('images', []))} images)")
+        legacy.rename(legacy.with_suffix(".json.migrated"))
+
+    @contextmanager
+    def _transaction(self, db: sqlite3.Connection):
+        if self._batching:
+            yield  # part of the batch's transaction
+            return
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @contextmanager
+    def batch(self, session_id: str):
+        with self._lock:
+            db = self._session(session_id)
+            db.execute("BEGIN IMMEDIATE")
+            self._batching = True
+            try:
+                yield
+            except BaseException:
+                self._batching = False
+                db.execute("ROLLBACK")
+                self._counts.pop(session_id, None)  # counted changes that were rolled back
+                raise
+            self._batching = False
+            db.execute("COMMIT")
+
+    def _insert_images(self, db: sqlite3.Connection, session_id: str, entries: List[dict]) -> List[dict]:
+        """Insert the images not stored yet; returns those."""
+        db.execute("INSERT OR IGNORE INTO sessions (session_id) VALUES (?)", (session_id,))
+        added = []
+        for entry in entries:
+            image_id = entry["image_id"]
+            boxes = entry.get("boxes", [])
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO images (image_id, session_id, timestamp, model, yolo_metrics, next_box) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    image_id, session_id, entry.get("timestamp"), entry.get("model"),
+                    json.dumps(entry.get("yolo_metrics", {}), default=str), next_box_index(image_id, boxes)
+                )
+            )
+            if cursor.rowcount:
+                db.executemany(INSERT_BOX, [_box_row(session_id, image_id, box) for box in boxes])
+                added.append(entry)
+        return added
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            row = self._session(session_id).execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def load(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            db = self._session(session_id)
+            if not self._has_session(db, session_id):
+                return None
+            images = db.execute("SELECT * FROM images WHERE session_id = ? ORDER BY rowid", (session_id,)).fetchall()
+            boxes = db.execute("SELECT * FROM boxes WHERE session_id = ? ORDER BY rowid", (session_id,)).fetchall()
+
+        by_image = {row["image_id"]: [] for row in images}
+        for row in boxes:
+            by_image.setdefault(row["image_id"], []).append(_box(row))
+        session_data = {
+            "session_id": session_id,
+            "images": [
+                {
+                    "image_id": row["image_id"],
+                    "timestamp": row["timestamp"],
+                    "model": row["model"],
+                    "boxes": by_image[row["image_id"]],
+                    "yolo_metrics": json.loads(row["yolo_metrics"]) if row["yolo_metrics"] else {}
+                }
+                for row in images
+            ]
+        }
+        return session_data
+
+    def image_ids(self, session_id: str) -> set:
+        with self._lock:
+            rows = self._session(session_id).execute(
+                "SELECT image_id FROM images WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        return {row["image_id"] for row in rows}
+
+    def image_model(self, session_id: str, image_id: str) -> Optional[str]:
+        with self._lock:
+            db = self._session(session_id)
+            row = db.execute(
+                "SELECT model FROM images WHERE image_id = ? AND session_id = ?", (image_id, session_id)
+            ).fetchone()
+            if row is None:
+                raise ImageNotFound(image_id) if self._has_session(db, session_id) else SessionNotFound(session_id)
+        return row["model"]
+
+    def add_images(self, session_id: str, entries: List[dict]) -> int:
+        with self._lock:
+            db = self._session(session_id)
+            with self._transaction(db):
+                added = self._insert_images(db, session_id, entries)
+            self._count_images(session_id, added)
+            return len(added)
+
+    def update_box(self, session_id: str, box_id: str, changes: dict):
+        fixed = set(changes) - (set(BOX_FIELDS) - {"box_id"})
+        if fixed:
+            raise ValueError(f"Cannot update box fields: {', '.join(sorted(fixed))}")
+        assignments = ", ".join(f"{field} = ?" for field in changes)
+        params = [_column_value(field, value) for field, value in changes.items()]
+        with self._lock:
+            db = self._session(session_id)
+            old = self._counted_box(db, session_id, box_id)
+            cursor = db.execute(
+                f"UPDATE boxes SET {assignments} WHERE box_id = ? AND session_id = ?",
+                (*params, box_id, session_id)
+            )
+            if cursor.rowcount == 0:
+                raise BoxNotFound(box_id)
+            if old is not None:
+                self._count(session_id, old["image_id"], old, {**old, **changes})
+
+    def add_box(self, session_id: str, image_id: str, box: dict) -> dict:
+        with self._lock:
+            db = self._session(session_id)
+            with self._transaction(db):
+                row = db.execute(
+                    "SELECT next_box FROM images WHERE image_id = ? AND session_id = ?", (image_id, session_id)
+                ).fetchone()
+                if row is None:
+                    raise ImageNotFound(image_id) if self._has_session(db, session_id) else SessionNotFound(session_id)
+                box = {**box, "box_id": f"{image_id}_box_{row['next_box']}"}
+                db.execute(INSERT_BOX, _box_row(session_id, image_id, box))
+                db.execute("UPDATE images SET next_box = next_box + 1 WHERE image_id = ?", (image_id,))
+            self._count(session_id, image_id, None, box)
+        return box
+
+    def delete_box(self, session_id: str, image_id: str, box_id: str) -> int:
+        with self._lock:
+            db = self._session(session_id)
+            old = self._counted_box(db, session_id, box_id)
+            cursor = db.execute(
+                "DELETE FROM boxes WHERE box_id = ? AND image_id = ? AND session_id = ?", (box_id, image_id, session_id)
+            )
+            if cursor.rowcount == 0:
+                if not self._has_session(db, session_id):
+                    raise SessionNotFound(session_id)
+                if db.execute("SELECT 1 FROM images WHERE image_id = ? AND session_id = ?", (image_id, session_id)).fetchone() is None:
+                    raise ImageNotFound(image_id)
+                raise BoxNotFound(box_id)
+            if old is not None:
+                self._count(session_id, image_id, old, None)
+            return db.execute("SELECT COUNT(*) FROM boxes WHERE image_id = ?", (image_id,)).fetchone()[0]
+
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            rows = self._db().execute("SELECT session_id FROM sessions").fetchall()
+        ids = {row["session_id"] for row in rows}
+        if self.legacy_dir.exists():
+            ids.update(path.stem for path in self.legacy_dir.glob("*.json"))  # not migrated yet
+        return sorted(ids)
+
+    def _counted_box(self, db: sqlite3.Connection, session_id: str, box_id: str) -> Optional[dict]:
+        """The flags the counters need of a box about to change (None if the session isn't counted)."""
+        if session_id not in self._counts:
+            return None
+        row = db.execute(
+            "SELECT image_id, is_verified, is_correct, is_manual FROM boxes WHERE box_id = ? AND session_id = ?",
+            (box_id, session_id)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    @staticmethod
+    def _has_session(db: sqlite3.Connection, session_id: str) -> bool:
+        return db.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone() is not None
+
+
+def open_store(engine: str) -> ValidationStore:
+    if engine == "sqlite":
+        return SqliteValidationStore()
+    if engine == "journal":
+        from app.utils.validation_journal import JournalValidationStore
+        return JournalValidationStore()
+    if engine == "json":
+        return JsonValidationStore()
+    raise ValueError(f"Unknown validation store: {engine} (choose from {', '.join(STORES)})")
+
+
+# Global instance
+validation_store = open_store(VALIDATION_STORE)
@@ -0,0 +1,94 @@
+"""
+Unit tests for deadline-aware admission control and queue shedding.
+"""
+import asyncio
+import time
+import pytest
+from app.utils.admission import AdmissionController, Overloaded
+from app.utils.batcher import MicroBatcher, DeadlineExceeded
+from app.utils.executor import InferenceExecutor
+
+
+def slow_batch(items):
+    time.sleep(0.1)
+    return items
+
+
+class TestAdmissionController:
+    """Test up-front rejection"""
+
+    def test_admits_when_idle(self):
+        batcher = MicroBatcher(slow_batch, max_batch_size=4, max_wait_ms=5)
+        admission = AdmissionController(batcher, max_queue=8)
+        admission.admit(deadline=time.perf_counter() + 10)
+        assert admission.counters["admitted"] == 1
+
+    def test_rejects_unmeetable_deadline_with_retry_after(self):
+        batcher = MicroBatcher(slow_batch, max_batch_size=1, max_wait_ms=0)
+        batcher.stats.ewma_batch_run_ms = 1000  # 1s per batch
+        admission = AdmissionController(batcher, max_queue=8)
+
+        with pytest.raises(Overloaded) as exc:
+            admission.admit(deadline=time.perf_counter() + 0.2)
+
+        assert exc.value.retry_after >= 1
+        assert admission.counters["rejected_deadline"] == 1
+
+    def test_estimate_grows_with_queue(self):
+        batcher = MicroBatcher(slow_batch, max_batch_size=2, max_wait_ms=0)
+        batcher.stats.ewma_batch_run_ms = 100
+        admission = AdmissionController(batcher, max_queue=64)
+        idle = admission.estimate_seconds()
+        for _ in range(6):
+            batcher._pending.push(("x", None, 0.0, None))
+
+        assert admission.estimate_seconds() == pytest.approx(idle + 0.3)
+
+
+class TestQueueShedding:
+    """Test that queued work is dropped instead of run late"""
+
+    @pytest.mark.asyncio
+    async def test_expired_work_is_shed(self):
+        executor = InferenceExecutor(max_workers=1, max_queue=8)
+        ran = []
+
+        def run_batch(items):
+            ran.extend(items)
+            time.sleep(0.1)
+            return items
+
+        batcher = MicroBatcher(run_batch, max_batch_size=1, max_wait_ms=0, executor=executor)
+        first = asyncio.create_task(batcher.submit("first"))
+        await asyncio.sleep(0.01)
+        late = asyncio.create_task(batcher.submit("late", deadline=time.perf_counter() + 0.02))
+
+        assert await first == "first"
+        with pytest.raises(DeadlineExceeded):
+            await late
+        assert ran == ["first"]
+        assert batcher.stats.shed == 1
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_work_never_runs(self):
+        executor = InferenceExecutor(max_workers=1, max_queue=8)
+        ran = []
+
+        def run_batch(items):
+            ran.extend(items)
+            time.sleep(0.1)
+            return items
+
+        batcher = MicroBatcher(run_batch, max_batch_size=1, max_wait_ms=0, executor=executor)
+        first = asyncio.create_task(batcher.submit("first"))
+        await asyncio.sleep(0.01)
+        gone = asyncio.create_task(batcher.submit("gone"))
+        await asyncio.sleep(0.01)
+        gone.cancel()  # e.g. client disconnected
+
+        await first
+        await asyncio.sleep(0.05)
+        assert ran == ["first"]
+        assert batcher.stats.cancelled == 1
+        executor.shutdown()
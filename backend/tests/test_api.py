@@ -1,6 +1,18 @@
+import asyncio
+import json
+import uuid
+import cv2
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
+from app import main
 from app.main import app
+from app.routers import inference
+from app.utils.model_registry import ModelRegistry
+from app.utils.readiness import Readiness
+from app.utils.detections import Detections
+from app.utils.image_index import image_index, record_for
+from app.utils.validation_store import validation_store
 
 client = TestClient(app)
 
@@ -15,6 +27,38 @@ def test_health():
     assert response.status_code == 200
     assert response.json()["ok"] is True
 
+def test_ready_reports_model_state():
+    """Readiness is separate from liveness and reports the model"""
+    response = client.get("/ready")
+    assert response.status_code in (200, 503)
+    body = response.json()
+    assert body["ready"] == (response.status_code == 200)
+    assert body["model"]["state"] in ("cold", "loading", "ready", "failed")
+    assert "queue_depth" in body
+
+def test_ready_flips_once_preload_finishes(monkeypatch):
+    """With preloading on, /ready is 503 until the model is loaded and warmed"""
+    def fake_load(weights, backend, name):
+        inference.readiness.record(f"{name}:{backend}/test", load_ms=1.0, warmup_ms=1.0)
+        return object()
+
+    monkeypatch.setattr(main, "PRELOAD_ON_STARTUP", True)
+    monkeypatch.setattr(inference, "readiness", Readiness())
+    monkeypatch.setattr(inference, "registry", ModelRegistry(fake_load))
+    monkeypatch.setattr(inference, "replica_pool", None)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+    assert response.json()["model"]["state"] == "cold"
+
+    asyncio.run(inference.preload())
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+    assert response.json()["model"]["state"] == "ready"
+    assert response.json()["model"]["models"]
+
 def test_upload_no_file():
     """Upload without file should fail"""
     response = client.post("/api/upload")
@@ -28,5 +72,82 @@ def test_upload_too_large():
     response = client.post("/api/upload", files=files)
     assert response.status_code == 400
 
-# TODO: add tests for inference, export, websockets
-# need to mock YOLO model first
+@pytest.fixture
+def batch_session(monkeypatch):
+    """A session with two uploaded images and a stubbed detector."""
+    session_id = f"batch{uuid.uuid4().hex[:8]}"
+    image_ids = []
+    for ms in (1000, 2000):
+        path = image_index.session_dir(session_id) / f"{session_id}_{ms}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(path), np.zeros((32, 32, 3), dtype=np.uint8))
+        image_index.add(record_for(path))
+        image_ids.append(path.stem)
+
+    async def fake_detect(filepath, model, **kwargs):
+        rows = np.array([[1.0, 2.0, 10.0, 12.0, 0.8, 0]], dtype=np.float32)
+        return Detections(rows, {0: "person"}, model), False
+
+    writes = []
+    add_images = validation_store.add_images
+    monkeypatch.setattr(inference, "detect", fake_detect)
+    monkeypatch.setattr(validation_store, "add_images", lambda sid, entries: writes.append(len(entries)) or add_images(sid, entries))
+    yield session_id, image_ids, writes
+    image_index.remove_session(session_id)
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+def test_infer_batch_streams_every_image(batch_session):
+    """Default batch runs every un-inferred image, one NDJSON line each, stored in one write"""
+    session_id, image_ids, writes = batch_session
+    response = client.post(f"/api/infer-batch/{session_id}", json={})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = read_ndjson(response)
+    results = [e for e in events if e["type"] == "result"]
+    assert sorted(e["image_id"] for e in results) == image_ids
+    assert all(e["boxes"][0]["box_id"] == f"{e['image_id']}_box_0" for e in results)
+    assert events[-1]["type"] == "done"
+    assert events[-1]["completed"] == 2 and events[-1]["failed"] == 0
+    assert writes == [2]
+    assert validation_store.image_ids(session_id) == set(image_ids)
+
+    # Nothing left to infer the second time
+    events = read_ndjson(client.post(f"/api/infer-batch/{session_id}", json={}))
+    assert [e["type"] for e in events] == ["done"]
+    assert events[0]["completed"] == 0
+
+def test_infer_batch_selected_images(batch_session):
+    session_id, image_ids, writes = batch_session
+    events = read_ndjson(client.post(f"/api/infer-batch/{session_id}", json={"image_ids": image_ids[1:]}))
+    assert [e["image_id"] for e in events if e["type"] == "result"] == image_ids[1:]
+    assert writes == [1]
+
+def test_reinfer_with_another_model_is_rejected(batch_session):
+    """An image stored with one model's boxes is not re-run with another (its boxes would never be stored)"""
+    session_id, image_ids, _ = batch_session
+    response = client.post(f"/api/infer/{session_id}", params={"image_id": image_ids[0]})
+    assert response.status_code == 200
+    assert response.json()["model"] == "yolov8n"
+
+    response = client.post(f"/api/infer/{session_id}", params={"image_id": image_ids[0], "model": "yolov8s"})
+    assert response.status_code == 409
+
+    events = read_ndjson(client.post(f"/api/infer-batch/{session_id}", json={"image_ids": image_ids, "model": "yolov8s"}))
+    assert [e["image_id"] for e in events if e["type"] == "error"] == image_ids[:1]
+    assert [e["image_id"] for e in events if e["type"] == "result"] == image_ids[1:]
+    assert validation_store.image_model(session_id, image_ids[0]) == "yolov8n"
+    assert validation_store.image_model(session_id, image_ids[1]) == "yolov8s"
+
+    response = client.post(f"/api/infer/{session_id}", params={"image_id": image_ids[0]})
+    assert response.status_code == 200
+
+def test_infer_batch_rejects_foreign_and_unknown_images(batch_session):
+    session_id, _, writes = batch_session
+    response = client.post(f"/api/infer-batch/{session_id}", json={"image_ids": ["other_1000"]})
+    assert response.status_code == 400
+    response = client.post(f"/api/infer-batch/{session_id}", json={"image_ids": [f"{session_id}_9999"]})
+    assert response.status_code == 404
+    assert writes == []
@@ -0,0 +1,100 @@
+"""
+Unit tests for inference backend selection and export caching.
+"""
+import sys
+import types
+from pathlib import Path
+import pytest
+from app.config import inference as inference_config
+from app.utils import quantization
+from app.utils.backends import export_model, exported_path, forget_resolved, resolve_backend
+
+
+@pytest.fixture(autouse=True)
+def fresh_resolution():
+    forget_resolved()
+    yield
+    forget_resolved()
+
+
+@pytest.fixture
+def fake_exporter(monkeypatch):
+    """ultralytics stand-in whose export() writes the artifact and records the call."""
+    exports = []
+
+    class YOLO:
+        def __init__(self, weights, task=None):
+            self.weights = weights
+
+        def export(self, format, **kwargs):
+            target = exported_path(self.weights, format)
+            target.write_text("exported")
+            exports.append((format, kwargs))
+            return str(target)
+
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=YOLO))
+    return exports
+
+
+class TestExportedPath:
+    """Test where each backend's artifact lives"""
+
+    def test_paths_next_to_weights(self):
+        assert exported_path("models/yolov8n.pt", "torch") == Path("models/yolov8n.pt")
+        assert exported_path("models/yolov8n.pt", "onnx") == Path("models/yolov8n.onnx")
+        assert exported_path("models/yolov8n.pt", "openvino") == Path("models/yolov8n_openvino_model")
+        assert exported_path("models/yolov8n.pt", "onnx_int8") == Path("models/yolov8n_int8.onnx")
+
+
+class TestExportModel:
+    """Test exports happen once and are reused"""
+
+    def test_torch_needs_no_export(self, fake_exporter):
+        assert export_model("yolov8n.pt", "torch") == Path("yolov8n.pt")
+        assert fake_exporter == []
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError, match="Unknown inference backend"):
+            export_model("yolov8n.pt", "tensorrt")
+
+    def test_export_is_cached(self, tmp_path, fake_exporter):
+        weights = str(tmp_path / "yolov8n.pt")
+        first = export_model(weights, "onnx")
+        second = export_model(weights, "onnx")
+        assert first == second == tmp_path / "yolov8n.onnx"
+        assert len(fake_exporter) == 1
+        assert fake_exporter[0][1]["dynamic"] is True  # any batch size
+
+    def test_int8_reuses_existing_models(self, tmp_path, fake_exporter, monkeypatch):
+        weights = str(tmp_path / "yolov8n.pt")
+        (tmp_path / "yolov8n.onnx").write_text("fp32")
+        (tmp_path / "yolov8n_int8.onnx").write_text("int8")
+        monkeypatch.setattr(quantization, "quantize_int8", lambda *a, **k: pytest.fail("re-quantized"))
+        assert export_model(weights, "onnx_int8") == tmp_path / "yolov8n_int8.onnx"
+        assert fake_exporter == []
+
+
+class TestResolveBackend:
+    """Test the INT8 fallback to FP32 onnx and that it is decided once"""
+
+    def test_falls_back_to_onnx_until_guardrail_passes(self, monkeypatch):
+        checks = []
+        monkeypatch.setattr(inference_config, "INT8_REQUIRE_GUARDRAIL", True)
+        monkeypatch.setattr(quantization, "guardrail_passed", lambda weights: checks.append(weights) or False)
+
+        assert resolve_backend("onnx_int8", "yolov8n.pt") == "onnx"
+        assert resolve_backend("onnx_int8", "yolov8n.pt") == "onnx"
+        assert checks == ["yolov8n.pt"]  # report read once, not per lookup
+
+        monkeypatch.setattr(quantization, "guardrail_passed", lambda weights: True)
+        forget_resolved()
+        assert resolve_backend("onnx_int8", "yolov8n.pt") == "onnx_int8"
+
+    def test_guardrail_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(inference_config, "INT8_REQUIRE_GUARDRAIL", False)
+        monkeypatch.setattr(quantization, "guardrail_passed", lambda weights: pytest.fail("checked"))
+        assert resolve_backend("onnx_int8", "yolov8n.pt") == "onnx_int8"
+
+    def test_other_backends_unchanged(self):
+        for backend in ("torch", "onnx", "openvino"):
+            assert resolve_backend(backend, "yolov8n.pt") == backend
@@ -0,0 +1,124 @@
+"""
+Unit tests for the inference micro-batcher and executor.
+"""
+import asyncio
+import threading
+import time
+import pytest
+from app.utils.batcher import MicroBatcher, percentile
+from app.utils.executor import InferenceExecutor, InferenceQueueFull
+
+
+class TestMicroBatcher:
+    """Test request grouping and result routing"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_batch(self):
+        """Should run concurrent submissions as one batch"""
+        calls = []
+
+        def run_batch(items):
+            calls.append(list(items))
+            return [item * 10 for item in items]
+
+        batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+        assert results == [0, 10, 20, 30, 40]
+        assert len(calls) == 1
+        assert batcher.stats.batch_sizes[5] == 1
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size_respected(self):
+        """Should split into batches no larger than max_batch_size"""
+        sizes = []
+
+        def run_batch(items):
+            sizes.append(len(items))
+            return items
+
+        batcher = MicroBatcher(run_batch, max_batch_size=3, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+
+        assert results == list(range(7))
+        assert max(sizes) <= 3
+        assert sum(sizes) == 7
+
+    @pytest.mark.asyncio
+    async def test_lone_request_not_held_past_max_wait(self):
+        """Single request should be dispatched once max_wait elapses"""
+        batcher = MicroBatcher(lambda items: items, max_batch_size=8, max_wait_ms=5)
+        result = await asyncio.wait_for(batcher.submit("only"), timeout=1.0)
+
+        assert result == "only"
+        assert batcher.stats.snapshot()["avg_batch_size"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_batch_error_propagates_to_all_callers(self):
+        """Every caller in a failed batch should see the exception"""
+        def run_batch(items):
+            raise RuntimeError("model exploded")
+
+        batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(
+            *(batcher.submit(i) for i in range(3)), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_percentile(self):
+        """Nearest-rank percentile helper"""
+        assert percentile([], 95) == 0.0
+        assert percentile([1, 2, 3, 4], 50) == 2
+        assert percentile(list(range(1, 101)), 95) == 95
+
+
+class TestInferenceExecutor:
+    """Test the bounded inference executor"""
+
+    @pytest.mark.asyncio
+    async def test_blocking_work_does_not_stall_event_loop(self):
+        """Event loop should keep ticking while a forward pass blocks a worker"""
+        executor = InferenceExecutor(max_workers=1, max_queue=1)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        tick_task = asyncio.create_task(ticker())
+        await executor.run(time.sleep, 0.2)
+        tick_task.cancel()
+        executor.shutdown()
+
+        assert ticks >= 10
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        """Work beyond workers + max_queue should be rejected"""
+        executor = InferenceExecutor(max_workers=1, max_queue=1)
+        running = [asyncio.create_task(executor.run(time.sleep, 0.1)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(InferenceQueueFull):
+            await executor.run(time.sleep, 0.1)
+
+        await asyncio.gather(*running)
+        assert executor.inflight == 0
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_batcher_runs_on_executor(self):
+        """Batches should execute on executor threads, not the loop thread"""
+        executor = InferenceExecutor(max_workers=2, max_queue=8)
+        loop_thread = threading.get_ident()
+        batcher = MicroBatcher(
+            lambda items: [threading.get_ident() for _ in items],
+            max_batch_size=4, max_wait_ms=5, executor=executor
+        )
+        thread_ids = await asyncio.gather(*(batcher.submit(i) for i in range(4)))
+        executor.shutdown()
+
+        assert loop_thread not in thread_ids
@@ -0,0 +1,131 @@
+"""
+Unit tests for weighted fair scheduling of inference work.
+"""
+import asyncio
+import threading
+import pytest
+from app.utils.batcher import MicroBatcher
+from app.utils.executor import InferenceExecutor
+from app.utils.fair_queue import FairQueue
+
+WEIGHTS = {"interactive": 16, "batch": 2, "speculative": 1}
+
+
+def drain(queue):
+    return [queue.pop() for _ in range(len(queue))]
+
+
+class TestFairQueue:
+    """Test ordering across sessions and priority classes"""
+
+    def test_sessions_interleave(self):
+        queue = FairQueue(WEIGHTS)
+        for i in range(4):
+            queue.push(f"a{i}", session="a", priority="batch")
+        queue.push("b0", session="b", priority="batch")
+        queue.push("b1", session="b", priority="batch")
+        order = drain(queue)
+        # b's images don't wait behind a's whole burst
+        assert order.index("b0") <= 1
+        assert order.index("b1") <= 3
+
+    def test_interactive_goes_ahead_of_batch(self):
+        queue = FairQueue(WEIGHTS)
+        for i in range(10):
+            queue.push(f"batch{i}", session="a", priority="batch")
+        queue.push("speculative", session="c", priority="speculative")
+        queue.push("interactive", session="b", priority="interactive")
+        assert queue.pop() == "interactive"
+        assert drain(queue)[-1] != "batch0"
+
+    def test_low_priority_is_not_starved(self):
+        queue = FairQueue(WEIGHTS)
+        queue.push("batch", session="a", priority="batch")
+        served = []
+        for i in range(64):
+            queue.push(f"i{i}", session="b", priority="interactive")
+            served.append(queue.pop())
+        assert "batch" in served
+
+    def test_reprioritize(self):
+        queue = FairQueue(WEIGHTS)
+        for i in range(5):
+            queue.push(f"batch{i}", session="a", priority="batch")
+        queue.push("spec", session="b", priority="speculative")
+        assert queue.reprioritize(lambda entry: entry == "spec", "interactive") == 1
+        assert queue.pop() == "spec"
+
+    def test_stats_per_session(self):
+        queue = FairQueue(WEIGHTS)
+        queue.push("a0", session="a", priority="batch")
+        queue.push("a1", session="a", priority="batch")
+        queue.push("b0", session="b")
+        assert queue.pop() == "b0"
+        stats = queue.stats()
+        assert stats["sessions"]["a"]["depth"] == 2
+        assert stats["sessions"]["a"]["depth_by_priority"] == {"batch": 2}
+        assert stats["sessions"]["b"] == {**stats["sessions"]["b"], "depth": 0, "served": 1}
+        assert stats["depth_by_priority"] == {"interactive": 0, "batch": 2, "speculative": 0}
+
+    def test_discarded_entries_leave_the_queue(self):
+        queue = FairQueue(WEIGHTS)
+        handles = [queue.push(f"a{i}", session="a") for i in range(3)]
+        assert queue.discard(handles[0]) is True
+        assert queue.discard(handles[0]) is False
+        assert len(queue) == 2
+        assert queue.stats()["sessions"]["a"]["depth"] == 2
+        assert drain(queue) == ["a1", "a2"]
+        assert queue.discard(handles[1]) is False  # already popped
+        assert queue.oldest_enqueued() is None
+
+    def test_unknown_priority_rejected(self):
+        with pytest.raises(ValueError):
+            FairQueue(WEIGHTS).push("x", priority="urgent")
+
+
+class TestFairBatcher:
+    """Test that the batcher fills batches from the fair queue"""
+
+    @pytest.mark.asyncio
+    async def test_interactive_request_joins_first_batch(self):
+        batches = []
+
+        def run_batch(items):
+            batches.append(list(items))
+            return items
+
+        batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_ms=20)
+        jobs = [batcher.submit(f"a{i}", session="a", priority="batch") for i in range(6)]
+        jobs.append(batcher.submit("b", session="b", priority="interactive"))
+        await asyncio.gather(*jobs)
+        assert "b" in batches[0]
+        assert batcher.fairness()["sessions"]["b"]["served"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_requests_stop_counting(self):
+        """A burst of disconnects must not fill the queue until the worker pops them"""
+        gate = threading.Event()
+        executor = InferenceExecutor(max_workers=1, max_queue=8)
+
+        def run_batch(items):
+            gate.wait(5)
+            return items
+
+        batcher = MicroBatcher(run_batch, max_batch_size=1, max_wait_ms=1, executor=executor, max_pending=4)
+        first = asyncio.create_task(batcher.submit("first", session="a"))
+        await asyncio.sleep(0.05)  # worker is busy with "first"
+        callers = [asyncio.create_task(batcher.submit(i, session="a")) for i in range(4)]
+        await asyncio.sleep(0.01)
+        assert batcher.queue_depth() == 4
+
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        assert batcher.queue_depth() == 0
+        assert batcher.stats.cancelled == 4
+
+        live = asyncio.create_task(batcher.submit("live", session="b"))  # not rejected as queue full
+        gate.set()
+        assert await first == "first"
+        assert await live == "live"
+        executor.shutdown()
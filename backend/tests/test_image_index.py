@@ -0,0 +1,75 @@
+"""
+Unit tests for the in-memory index of uploaded images.
+"""
+import os
+import time
+import numpy as np
+import cv2
+from app.utils.image_index import ImageIndex, record_for
+
+
+def write_image(path, w=64, h=48):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(path), np.zeros((h, w, 3), dtype=np.uint8))
+    return path
+
+
+class TestImageIndex:
+    """Test lookups, pruning and rebuilding from disk"""
+
+    def test_add_get_latest(self, tmp_path):
+        index = ImageIndex(tmp_path)
+        first = write_image(index.session_dir("s1") / "s1_1000.png")
+        second = write_image(index.session_dir("s1") / "s1_2000.png")
+        os.utime(first, (time.time() - 10, time.time() - 10))
+        index.add(record_for(first))
+        index.add(record_for(second))
+
+        record = index.get("s1_1000")
+        assert record.path == first
+        assert (record.width, record.height) == (64, 48)
+        assert record.mime == "image/png"
+        assert index.latest("s1").image_id == "s1_2000"
+        assert [r.image_id for r in index.session_images("s1")] == ["s1_1000", "s1_2000"]
+
+    def test_get_falls_back_to_disk(self, tmp_path):
+        index = ImageIndex(tmp_path)
+        write_image(index.session_dir("s1") / "s1_1000.jpg")
+        assert index.get("s1_1000") is not None
+        assert index.stats()["images"] == 1
+
+    def test_unsafe_ids_are_rejected(self, tmp_path):
+        index = ImageIndex(tmp_path)
+        assert index.get("../etc/passwd") is None
+        assert index.get("s1_*") is None
+
+    def test_prune_removes_old_files(self, tmp_path):
+        index = ImageIndex(tmp_path)
+        old = write_image(index.session_dir("s1") / "s1_1000.png")
+        new = write_image(index.session_dir("s2") / "s2_2000.png")
+        os.utime(old, (time.time() - 3600, time.time() - 3600))
+        index.add(record_for(old))
+        index.add(record_for(new))
+
+        removed = index.prune(time.time() - 60)
+        assert [r.image_id for r in removed] == ["s1_1000"]
+        assert not old.exists() and not old.parent.exists()
+        assert index.get("s1_1000") is None
+        assert index.get("s2_2000") is not None
+
+    def test_remove_session(self, tmp_path):
+        index = ImageIndex(tmp_path)
+        for ms in (1000, 2000):
+            index.add(record_for(write_image(index.session_dir("s1") / f"s1_{ms}.png")))
+        assert index.remove_session("s1") == 2
+        assert not index.session_dir("s1").exists()
+        assert index.latest("s1") is None
+
+    def test_rebuild_migrates_flat_layout(self, tmp_path):
+        write_image(tmp_path / "s1_1000.png")  # old layout: directly in the upload dir
+        write_image(tmp_path / "s2" / "s2_2000.jpg")
+        index = ImageIndex(tmp_path)
+        assert index.rebuild() == 2
+        assert index.get("s1_1000").path == tmp_path / "s1" / "s1_1000.png"
+        assert not (tmp_path / "s1_1000.png").exists()
+        assert index.stats()["sessions"] == 2
@@ -0,0 +1,66 @@
+"""
+Unit tests for the content-addressed inference cache.
+"""
+from app.utils.inference_cache import InferenceCache, cache_key
+
+PARAMS = {"conf": 0.25, "iou": 0.45, "imgsz": 640, "max_det": 300, "agnostic_nms": False, "verbose": False}
+BOXES = [{"x1": 1.0, "y1": 2.0, "x2": 3.0, "y2": 4.0, "confidence": 0.9, "label": "person", "class_id": 0}]
+
+
+class TestCacheKey:
+    """Test what goes into the cache key"""
+
+    def test_same_bytes_same_key(self):
+        assert cache_key(b"img", "yolov8n.pt", PARAMS) == cache_key(b"img", "yolov8n.pt", dict(PARAMS))
+
+    def test_key_changes_with_inputs(self):
+        base = cache_key(b"img", "yolov8n.pt", PARAMS)
+        assert cache_key(b"other", "yolov8n.pt", PARAMS) != base
+        assert cache_key(b"img", "yolov8s.pt", PARAMS) != base
+        assert cache_key(b"img", "yolov8n.pt", {**PARAMS, "conf": 0.5}) != base
+
+    def test_verbose_does_not_affect_key(self):
+        """Params that don't change the boxes shouldn't split the cache"""
+        assert cache_key(b"img", "m", PARAMS) == cache_key(b"img", "m", {**PARAMS, "verbose": True})
+
+
+class TestInferenceCache:
+    """Test memory + disk tiers"""
+
+    def test_miss_then_hit(self, tmp_path):
+        cache = InferenceCache(cache_dir=tmp_path)
+        assert cache.get("k") is None
+        cache.put("k", BOXES)
+        assert cache.get("k") == BOXES
+        assert cache.counters["misses"] == 1
+        assert cache.counters["memory_hits"] == 1
+
+    def test_memory_lru_eviction(self, tmp_path):
+        cache = InferenceCache(max_memory_entries=2, cache_dir=None)
+        cache.put("a", BOXES)
+        cache.put("b", BOXES)
+        cache.get("a")  # a is now most recent
+        cache.put("c", BOXES)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == BOXES
+        assert cache.counters["memory_evictions"] == 1
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        InferenceCache(cache_dir=tmp_path).put("k", BOXES)
+
+        restarted = InferenceCache(cache_dir=tmp_path)
+        assert restarted.get("k") == BOXES
+        assert restarted.counters["disk_hits"] == 1
+        # promoted into memory on the way out
+        assert restarted.get("k") == BOXES
+        assert restarted.counters["memory_hits"] == 1
+
+    def test_disk_eviction(self, tmp_path):
+        cache = InferenceCache(max_memory_entries=0, max_disk_entries=2, cache_dir=tmp_path)
+        for key in ("a", "b", "c"):
+            cache.put(key, BOXES)
+
+        assert cache.counters["disk_evictions"] == 1
+        assert not (tmp_path / "a.json").exists()
+        assert cache.get("c") == BOXES
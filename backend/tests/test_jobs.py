@@ -0,0 +1,67 @@
+"""
+Unit tests for the durable inference job store.
+"""
+import time
+from app.utils.job_store import JobStore
+
+
+class TestJobStore:
+    """Test job lifecycle and restart recovery"""
+
+    def test_lifecycle(self, tmp_path):
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        job = store.create("s1", "s1_1000", "yolov8n")
+        assert job["status"] == "queued" and job["result"] is None
+
+        store.mark_running(job["job_id"])
+        assert store.get(job["job_id"])["attempts"] == 1
+
+        result = {"image_id": "s1_1000", "boxes": [{"x1": 1.5, "box_id": "s1_1000_box_0"}], "count": 1}
+        store.finish(job["job_id"], result)
+        done = store.get(job["job_id"])
+        assert done["status"] == "done"
+        assert done["result"] == result
+
+    def test_failure_keeps_error(self, tmp_path):
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        job = store.create("s1", "s1_1000", "yolov8n")
+        store.fail(job["job_id"], "Inference failed: boom")
+        failed = store.get(job["job_id"])
+        assert failed["status"] == "failed"
+        assert failed["error"] == "Inference failed: boom"
+
+    def test_survives_restart(self, tmp_path):
+        path = tmp_path / "jobs.sqlite3"
+        store = JobStore(path)
+        queued = store.create("s1", "s1_1000", "yolov8n")
+        running = store.create("s1", "s1_2000", "yolov8n")
+        store.mark_running(running["job_id"])
+
+        restarted = JobStore(path)
+        assert restarted.recover(max_attempts=3) == [queued["job_id"], running["job_id"]]
+        assert restarted.get(running["job_id"])["status"] == "queued"
+
+    def test_gives_up_after_repeated_interruptions(self, tmp_path):
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        job = store.create("s1", "s1_1000", "yolov8n")
+        for _ in range(3):
+            store.mark_running(job["job_id"])
+            store.recover(max_attempts=3)
+        assert store.get(job["job_id"])["status"] == "failed"
+
+    def test_purge_only_finished(self, tmp_path):
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        done = store.create("s1", "s1_1000", "yolov8n")
+        store.finish(done["job_id"], {"boxes": []})
+        queued = store.create("s1", "s1_2000", "yolov8n")
+        assert store.purge(time.time() + 1) == 1
+        assert store.get(done["job_id"]) is None
+        assert store.get(queued["job_id"]) is not None
+        assert store.stats() == {"queued": 1, "running": 0, "done": 0, "failed": 0}
+
+    def test_session_jobs_newest_first(self, tmp_path):
+        store = JobStore(tmp_path / "jobs.sqlite3")
+        first = store.create("s1", "s1_1000", "yolov8n")
+        second = store.create("s1", "s1_2000", "yolov8n")
+        store.create("s2", "s2_1000", "yolov8n")
+        assert [j["job_id"] for j in store.session_jobs("s1")] == [second["job_id"], first["job_id"]]
@@ -0,0 +1,63 @@
+"""
+Unit tests for the multi-model registry (lazy loading, LRU eviction).
+"""
+import pytest
+from app.utils.model_registry import ModelRegistry, UnknownModel
+
+
+class FakeYolo:
+    def __init__(self, ckpt_path):
+        self.ckpt_path = ckpt_path
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Three 1 MB 'models' under a budget that fits two (overhead 3x -> 3 MB each)."""
+    models = {}
+    for name in ("small", "medium", "large"):
+        path = tmp_path / f"{name}.pt"
+        path.write_bytes(b"\0" * 1024 * 1024)
+        models[name] = str(path)
+    loads = []
+
+    def loader(weights, backend, name):
+        loads.append(name)
+        return FakeYolo(weights)
+
+    reg = ModelRegistry(loader, models=models, default="small", backend="torch", memory_budget_mb=7)
+    reg.loads = loads
+    return reg
+
+
+class TestModelRegistry:
+    """Test lazy loading and memory budget"""
+
+    def test_loads_lazily_and_reuses_replica(self, registry):
+        assert registry.loaded() == []
+        with registry.checkout("small"):
+            pass
+        with registry.checkout("small"):
+            pass
+        assert registry.loads == ["small"]
+
+    def test_concurrent_checkouts_get_separate_replicas(self, registry):
+        with registry.checkout("small") as a:
+            with registry.checkout("small") as b:
+                assert a is not b
+        assert registry.stats()["models"]["small"]["replicas"] == 2
+
+    def test_least_recently_used_is_evicted(self, registry):
+        for name in ("small", "medium", "small", "large"):
+            with registry.checkout(name):
+                pass
+        assert registry.loaded() == ["small", "large"]
+        assert registry.stats()["models"]["medium"]["evictions"] == 1
+        assert registry.stats()["memory_used_mb"] <= 7
+
+    def test_unknown_model(self, registry):
+        assert registry.resolve(None) == "small"
+        with pytest.raises(UnknownModel):
+            registry.resolve("huge")
+
+    def test_identity_includes_backend(self, registry):
+        assert registry.identity("small").endswith(":torch")
@@ -0,0 +1,96 @@
+"""
+Unit tests for array-based detection parsing and columnar encodings.
+"""
+import json
+import numpy as np
+import pytest
+from app.utils.detections import Detections, parse_result, result_array
+from app.utils.payloads import columnar, encode_response, UnsupportedFormat
+
+
+class FakeBoxes:
+    def __init__(self, rows):
+        self.data = np.asarray(rows, dtype=np.float32).reshape(-1, 6)
+
+
+class FakeResult:
+    names = {0: "person", 2: "car"}
+
+    def __init__(self, rows):
+        self.boxes = FakeBoxes(rows)
+
+
+ROWS = [[10, 20, 50, 80, 0.9, 0], [5, 5, 15, 25, 0.3, 2]]
+
+META = {"session_id": "s", "image_id": "s_1", "count": 2, "metrics": {}, "cached": False}
+
+
+def detections():
+    return Detections.from_result(FakeResult(ROWS))
+
+
+class TestParseResult:
+    """Test whole-array extraction"""
+
+    def test_matches_per_box_fields(self):
+        boxes = parse_result(FakeResult(ROWS))
+        assert boxes[0] == {
+            "x1": 10.0, "y1": 20.0, "x2": 50.0, "y2": 80.0,
+            "confidence": pytest.approx(0.9), "label": "person", "class_id": 0
+        }
+        assert boxes[1]["label"] == "car"
+        assert isinstance(boxes[1]["class_id"], int)
+
+    def test_no_boxes(self):
+        assert result_array(FakeResult([])).shape == (0, 6)
+        assert parse_result(FakeResult([])) == []
+
+
+class TestDetections:
+    """Test the array container and its box dicts"""
+
+    def test_names_cover_present_classes(self):
+        detections = Detections.from_result(FakeResult(ROWS), model="yolov8n")
+        assert detections.names == {0: "person", 2: "car"}
+        assert detections.boxes("s_1_box_")[1] == {
+            "x1": 5.0, "y1": 5.0, "x2": 15.0, "y2": 25.0, "confidence": pytest.approx(0.3),
+            "label": "car", "class_id": 2, "model": "yolov8n", "box_id": "s_1_box_1"
+        }
+
+    def test_json_round_trip(self):
+        detections = Detections.from_result(FakeResult(ROWS), model="yolov8n")
+        back = Detections.from_json(json.loads(json.dumps(detections.to_json())))
+        np.testing.assert_array_equal(back.array, detections.array)
+        assert back.names == detections.names and back.model == "yolov8n"
+
+    def test_old_cache_entries_are_box_lists(self):
+        boxes = Detections.from_result(FakeResult(ROWS), model="yolov8n").boxes()
+        back = Detections.from_json(boxes)
+        np.testing.assert_allclose(back.array, np.asarray(ROWS, dtype=np.float32))
+        assert back.names == {0: "person", 2: "car"} and back.model == "yolov8n"
+
+
+class TestEncodings:
+    """Test opt-in columnar formats"""
+
+    def test_columns_are_parallel(self):
+        payload = columnar(META, detections())
+        assert payload["xyxy"] == [[10, 20, 50, 80], [5, 5, 15, 25]]
+        assert payload["class_id"] == [0, 2]
+        assert payload["names"] == {"0": "person", "2": "car"}
+        assert payload["box_id_prefix"] + "1" == "s_1_box_1"
+
+    def test_float32_round_trip(self):
+        response = encode_response("float32", {**META, "tiling": {"tiles": [{}] * 500}}, detections())
+        rows = np.frombuffer(response.body, dtype="<f4").reshape(-1, 6)
+        np.testing.assert_allclose(rows, np.asarray(ROWS, dtype=np.float32))
+        # only the buffer layout goes into the header, never the (unbounded) meta
+        assert json.loads(response.headers["X-Detections"]) == {"shape": [2, 6], "dtype": "<f4"}
+
+    def test_objects_is_default_shape(self):
+        response = encode_response("objects", META, detections())
+        assert json.loads(response.body)["boxes"][1]["box_id"] == "s_1_box_1"
+
+    def test_unknown_format(self):
+        with pytest.raises(UnsupportedFormat):
+            encode_response("xml", META, detections())
@@ -0,0 +1,52 @@
+"""
+Unit tests for the decoded/letterboxed image cache.
+"""
+import time
+import numpy as np
+import pytest
+from app.utils.images import unletterbox_boxes
+from app.utils.preprocess_cache import PreprocessCache, prepare
+
+
+def image(h=480, w=640):
+    return np.zeros((h, w, 3), dtype=np.uint8)
+
+
+class TestPrepare:
+    """Test letterbox + mapping boxes back"""
+
+    def test_boxes_map_back_to_original(self):
+        prepared = prepare(image(480, 1280))  # scale 0.5, padded top/bottom
+        assert prepared.image.shape == (640, 640, 3)
+        pad_x, pad_y = prepared.pad
+        # a box drawn on the letterboxed image around original (100, 50)-(300, 250)
+        boxed = np.array([[50 + pad_x, 25 + pad_y, 150 + pad_x, 125 + pad_y, 0.9, 0]], dtype=np.float32)
+        back = unletterbox_boxes(boxed, prepared.scale, prepared.pad, prepared.shape)[0]
+        assert back.tolist() == pytest.approx([100, 50, 300, 250, 0.9, 0])
+
+
+class TestPreprocessCache:
+    """Test memory budget and TTL"""
+
+    def test_hit_and_miss(self):
+        cache = PreprocessCache(max_mb=10, ttl_minutes=60)
+        assert cache.get("a") is None
+        cache.fill("a", image())
+        assert cache.get("a").shape == (480, 640)
+        assert cache.counters["hits"] == 1 and cache.counters["misses"] == 1
+
+    def test_evicts_least_recently_used_over_budget(self):
+        cache = PreprocessCache(max_mb=2.5, ttl_minutes=60)  # room for two 1.2 MB entries
+        cache.fill("a", image())
+        cache.fill("b", image())
+        cache.get("a")
+        cache.fill("c", image())
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+
+    def test_entries_expire_with_session_ttl(self):
+        cache = PreprocessCache(max_mb=10, ttl_minutes=0.001)  # 60 ms
+        cache.fill("a", image())
+        time.sleep(0.1)
+        assert cache.purge_expired() == 1
+        assert cache.stats()["entries"] == 0
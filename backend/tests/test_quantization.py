@@ -0,0 +1,149 @@
+"""
+Unit tests for the INT8 accuracy guardrail (ground truth, evaluation, verdict, report checks).
+"""
+import json
+import os
+from types import SimpleNamespace
+import cv2
+import numpy as np
+import pytest
+from app.utils import quantization
+from app.utils.quantization import (
+    evaluate,
+    guardrail_passed,
+    guardrail_verdict,
+    load_ground_truth,
+    report_path
+)
+from app.utils.validation_store import JsonValidationStore
+
+
+def box(x1, class_id=0, **review):
+    return {
+        "x1": x1, "y1": 0.0, "x2": x1 + 10.0, "y2": 10.0, "confidence": 0.9,
+        "label": "person", "class_id": class_id, "box_id": f"b{x1}",
+        "is_verified": False, "is_correct": True, "is_manual": False, **review
+    }
+
+
+class FakeModel:
+    """predict() returns ultralytics-like Results holding the given boxes."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def predict(self, image, **kwargs):
+        data = np.array(self.rows, dtype=np.float32).reshape(-1, 6)
+        return [SimpleNamespace(boxes=SimpleNamespace(data=data), names={0: "person", 1: "car"})]
+
+
+@pytest.fixture
+def ground_truth_store(tmp_path, monkeypatch):
+    store = JsonValidationStore(tmp_path / "validations")
+    monkeypatch.setattr(quantization, "validation_store", store)
+    return store
+
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch):
+    path = tmp_path / "s1_1.png"
+    cv2.imwrite(str(path), np.zeros((16, 16, 3), dtype=np.uint8))
+    monkeypatch.setattr(quantization, "find_upload", lambda image_id: path if image_id == "s1_1" else None)
+    return path
+
+
+class TestGroundTruth:
+    """Test which boxes count as ground truth"""
+
+    def test_reviewed_and_manual_boxes(self, ground_truth_store):
+        ground_truth_store.add_images("s1", [
+            {"image_id": "s1_1", "boxes": [
+                box(0, is_verified=True, is_correct=True),    # TP -> truth
+                box(20, is_verified=True, is_correct=False),  # FP -> neither
+                box(40),                                      # unreviewed -> ignore
+                box(60, is_manual=True),                      # missed -> truth
+            ]},
+            {"image_id": "s1_2", "boxes": [box(0)]},          # nothing reviewed -> skipped
+        ])
+        ground_truth = load_ground_truth()
+        assert list(ground_truth) == ["s1_1"]
+        assert [b["x1"] for b in ground_truth["s1_1"]["truth"]] == [0, 60]
+        assert [b["x1"] for b in ground_truth["s1_1"]["ignore"]] == [40]
+
+
+class TestEvaluate:
+    """Test precision/recall against the ground truth"""
+
+    def test_counts(self, upload):
+        ground_truth = {"s1_1": {"truth": [box(0), box(60)], "ignore": [box(40)]}}
+        model = FakeModel([
+            [0, 0, 10, 10, 0.9, 0],    # matches truth -> TP
+            [40, 0, 50, 10, 0.8, 0],   # only overlaps an unreviewed box -> ignored
+            [100, 0, 110, 10, 0.7, 0], # nothing there -> FP
+            [60, 0, 70, 10, 0.6, 1],   # right place, wrong class -> FP (and truth box 60 is FN)
+        ])
+        result = evaluate(model, ground_truth)
+        assert result == {
+            "images": 1, "true_positives": 1, "false_positives": 2, "false_negatives": 1,
+            "precision": round(1 / 3, 4), "recall": 0.5
+        }
+
+    def test_images_without_upload_are_skipped(self, upload):
+        result = evaluate(FakeModel([]), {"gone_1": {"truth": [box(0)], "ignore": []}})
+        assert result["images"] == 0 and result["recall"] == 0.0
+
+
+class TestVerdict:
+    """Test the pass/fail decision on the FP32 -> INT8 drop"""
+
+    def metrics(self, precision, recall, images=10):
+        return {"images": images, "precision": precision, "recall": recall}
+
+    def test_small_drop_passes(self):
+        verdict = guardrail_verdict(self.metrics(0.90, 0.80), self.metrics(0.89, 0.79))
+        assert verdict["passed"] is True
+        assert verdict["precision_drop"] == 0.01 and verdict["recall_drop"] == 0.01
+
+    def test_large_drop_fails(self):
+        assert guardrail_verdict(self.metrics(0.90, 0.80), self.metrics(0.85, 0.80))["passed"] is False
+        assert guardrail_verdict(self.metrics(0.90, 0.80), self.metrics(0.90, 0.70))["passed"] is False
+
+    def test_improvement_passes(self):
+        assert guardrail_verdict(self.metrics(0.80, 0.70), self.metrics(0.82, 0.75))["passed"] is True
+
+    def test_no_ground_truth_fails(self):
+        assert guardrail_verdict(self.metrics(0.0, 0.0, images=0), self.metrics(0.0, 0.0, images=0))["passed"] is False
+
+
+class TestGuardrailReport:
+    """Test INT8 is only trusted with a current, passing report"""
+
+    def write_report(self, weights, passed, int8_model_mtime):
+        report_path(weights).write_text(json.dumps({"passed": passed, "int8_model_mtime": int8_model_mtime}))
+
+    def test_missing_model_or_report(self, tmp_path):
+        weights = str(tmp_path / "yolov8n.pt")
+        assert guardrail_passed(weights) is False
+        (tmp_path / "yolov8n_int8.onnx").write_text("int8")
+        assert guardrail_passed(weights) is False  # no report
+        report_path(weights).write_text("{not json")
+        assert guardrail_passed(weights) is False
+
+    def test_current_report_decides(self, tmp_path):
+        weights = str(tmp_path / "yolov8n.pt")
+        model = tmp_path / "yolov8n_int8.onnx"
+        model.write_text("int8")
+        self.write_report(weights, True, model.stat().st_mtime)
+        assert guardrail_passed(weights) is True
+        self.write_report(weights, False, model.stat().st_mtime)
+        assert guardrail_passed(weights) is False
+
+    def test_stale_report_after_rebuild(self, tmp_path):
+        weights = str(tmp_path / "yolov8n.pt")
+        model = tmp_path / "yolov8n_int8.onnx"
+        model.write_text("int8")
+        self.write_report(weights, True, model.stat().st_mtime)
+        os.utime(model, (model.stat().st_atime, model.stat().st_mtime + 60))  # model rebuilt later
+        assert guardrail_passed(weights) is False
+        report_path(weights).write_text(json.dumps({"passed": True}))  # report from before mtimes were recorded
+        assert guardrail_passed(weights) is False
@@ -0,0 +1,74 @@
+"""
+Unit tests for the multi-process replica pool (fake model, real processes and shared memory).
+"""
+import threading
+import time
+import numpy as np
+import pytest
+from app.utils.replica_pool import ReplicaPool, _serve
+
+
+def fake_predict(images):
+    # One "box list" per image describing what arrived through shared memory
+    if any(img[0, 0, 0] == 255 for img in images):
+        time.sleep(0.6)  # slow batch
+    return [[{"shape": list(img.shape), "sum": int(img.sum())}] for img in images]
+
+
+def fake_worker(index, cores, threads, backend, weights, predict_kwargs, tasks, results):
+    _serve(index, fake_predict, tasks, results)
+
+
+def image(value, shape=(4, 6, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+@pytest.fixture
+def pool():
+    pool = ReplicaPool(size=1, threads_per_replica=1, backend="torch", result_timeout=0.3, worker=fake_worker)
+    yield pool
+    pool.shutdown()
+
+
+class TestReplicaPool:
+    """Test the shared-memory handoff, result order and failure handling"""
+
+    def test_images_arrive_intact_and_in_order(self, pool):
+        images = [image(1), image(2, (8, 2, 3)), image(3)]
+        results = pool.predict(images)
+        assert results == [[{"shape": list(img.shape), "sum": int(img.sum())}] for img in images]
+        assert pool.stats()["batches_served"] == [1]
+
+    def test_abandoned_batch_does_not_kill_the_replica(self, pool):
+        pool.start()
+        errors = []
+
+        def predict_slow():
+            try:
+                pool.predict([image(255)])
+            except TimeoutError as e:
+                errors.append(e)
+
+        slow = threading.Thread(target=predict_slow)
+        slow.start()
+        time.sleep(0.05)
+        # Queued behind the slow batch: times out and its segments are unlinked before the replica gets to it
+        with pytest.raises(TimeoutError):
+            pool.predict([image(1)])
+        slow.join()
+        assert len(errors) == 1
+        time.sleep(0.5)  # let the replica reach the abandoned batch
+
+        assert pool.predict([image(2)]) == [[{"shape": [4, 6, 3], "sum": 2 * 72}]]
+        assert pool.stats()["alive"] == 1
+        assert pool.stats()["respawned"] == 0
+
+    def test_dead_replica_is_respawned(self, pool):
+        pool.start()
+        pool._processes[0].kill()
+        pool._processes[0].join()
+        pool.result_timeout = 30  # the new replica has to start up first
+
+        assert pool.predict([image(5)]) == [[{"shape": [4, 6, 3], "sum": 5 * 72}]]
+        assert pool.stats()["respawned"] == 1
+        assert pool.stats()["alive"] == 1
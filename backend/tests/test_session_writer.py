@@ -0,0 +1,99 @@
+"""
+Concurrency tests for coalesced validation writes.
+"""
+import asyncio
+import random
+import pytest
+from app.utils.session_writer import PreconditionFailed, SessionWriter
+from app.utils.validation_journal import JournalValidationStore
+from app.utils.validation_store import BoxNotFound, JsonValidationStore, SqliteValidationStore
+from tests.test_validation_store import make_image
+
+ENGINES = {
+    "sqlite": lambda root: SqliteValidationStore(root / "validations.sqlite3", legacy_dir=root / "legacy"),
+    "journal": lambda root: JournalValidationStore(root / "journal", legacy_dir=root / "legacy"),
+    "json": lambda root: JsonValidationStore(root / "validations")
+}
+
+
+@pytest.fixture(params=sorted(ENGINES))
+def engine(request, tmp_path):
+    return lambda: ENGINES[request.param](tmp_path)
+
+
+class TestSessionWriter:
+    """Test that no edit is lost at high edit rates"""
+
+    @pytest.mark.asyncio
+    async def test_no_validation_lost_under_concurrent_edits(self, engine):
+        store = engine()
+        images = [make_image(f"s1_{i}", boxes=20) for i in range(5)]
+        store.add_images("s1", images)
+        box_ids = [box["box_id"] for img in images for box in img["boxes"]]
+        writer = SessionWriter(store, window_ms=5)
+
+        rng = random.Random(7)
+        expected = {}
+
+        async def review(box_id):
+            await asyncio.sleep(rng.random() * 0.05)
+            is_correct = rng.random() < 0.5
+            expected[box_id] = is_correct
+            changes = {"is_verified": True, "is_correct": is_correct, "notes": f"by {box_id}"}
+            [result], _ = await writer.submit("s1", [("update_box", (box_id, changes))])
+            assert result is None
+
+        async def add_manual(image_id):
+            await asyncio.sleep(rng.random() * 0.05)
+            [box], _ = await writer.submit("s1", [("add_box", (image_id, {**images[0]["boxes"][0], "is_manual": True}))])
+            return box["box_id"]
+
+        results = await asyncio.gather(
+            *(review(box_id) for box_id in box_ids),
+            *(add_manual(img["image_id"]) for img in images for _ in range(4))
+        )
+        manual_ids = [r for r in results if r is not None]
+
+        assert len(set(manual_ids)) == 20  # no two concurrent adds got the same box_id
+        assert writer.counters["flushes"] < writer.counters["writes"] / 4  # writes were coalesced
+        store.close()
+
+        reopened = engine()  # check what actually reached disk
+        stored = {box["box_id"]: box for img in reopened.load("s1")["images"] for box in img["boxes"]}
+        assert set(stored) == set(box_ids) | set(manual_ids)
+        for box_id, is_correct in expected.items():
+            assert stored[box_id]["is_verified"] is True
+            assert stored[box_id]["is_correct"] is is_correct
+            assert stored[box_id]["notes"] == f"by {box_id}"
+        reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_stale_if_match_gets_precondition_failed(self, engine):
+        store = engine()
+        store.add_images("s1", [make_image("s1_1")])
+        writer = SessionWriter(store, window_ms=1)
+        etag = writer.etag("s1")
+
+        # two tabs editing from the same version: the second one must reload
+        first, second = await asyncio.gather(
+            writer.submit("s1", [("update_box", ("s1_1_box_0", {"is_correct": False}))], if_match=etag),
+            writer.submit("s1", [("update_box", ("s1_1_box_0", {"is_correct": True}))], if_match=etag),
+            return_exceptions=True
+        )
+        assert first[1] == writer.etag("s1") != etag
+        assert isinstance(second, PreconditionFailed)
+        assert store.load("s1")["images"][0]["boxes"][0]["is_correct"] is False
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_missing_box_does_not_fail_the_batch(self, engine):
+        store = engine()
+        store.add_images("s1", [make_image("s1_1")])
+        writer = SessionWriter(store, window_ms=1)
+        [missing, found], _ = await writer.submit("s1", [
+            ("update_box", ("s1_1_box_9", {"is_verified": True})),
+            ("update_box", ("s1_1_box_1", {"is_verified": True}))
+        ])
+        assert isinstance(missing, BoxNotFound) and found is None
+        assert store.load("s1")["images"][0]["boxes"][1]["is_verified"] is True
+        store.close()
@@ -0,0 +1,83 @@
+"""
+Unit tests for single-flight coalescing of duplicate requests.
+"""
+import asyncio
+import pytest
+from app.utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test that concurrent callers of one key share one computation"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_run(self):
+        runs = []
+
+        async def compute():
+            runs.append(1)
+            await asyncio.sleep(0.02)
+            return {"boxes": [1, 2]}
+
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("img", compute) for _ in range(3)))
+
+        assert len(runs) == 1
+        assert [shared for _, shared in results] == [False, True, True]
+        assert all(result == {"boxes": [1, 2]} for result, _ in results)
+        assert flights.stats() == {"leaders": 1, "followers": 2, "abandoned": 0, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_run_again(self):
+        runs = []
+
+        async def compute():
+            runs.append(1)
+            return len(runs)
+
+        flights = SingleFlight()
+        assert await flights.do("img", compute) == (1, False)
+        assert await flights.do("img", compute) == (2, False)
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("model exploded")
+
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("img", compute) for _ in range(2)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_one_caller_leaving_does_not_cancel_the_others(self):
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "boxes"
+
+        flights = SingleFlight()
+        impatient = asyncio.ensure_future(flights.do("img", compute))
+        patient = asyncio.ensure_future(flights.do("img", compute))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        assert await patient == ("boxes", True)
+        assert flights.counters["abandoned"] == 0
+
+    @pytest.mark.asyncio
+    async def test_work_is_cancelled_when_everyone_leaves(self):
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def compute():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        flights = SingleFlight()
+        caller = asyncio.ensure_future(flights.do("img", compute))
+        await started.wait()
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert flights.counters["abandoned"] == 1
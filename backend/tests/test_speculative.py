@@ -0,0 +1,81 @@
+"""
+Unit tests for speculative inference jobs started at upload.
+"""
+import asyncio
+import numpy as np
+import pytest
+from app.routers.inference import queued_image
+from app.utils.fair_queue import FairQueue
+from app.utils.speculative import Speculator
+
+
+def job_returning(value, delay=0.0):
+    async def job():
+        await asyncio.sleep(delay)
+        return value
+    return job
+
+
+class TestSpeculator:
+    """Test starting, claiming and expiring speculative jobs"""
+
+    @pytest.mark.asyncio
+    async def test_attach_to_running_job(self):
+        speculator = Speculator(max_inflight=2, ttl_seconds=60)
+        assert speculator.start(("img", "yolov8n"), job_returning("boxes", delay=0.05))
+        task = speculator.take(("img", "yolov8n"))
+        assert not task.done()
+        assert await task == "boxes"
+        assert speculator.counters["attached"] == 1
+
+    @pytest.mark.asyncio
+    async def test_take_finished_result_once(self):
+        speculator = Speculator(max_inflight=2, ttl_seconds=60)
+        speculator.start("img", job_returning("boxes"))
+        await asyncio.sleep(0.01)
+        task = speculator.take("img")
+        assert task.done() and task.result() == "boxes"
+        assert speculator.take("img") is None
+        assert speculator.counters["completed_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_skipped_when_busy_or_full(self):
+        speculator = Speculator(max_inflight=1, ttl_seconds=60)
+        assert not speculator.start("a", job_returning(1), busy=True)
+        assert speculator.start("b", job_returning(2, delay=0.05))
+        assert not speculator.start("c", job_returning(3))
+        assert speculator.counters["skipped_busy"] == 2
+        await speculator.take("b")
+
+    @pytest.mark.asyncio
+    async def test_unclaimed_results_expire(self):
+        speculator = Speculator(max_inflight=2, ttl_seconds=0)
+        speculator.start("img", job_returning("boxes"))
+        await asyncio.sleep(0.01)
+        assert speculator.purge_expired() == 1
+        assert speculator.take("img") is None
+
+    @pytest.mark.asyncio
+    async def test_failed_job_is_counted(self):
+        async def failing():
+            raise RuntimeError("model exploded")
+
+        speculator = Speculator(max_inflight=2, ttl_seconds=60)
+        speculator.start("img", failing)
+        await asyncio.sleep(0.01)
+        assert speculator.counters["failed"] == 1
+        with pytest.raises(RuntimeError):
+            await speculator.take("img")
+
+
+class TestClaimPromotion:
+    """Test that claiming a queued speculative job moves only its own image up"""
+
+    def test_tiles_in_the_queue_are_skipped(self):
+        queue = FairQueue({"interactive": 16, "batch": 2, "speculative": 1})
+        queue.push(("yolov8n", np.zeros((4, 4, 3), dtype=np.uint8), None), session="a", priority="batch")
+        queue.push(("yolov8n", "uploads/s1/s1_1.png", None), session="s1", priority="speculative")
+        queue.push(("yolov8s", "uploads/s1/s1_1.png", None), session="s1", priority="speculative")
+
+        assert queue.reprioritize(queued_image("yolov8n", "uploads/s1/s1_1.png"), "interactive") == 1
+        assert queue.pop()[:2] == ("yolov8n", "uploads/s1/s1_1.png")
@@ -0,0 +1,55 @@
+"""
+Unit tests for the per-stage latency breakdown.
+"""
+import time
+from app.utils.stages import StageHistograms, StageTimer
+
+
+class TestStageTimer:
+    """Test per-request stage accounting"""
+
+    def test_breakdown_sums_repeated_stages(self):
+        timer = StageTimer()
+        timer.add("read", 1_000_000)
+        timer.add("read", 500_000)
+        timer.add("forward", 2_000_000)
+        breakdown = timer.breakdown()
+        assert breakdown["stages_ms"] == {"read": 1.5, "forward": 2.0}
+        assert breakdown["total_ms"] >= 0
+        assert breakdown["other_ms"] >= 0
+
+    def test_since_charges_elapsed_time(self):
+        timer = StageTimer()
+        t = time.perf_counter_ns()
+        time.sleep(0.01)
+        timer.since("write", t)
+        assert timer.breakdown()["stages_ms"]["write"] >= 10
+
+    def test_stages_are_listed_in_pipeline_order(self):
+        timer = StageTimer()
+        for stage in ("write", "forward", "read"):
+            timer.add(stage, 1)
+        assert list(timer.breakdown()["stages_ms"]) == ["read", "forward", "write"]
+
+
+class TestStageHistograms:
+    """Test rolling per-stage windows"""
+
+    def test_snapshot_percentiles_and_buckets(self):
+        stats = StageHistograms(window=100)
+        for ms in range(1, 101):
+            stats.record({"stages_ms": {"forward": float(ms)}, "total_ms": float(ms) * 2})
+        forward = stats.snapshot()["stages"]["forward"]
+        assert forward["count"] == 100
+        assert forward["p50"] == 50.0
+        assert forward["max"] == 100.0
+        assert forward["share"] == 0.5
+        assert sum(forward["histogram_ms"].values()) == 100
+
+    def test_window_drops_old_requests(self):
+        stats = StageHistograms(window=3)
+        for ms in (100.0, 1.0, 1.0, 1.0):
+            stats.record({"stages_ms": {"read": ms}, "total_ms": ms})
+        snapshot = stats.snapshot()
+        assert snapshot["requests"] == 4
+        assert snapshot["stages"]["read"]["max"] == 1.0
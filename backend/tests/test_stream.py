@@ -0,0 +1,72 @@
+"""
+Tests for frame-stream detection over WebSocket.
+"""
+import asyncio
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.main import app
+from app.routers import inference, stream
+from app.routers.stream import StreamStats
+from app.utils.detections import Detections
+
+client = TestClient(app)
+SESSION = "11111111-1111-1111-1111-111111111111"
+
+
+class TestStreamStats:
+    """Test per-stream FPS / latency counters"""
+
+    def test_counts_and_latency(self):
+        stats = StreamStats(SESSION, "latest", "yolov8n", window=5)
+        stats.received = 3
+        stats.dropped = 1
+        for ms in (10.0, 20.0):
+            stats.record(ms)
+        snap = stats.snapshot()
+        assert snap["processed"] == 2
+        assert snap["dropped"] == 1
+        assert snap["latency_ms"]["avg"] == 15.0
+        assert snap["fps"] > 0
+
+
+class TestStreamEndpoint:
+    """Test connection validation (no model needed)"""
+
+    def test_rejects_unknown_mode(self):
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect(f"/ws/detect/{SESSION}?mode=bogus") as ws:
+                ws.receive_json()
+        assert exc.value.code == 1008
+
+    def test_rejects_unknown_model(self):
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect(f"/ws/detect/{SESSION}?model=nope") as ws:
+                ws.receive_json()
+        assert exc.value.code == 1008
+
+
+class TestStreamWorkerFailure:
+    """Test that a dead detection worker doesn't leave the handler stuck"""
+
+    def test_worker_dies_while_buffer_is_full(self, monkeypatch):
+        async def slow_submit(item, **kwargs):
+            await asyncio.sleep(0.2)  # frames pile up behind this one
+            return Detections(np.zeros((0, 6), dtype=np.float32), {})
+
+        def broken_record(self, latency_ms):
+            raise RuntimeError("stats broke")
+
+        monkeypatch.setattr(stream, "STREAM_MAX_BUFFERED_FRAMES", 1)
+        monkeypatch.setattr(stream, "prepare_frame", lambda data: data)
+        monkeypatch.setattr(inference.batcher, "submit", slow_submit)
+        monkeypatch.setattr(StreamStats, "record", broken_record)
+
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect(f"/ws/detect/{SESSION}?mode=all") as ws:
+                for _ in range(3):  # one detecting, one buffered, one blocked on the full buffer
+                    ws.send_bytes(b"frame")
+                ws.receive_json()
+        assert exc.value.code == 1011
+        assert stream.active_streams == {}
@@ -0,0 +1,88 @@
+"""
+Unit tests for tiled inference helpers (grid, shifting, merging).
+"""
+import cv2
+import numpy as np
+import pytest
+from app.routers import inference
+from app.utils.batcher import MicroBatcher
+from app.utils.detections import Detections
+from app.utils.tiling import merge_boxes, shift_boxes, tile_grid
+
+
+def box(x1, y1, x2, y2, conf=0.9, class_id=0):
+    return [x1, y1, x2, y2, conf, class_id]
+
+
+def rows(*boxes):
+    return np.array(boxes, dtype=np.float32).reshape(-1, 6)
+
+
+class TestTileGrid:
+    """Test tile layout"""
+
+    def test_small_image_is_one_tile(self):
+        assert tile_grid(500, 300) == [(0, 0, 500, 300)]
+
+    def test_covers_image_with_overlap(self):
+        tiles = tile_grid(2000, 1000, tile=640, overlap=0.2)
+        assert max(x1 for _, _, x1, _ in tiles) == 2000
+        assert max(y1 for _, _, _, y1 in tiles) == 1000
+        assert all(x1 - x0 == 640 and y1 - y0 == 640 for x0, y0, x1, y1 in tiles)
+        xs = sorted({x0 for x0, _, _, _ in tiles})
+        assert all(b - a <= 512 for a, b in zip(xs, xs[1:]))  # neighbours share >= 128px
+
+
+class TestMerge:
+    """Test cross-tile duplicate merging"""
+
+    def test_shift_into_full_image(self):
+        shifted = shift_boxes(rows(box(10, 20, 30, 40)), 512, 1024)[0]
+        assert shifted.tolist() == pytest.approx([522, 1044, 542, 1064, 0.9, 0])
+
+    def test_border_sliver_is_suppressed_by_ios(self):
+        whole = box(100, 100, 200, 200, conf=0.9)
+        sliver = box(100, 100, 130, 200, conf=0.6)  # IoU only 0.3, but fully inside
+        np.testing.assert_allclose(merge_boxes(rows(sliver, whole)), rows(whole))
+        assert len(merge_boxes(rows(sliver, whole), metric="iou")) == 2
+
+    def test_different_classes_are_kept(self):
+        merged = merge_boxes(rows(box(0, 0, 10, 10, class_id=0), box(0, 0, 10, 10, class_id=1)))
+        assert len(merged) == 2
+
+    def test_weighted_fusion(self):
+        merged = merge_boxes(rows(box(0, 0, 10, 10, conf=0.75), box(2, 0, 12, 10, conf=0.25)), method="wbf")
+        assert len(merged) == 1
+        assert merged[0][0] == pytest.approx(0.5)
+        assert merged[0][4] == 0.75
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            merge_boxes(rows(box(0, 0, 1, 1)), method="mean")
+
+
+class TestTiledInference:
+    """Test that tiles go through the batcher like any other request"""
+
+    @pytest.mark.asyncio
+    async def test_tiles_share_the_fair_queue(self, tmp_path, monkeypatch):
+        path = tmp_path / "big.png"
+        cv2.imwrite(str(path), np.zeros((1000, 2000, 3), dtype=np.uint8))
+        depths = []
+
+        def run_batch(items):
+            depths.append(batcher.queue_depth())
+            box = np.array([[0, 0, 10, 10, 0.9, 0]], dtype=np.float32)
+            return [Detections(box, {0: "person"}, "yolov8n") for _ in items]
+
+        batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=1)
+        monkeypatch.setattr(inference, "batcher", batcher)
+        report = {}
+        detections = await inference.detect_tiled(path, report=report, session="s1", priority="batch")
+
+        tiles = len(report["tiling"]["tiles"])
+        assert tiles == len(tile_grid(2000, 1000)) + 1  # plus the full image
+        assert batcher.fairness()["sessions"]["s1"]["served"] == tiles
+        assert len(batcher._pending._class_waits["batch"]) == tiles
+        assert max(depths) < 4  # one group in flight per worker, never the whole image
+        assert len(detections) == tiles - 1  # the full image's box merges with the top-left tile's
@@ -3,10 +3,11 @@ Unit tests for true metrics calculation.
 
 Tests precision, recall, F1 score, true FP rate.
 """
+import random
 import pytest
 from datetime import datetime
 from app.schemas.validation import GroundTruthBox, TrueMetrics
-from app.utils.true_metrics import calculate_true_metrics, update_box_validation
+from app.utils.true_metrics import SessionCounts, calculate_true_metrics, update_box_validation
 
 
 class TestTrueMetrics:
@@ -213,6 +214,23 @@ class TestBoxValidation:
                 is_correct=True
             )
 
+    
+    def test_box_id_matched_after_deletion(self):
+        """Should find the box by its id, not its position, once a box was deleted"""
+        boxes = [
+            GroundTruthBox(
+                x1=10, y1=10, x2=50, y2=50,
+                confidence=0.9, label="person", class_id=0, box_id=f"img_box_{i}"
+            )
+            for i in (0, 2)  # img_box_1 was deleted
+        ]
+        
+        updated_box = update_box_validation(boxes=boxes, box_id="img_box_2", is_correct=False)
+        
+        assert updated_box is boxes[1]
+        assert boxes[0].is_verified == False
+        with pytest.raises(ValueError, match="Invalid box_id"):
+            update_box_validation(boxes=boxes, box_id="img_box_1", is_correct=True)
 
 class TestMetricsEdgeCases:
     """Test edge cases and error handling"""
@@ -250,5 +268,61 @@ class TestMetricsEdgeCases:
         assert metrics.yolo_box_count == 5
 
 
+class TestRunningCounts:
+    """Test the incremental counters always match a full recompute"""
+    
+    def make_box(self, box_id, **flags):
+        return {"x1": 10, "y1": 10, "x2": 50, "y2": 50, "confidence": 0.9, "label": "person",
+                "class_id": 0, "box_id": box_id, "is_verified": False, "is_correct": True,
+                "is_manual": False, **flags}
+    
+    def test_counts_match_full_recompute(self):
+        """Every transition (review, re-review, manual add, delete) keeps the counters exact"""
+        rng = random.Random(7)
+        yolo_metrics = {"fps": 12.0, "avg_confidence": 0.8, "box_count": 3}
+        images = {
+            f"img{i}": [self.make_box(f"img{i}_box_{j}") for j in range(3)]
+            for i in range(4)
+        }
+        counts = SessionCounts.from_session({"images": [
+            {"image_id": image_id, "boxes": [dict(b) for b in boxes], "yolo_metrics": yolo_metrics}
+            for image_id, boxes in images.items()
+        ]})
+        
+        for step in range(300):
+            image_id = rng.choice(list(images))
+            boxes = images[image_id]
+            action = rng.random()
+            if action < 0.6 and boxes:
+                # unverified -> TP/FP, or TP <-> FP
+                i = rng.randrange(len(boxes))
+                old = dict(boxes[i])
+                boxes[i].update(is_verified=True, is_correct=rng.random() < 0.5)
+                counts.change(image_id, old, boxes[i])
+            elif action < 0.8:
+                box = self.make_box(f"{image_id}_box_m{step}", is_manual=True, is_verified=rng.random() < 0.5)
+                boxes.append(box)
+                counts.change(image_id, None, box)
+            elif boxes:
+                counts.change(image_id, boxes.pop(rng.randrange(len(boxes))), None)
+            
+            all_boxes = [GroundTruthBox(**b) for image in images.values() for b in image]
+            assert counts.metrics() == calculate_true_metrics(all_boxes, yolo_metrics)
+            assert counts.total.boxes == len(all_boxes)
+            for other_id, other in images.items():
+                expected = SessionCounts.from_session({"images": [{"image_id": other_id, "boxes": other}]})
+                assert counts.images[other_id].as_dict() == expected.total.as_dict()
+    
+    def test_copy_is_independent(self):
+        """Counts handed out must not change with later edits"""
+        counts = SessionCounts.from_session({"images": [{"image_id": "img0", "boxes": [self.make_box("b0")]}]})
+        snapshot = counts.copy()
+        counts.change("img0", self.make_box("b0"), self.make_box("b0", is_verified=True))
+        
+        assert snapshot.total.verified == 0
+        assert snapshot.images["img0"].verified == 0
+        assert counts.total.true_positives == 1
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,131 @@
+"""
+Unit tests for the journal validation store (snapshot + event log).
+"""
+import asyncio
+import pytest
+from app.utils.session_writer import SessionWriter
+from app.utils.validation_journal import JournalValidationStore
+from tests.test_validation_store import make_image
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    return tmp_path / "journal"
+
+
+def open_journal(journal_dir, **kwargs):
+    return JournalValidationStore(journal_dir, legacy_dir=journal_dir / "legacy", **kwargs)
+
+
+def edit_session(store):
+    store.add_images("s1", [make_image("s1_1", boxes=3)])
+    store.update_box("s1", "s1_1_box_0", {"is_verified": True, "is_correct": True})
+    store.update_box("s1", "s1_1_box_1", {"is_verified": True, "is_correct": False})
+    store.add_box("s1", "s1_1", {**make_image("s1_1")["boxes"][0], "is_manual": True})
+    store.delete_box("s1", "s1_1", "s1_1_box_2")
+
+
+class TestJournalReplay:
+    """Test state is rebuilt from snapshot + journal"""
+
+    def test_restart_replays_journal(self, journal_dir):
+        store = open_journal(journal_dir)
+        edit_session(store)
+        expected = store.load("s1")
+
+        # no close(): a crashed process leaves only the journal behind
+        assert open_journal(journal_dir).load("s1") == expected
+
+    def test_compaction_folds_journal_into_snapshot(self, journal_dir):
+        store = open_journal(journal_dir)
+        edit_session(store)
+        expected = store.load("s1")
+        assert store.compact("s1")
+        assert not (journal_dir / "s1.journal").exists()
+
+        store.update_box("s1", "s1_1_box_3", {"notes": "after compaction"})
+        reopened = open_journal(journal_dir)
+        assert reopened.load("s1")["images"][0]["boxes"][:2] == expected["images"][0]["boxes"][:2]
+        assert reopened.load("s1")["images"][0]["boxes"][-1]["notes"] == "after compaction"
+        assert [e["op"] for e in reopened.history("s1")] == [
+            "add_images", "update_box", "update_box", "add_box", "delete_box", "update_box"
+        ]
+
+    def test_torn_last_line_is_dropped(self, journal_dir):
+        store = open_journal(journal_dir)
+        edit_session(store)
+        expected = store.load("s1")
+        with open(journal_dir / "s1.journal", "a") as f:
+            f.write('{"seq": 99, "op": "upd')
+
+        reopened = open_journal(journal_dir)
+        assert reopened.load("s1") == expected
+        reopened.update_box("s1", "s1_1_box_0", {"notes": "ok"})
+        assert open_journal(journal_dir).load("s1")["images"][0]["boxes"][0]["notes"] == "ok"
+
+    def test_fsyncs_are_batched(self, journal_dir):
+        store = open_journal(journal_dir, fsync_interval_ms=60000)  # background thread stays asleep
+        edit_session(store)
+        assert store.counters["fsyncs"] == 0
+        store.sync()
+        assert store.counters == {"events": 5, "fsyncs": 1, "compactions": 0}
+        store.close()
+
+    def test_idle_sessions_are_compacted_and_unloaded(self, journal_dir):
+        store = open_journal(journal_dir, idle_seconds=0)
+        edit_session(store)
+        expected = store.load("s1")
+        counts = store.counts("s1").total.as_dict()
+        store.compact_due()
+        assert store.counters["compactions"] == 1
+        assert "s1" not in store._sessions and "s1" not in store._counts
+        assert store.load("s1") == expected
+        assert store.counts("s1").total.as_dict() == counts
+
+
+class TestJournalUndo:
+    """Test undo walks back through the history"""
+
+    def test_undo_in_reverse_order(self, journal_dir):
+        store = open_journal(journal_dir)
+        store.add_images("s1", [make_image("s1_1", boxes=3)])
+        original = store.load("s1")
+        edit_session(store)
+        store.compact("s1")  # undo reaches across compactions
+
+        undone = [store.undo("s1")["op"] for _ in range(4)]
+        assert undone == ["add_box", "delete_box", "update_box", "update_box"]
+        assert store.load("s1") == original
+        assert store.undo("s1") is None
+
+    def test_undo_survives_restart(self, journal_dir):
+        store = open_journal(journal_dir)
+        edit_session(store)
+        store.undo("s1")
+        reopened = open_journal(journal_dir)
+        assert reopened.load("s1") == store.load("s1")
+        assert reopened.undo("s1")["undoes"] == 4  # the manual add
+
+    @pytest.mark.asyncio
+    async def test_undo_in_the_same_write_batch_as_the_edit(self, journal_dir):
+        edit_session(open_journal(journal_dir))
+        store = open_journal(journal_dir)  # undo has to read the history mid-batch
+        before = store.load("s1")
+        writer = SessionWriter(store, window_ms=20)
+        (_, _), ([undone], _) = await asyncio.gather(
+            writer.submit("s1", [("update_box", ("s1_1_box_0", {"notes": "typo"}))]),
+            writer.submit("s1", [("undo", ())])
+        )
+        assert writer.counters["flushes"] == 1
+        assert undone["undoes"] == 6  # the edit, not the manual add before it
+        assert store.load("s1") == before
+
+        # and again once the undoable events are tracked in memory
+        (_, _), ([undone], _) = await asyncio.gather(
+            writer.submit("s1", [("update_box", ("s1_1_box_1", {"notes": "typo"}))]),
+            writer.submit("s1", [("undo", ())])
+        )
+        assert undone["undoes"] == 8
+        assert store.load("s1") == before
+        assert store.undo("s1")["undoes"] == 5  # then back through the earlier edits
+        store.close()
@@ -0,0 +1,171 @@
+"""
+Unit tests for the validation storage engines.
+"""
+import json
+import pytest
+from app.utils.true_metrics import SessionCounts
+from app.utils.validation_journal import JournalValidationStore
+from app.utils.validation_store import (
+    BoxNotFound,
+    ImageNotFound,
+    JsonValidationStore,
+    SessionNotFound,
+    SqliteValidationStore
+)
+
+
+def make_image(image_id, boxes=2):
+    return {
+        "image_id": image_id,
+        "timestamp": "2024-01-01T00:00:00",
+        "model": "yolov8n",
+        "boxes": [
+            {
+                "x1": 10.0 * i, "y1": 10.0, "x2": 10.0 * i + 5, "y2": 20.0,
+                "confidence": 0.9, "label": "person", "class_id": 0,
+                "box_id": f"{image_id}_box_{i}", "model": None,
+                "is_verified": False, "is_correct": True, "is_manual": False,
+                "verified_at": None, "notes": None
+            }
+            for i in range(boxes)
+        ],
+        "yolo_metrics": {"fps": 10.0, "avg_confidence": 0.9, "box_count": boxes}
+    }
+
+
+@pytest.fixture(params=["sqlite", "journal", "json"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        engine = SqliteValidationStore(tmp_path / "validations.sqlite3", legacy_dir=tmp_path / "legacy")
+    elif request.param == "journal":
+        engine = JournalValidationStore(tmp_path / "journal", legacy_dir=tmp_path / "legacy")
+    else:
+        engine = JsonValidationStore(tmp_path / "validations")
+    yield engine
+    engine.close()
+
+
+class TestValidationStore:
+    """Test every engine behaves like the original JSON document"""
+
+    def test_add_images_skips_stored(self, store):
+        assert store.add_images("s1", [make_image("s1_1")]) == 1
+        assert store.add_images("s1", [make_image("s1_1"), make_image("s1_2")]) == 1
+        session = store.load("s1")
+        assert [img["image_id"] for img in session["images"]] == ["s1_1", "s1_2"]
+        assert session["images"][0] == make_image("s1_1")
+        assert store.image_ids("s1") == {"s1_1", "s1_2"}
+
+    def test_image_model(self, store):
+        store.add_images("s1", [make_image("s1_1"), {**make_image("s1_2"), "model": None}])
+        assert store.image_model("s1", "s1_1") == "yolov8n"
+        assert store.image_model("s1", "s1_2") is None
+        with pytest.raises(ImageNotFound):
+            store.image_model("s1", "s1_9")
+        with pytest.raises(SessionNotFound):
+            store.image_model("nope", "nope_1")
+
+    def test_missing_session(self, store):
+        assert store.load("nope") is None
+        assert not store.exists("nope")
+        with pytest.raises(SessionNotFound):
+            store.add_box("nope", "nope_1", {"label": "cat"})
+
+    def test_update_box(self, store):
+        store.add_images("s1", [make_image("s1_1")])
+        store.update_box("s1", "s1_1_box_1", {"is_verified": True, "is_correct": False, "notes": "shadow"})
+        box = store.load("s1")["images"][0]["boxes"][1]
+        assert box["is_verified"] is True and box["is_correct"] is False and box["notes"] == "shadow"
+        with pytest.raises(BoxNotFound):
+            store.update_box("s1", "s1_1_box_9", {"is_verified": True})
+
+    def test_box_ids_not_reused_after_delete(self, store):
+        store.add_images("s1", [make_image("s1_1", boxes=3)])
+        assert store.delete_box("s1", "s1_1", "s1_1_box_1") == 2
+        added = store.add_box("s1", "s1_1", {**make_image("s1_1")["boxes"][0], "is_manual": True})
+        assert added["box_id"] == "s1_1_box_3"
+        box_ids = [b["box_id"] for b in store.load("s1")["images"][0]["boxes"]]
+        assert box_ids == ["s1_1_box_0", "s1_1_box_2", "s1_1_box_3"]
+
+    def test_box_found_by_id_after_delete_and_add(self, store):
+        store.add_images("s1", [make_image("s1_1", boxes=3), make_image("s1_2")])
+        store.delete_box("s1", "s1_1", "s1_1_box_0")
+        added = store.add_box("s1", "s1_1", {**make_image("s1_1")["boxes"][0], "is_manual": True})
+        with store.batch("s1"):
+            store.update_box("s1", "s1_1_box_2", {"notes": "kept its id"})
+            store.update_box("s1", added["box_id"], {"is_verified": True})
+            store.update_box("s1", "s1_2_box_1", {"notes": "other image"})
+            with pytest.raises(BoxNotFound):
+                store.update_box("s1", "s1_1_box_0", {"notes": "deleted"})
+            with pytest.raises(BoxNotFound):
+                store.delete_box("s1", "s1_1", "s1_2_box_0")  # exists, but in another image
+        first, second = store.load("s1")["images"]
+        assert [b["notes"] for b in first["boxes"]] == [None, "kept its id", None]
+        assert first["boxes"][2]["is_verified"] is True
+        assert second["boxes"][1]["notes"] == "other image"
+
+    def test_delete_errors(self, store):
+        store.add_images("s1", [make_image("s1_1")])
+        with pytest.raises(ImageNotFound):
+            store.delete_box("s1", "s1_9", "s1_9_box_0")
+        with pytest.raises(BoxNotFound):
+            store.delete_box("s1", "s1_1", "s1_1_box_7")
+
+    def test_batch_applies_every_change(self, store):
+        store.add_images("s1", [make_image("s1_1", boxes=3)])
+        with store.batch("s1"):
+            store.update_box("s1", "s1_1_box_0", {"is_verified": True})
+            with pytest.raises(BoxNotFound):
+                store.update_box("s1", "s1_1_box_9", {"is_verified": True})
+            store.delete_box("s1", "s1_1", "s1_1_box_2")
+        boxes = store.load("s1")["images"][0]["boxes"]
+        assert [b["box_id"] for b in boxes] == ["s1_1_box_0", "s1_1_box_1"]
+        assert boxes[0]["is_verified"] is True
+
+    def test_counts_follow_every_change(self, store):
+        store.add_images("s1", [make_image("s1_1", boxes=3)])
+        assert store.counts("s1").total.boxes == 3
+        with store.batch("s1"):
+            store.update_box("s1", "s1_1_box_0", {"is_verified": True, "is_correct": True})
+            store.update_box("s1", "s1_1_box_1", {"is_verified": True, "is_correct": False})
+        store.update_box("s1", "s1_1_box_1", {"is_correct": True})
+        store.add_box("s1", "s1_1", {**make_image("s1_1")["boxes"][0], "is_manual": True, "is_verified": True})
+        store.delete_box("s1", "s1_1", "s1_1_box_2")
+        store.add_images("s1", [make_image("s1_2")])
+
+        counts = store.counts("s1")
+        expected = SessionCounts.from_session(store.load("s1"))
+        assert counts.total.as_dict() == expected.total.as_dict()
+        assert counts.total.as_dict() == {
+            "true_positives": 2, "false_positives": 0, "false_negatives": 1, "verified": 3, "boxes": 5
+        }
+        assert {k: v.as_dict() for k, v in counts.images.items()} == {k: v.as_dict() for k, v in expected.images.items()}
+        assert store.counts("nope") is None
+
+    def test_forgotten_counts_are_rebuilt(self, store):
+        store.add_images("s1", [make_image("s1_1", boxes=3)])
+        assert store.counts("s1").total.boxes == 3
+        store.forget("s1")
+        assert "s1" not in store._counts
+        store.delete_box("s1", "s1_1", "s1_1_box_2")  # not counted while forgotten
+        assert store.counts("s1").total.boxes == 2
+
+
+class TestJsonMigration:
+    """Test the SQLite engine imports JSON sessions on first access"""
+
+    def test_imports_legacy_file_once(self, tmp_path):
+        legacy = tmp_path / "legacy"
+        legacy.mkdir()
+        session = {"session_id": "s1", "images": [make_image("s1_1")], "true_metrics": {"precision": 1.0}}
+        (legacy / "s1.json").write_text(json.dumps(session))
+
+        store = SqliteValidationStore(tmp_path / "validations.sqlite3", legacy_dir=legacy)
+        assert store.session_ids() == ["s1"]
+        del session["true_metrics"]  # derived from the boxes, not stored
+        assert store.load("s1") == session
+        assert not (legacy / "s1.json").exists()
+        assert (legacy / "s1.json.migrated").exists()
+
+        reopened = SqliteValidationStore(tmp_path / "validations.sqlite3", legacy_dir=legacy)
+        assert reopened.load("s1") == session
@@ -63,9 +63,13 @@ export const api = {
     return res.json()
   },
 
-  infer: async (sessionId: string, imageId?: string) => {
-    const url = imageId
-      ? `${API_URL}/api/infer/${sessionId}?image_id=${imageId}`
+  infer: async (sessionId: string, imageId?: string, model?: string) => {
+    const params = new URLSearchParams()
+    if (imageId) params.set('image_id', imageId)
+    if (model) params.set('model', model)
+    const query = params.toString()
+    const url = query
+      ? `${API_URL}/api/infer/${sessionId}?${query}`
       : `${API_URL}/api/infer/${sessionId}`
     
     const res = await makeAuthenticatedRequest(url, {
@@ -80,6 +84,68 @@ export const api = {
     return res.json()
   },
 
+  // Queues inference and returns {job_id, status} at once; poll getJob or listen for "job" events on the session websocket
+  submitJob: async (sessionId: string, imageId?: string, model?: string) => {
+    const params = new URLSearchParams()
+    if (imageId) params.set('image_id', imageId)
+    if (model) params.set('model', model)
+    const query = params.toString()
+    const url = query
+      ? `${API_URL}/api/jobs/${sessionId}?${query}`
+      : `${API_URL}/api/jobs/${sessionId}`
+
+    const res = await makeAuthenticatedRequest(url, {
+      method: 'POST',
+    })
+
+    if (!res.ok) {
+      const err = await res.json()
+      throw new Error(err.detail || 'Job submission failed')
+    }
+
+    return res.json()
+  },
+
+  // Job status; `result` (same shape as infer's response) is set once status is "done"
+  getJob: async (jobId: string) => {
+    const res = await makeAuthenticatedRequest(`${API_URL}/api/jobs/${jobId}`)
+
+    if (!res.ok) {
+      const err = await res.json()
+      throw new Error(err.detail || 'Job not found')
+    }
+
+    return res.json()
+  },
+
+  // Runs every un-inferred image (or the given ones) and calls onEvent per NDJSON line as results arrive
+  inferBatch: async (sessionId: string, onEvent: (event: any) => void, imageIds?: string[]) => {
+    const res = await makeAuthenticatedRequest(`${API_URL}/api/infer-batch/${sessionId}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ image_ids: imageIds ?? null, stream: 'ndjson' }),
+    })
+
+    if (!res.ok || !res.body) {
+      const err = await res.json()
+      throw new Error(err.detail || 'Batch inference failed')
+    }
+
+    const reader = res.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split('\n')
+      buffer = lines.pop() || ''
+      for (const line of lines) {
+        if (line.trim()) onEvent(JSON.parse(line))
+      }
+    }
+  },
+
   export: async (sessionId: string, boxes: any[], width: number, height: number) => {
     const res = await makeAuthenticatedRequest(`${API_URL}/api/export`, {
       method: 'POST',
@@ -142,7 +208,30 @@ export const api = {
     return res.json()
   },
 
+  // Takes back the latest review / manual box / deletion (needs the journal validation store); returns fresh metrics
+  undo: async (sessionId: string) => {
+    const res = await makeAuthenticatedRequest(`${API_URL}/api/validations/${sessionId}/undo`, {
+      method: 'POST',
+    })
+
+    if (!res.ok) {
+      const err = await res.json()
+      throw new Error(err.detail || 'Undo failed')
+    }
+
+    return res.json()
+  },
+
   connectMetrics: (sessionId: string) => {
     return new WebSocket(`${WS_URL}/ws/metrics/${sessionId}`)
   },
+
+  // Send JPEG frames with ws.send(blob); one "detections" message comes back per processed frame
+  connectDetectionStream: (sessionId: string, mode: 'latest' | 'all' = 'latest', model?: string) => {
+    const params = new URLSearchParams({ mode })
+    if (model) params.set('model', model)
+    const ws = new WebSocket(`${WS_URL}/ws/detect/${sessionId}?${params}`)
+    ws.binaryType = 'arraybuffer'
+    return ws
+  },
 }
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Side-by-side benchmark of inference backends (torch vs ONNX Runtime vs OpenVINO).
+
+For each backend reports single-image latency (p50/p95), batched
+throughput, and box agreement with the torch backend: the share of torch
+boxes matched by a same-class box at IoU >= 0.5, plus the mean confidence
+difference of matched boxes.
+
+Images come from the upload dir (visionpulse_uploads) plus the sample
+images bundled with ultralytics.
+
+Usage: python scripts/bench_backends.py [--backends torch onnx openvino] [--runs 20] [--batch 4]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.config.inference import PREDICT_KWARGS, YOLO_MODEL_WEIGHTS  # noqa: E402
+from app.utils.backends import load_backend_model  # noqa: E402
+from app.utils.detections import match_boxes, parse_result  # noqa: E402
+from app.utils.images import read_image  # noqa: E402
+
+def load_images(limit):
+    from ultralytics.utils import ASSETS
+    upload_dir = Path(tempfile.gettempdir()) / "visionpulse_uploads"
+    paths = sorted(ASSETS.glob("*.jpg"))
+    if upload_dir.exists():
+        paths += sorted(p for p in upload_dir.rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp"))
+    return [read_image(p) for p in paths[:limit]]
+
+
+def agreement(reference, candidate):
+    """(share of reference boxes matched, mean |conf diff| of matches) over all images."""
+    matched, total, conf_diffs = 0, 0, []
+    for ref_boxes, cand_boxes in zip(reference, candidate):
+        total += len(ref_boxes)
+        for ci, ri in match_boxes(cand_boxes, ref_boxes):
+            matched += 1
+            conf_diffs.append(abs(cand_boxes[ci]["confidence"] - ref_boxes[ri]["confidence"]))
+    return (matched / total if total else 1.0), (statistics.mean(conf_diffs) if conf_diffs else 0.0)
+
+
+def bench(backend, images, runs, batch):
+    model = load_backend_model(backend, YOLO_MODEL_WEIGHTS)
+    model.predict(images[0], **PREDICT_KWARGS)  # warmup
+
+    latencies = []
+    for i in range(runs):
+        t0 = time.perf_counter()
+        model.predict(images[i % len(images)], **PREDICT_KWARGS)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    batches = [images[i:i + batch] for i in range(0, len(images), batch)]
+    t0 = time.perf_counter()
+    boxes = []
+    for chunk in batches:
+        boxes += [parse_result(r) for r in model.predict(chunk, **PREDICT_KWARGS)]
+    throughput = len(images) / (time.perf_counter() - t0)
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[max(0, int(len(latencies) * 0.95) - 1)],
+        "throughput": throughput,
+        "boxes": boxes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino"])
+    parser.add_argument("--runs", type=int, default=20, help="single-image latency samples")
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--images", type=int, default=32)
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    results = {}
+    for backend in backends:
+        try:
+            results[backend] = bench(backend, images, args.runs, args.batch)
+        except Exception as e:
+            print(f"{backend}: skipped ({e})")
+
+    reference = results["torch"]["boxes"]
+    print(f"\n{len(images)} images, batch={args.batch}")
+    print(f"{'backend':>9}  {'p50 ms':>7}  {'p95 ms':>7}  {'img/s':>7}  {'box agree':>9}  {'conf diff':>9}")
+    for backend, r in results.items():
+        agree, conf_diff = agreement(reference, r["boxes"])
+        print(f"{backend:>9}  {r['p50']:>7.1f}  {r['p95']:>7.1f}  {r['throughput']:>7.2f}  {agree:>8.1%}  {conf_diff:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Event-loop responsiveness benchmark.
+
+Measures latency of a non-inference route (/limits by default) while idle,
+then again while /api/infer is saturated by concurrent clients. With
+inference on the executor both runs should look about the same.
+
+Run backend first: docker-compose up backend
+Raise INFERENCE_RATE_LIMIT in app/config/security.py first, or most
+inference calls will come back as 429s instead of loading the model.
+Usage: python scripts/bench_event_loop.py [--url URL] [--clients N] [--seconds S]
+"""
+
+import argparse
+import asyncio
+import io
+import statistics
+import time
+
+import httpx
+from PIL import Image
+
+
+def make_jpeg(width=1280, height=720) -> bytes:
+    """Synthetic test image (no real objects needed to load the model)."""
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (120, 180, 90)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def summarize(name, samples_ms):
+    samples_ms = sorted(samples_ms)
+    if not samples_ms:
+        print(f"{name:>10}: no samples")
+        return
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1] if len(samples_ms) >= 20 else samples_ms[-1]
+    print(
+        f"{name:>10}: n={len(samples_ms):4d}  p50={statistics.median(samples_ms):7.1f} ms  "
+        f"p95={p95:7.1f} ms  max={samples_ms[-1]:7.1f} ms"
+    )
+
+
+async def probe(client, path, seconds):
+    """Hit a cheap route every 50 ms and record its latency."""
+    latencies = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        await client.get(path)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+async def hammer(client, session_id, image_id, seconds):
+    """Keep one inference request in flight at all times."""
+    statuses = {}
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        r = await client.post(f"/api/infer/{session_id}", params={"image_id": image_id})
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+    return statuses
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        r = await client.post("/api/upload", files={"file": ("bench.jpg", make_jpeg(), "image/jpeg")})
+        r.raise_for_status()
+        upload = r.json()
+        session_id, image_id = upload["session_id"], upload["image_id"]
+
+        # first call loads + warms the model so it doesn't skew the idle run
+        await client.post(f"/api/infer/{session_id}", params={"image_id": image_id})
+
+        print(f"Probing {args.probe} for {args.seconds}s idle...")
+        idle = await probe(client, args.probe, args.seconds)
+
+        print(f"Probing {args.probe} for {args.seconds}s with {args.clients} inference clients...")
+        results = await asyncio.gather(
+            probe(client, args.probe, args.seconds),
+            *(hammer(client, session_id, image_id, args.seconds) for _ in range(args.clients))
+        )
+        loaded, statuses = results[0], results[1:]
+
+        print()
+        summarize("idle", idle)
+        summarize("saturated", loaded)
+        merged = {}
+        for s in statuses:
+            for code, count in s.items():
+                merged[code] = merged.get(code, 0) + count
+        print(f"inference responses: {merged}")
+        stats = (await client.get("/api/inference/stats")).json()
+        print(f"inference stats: {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--probe", default="/limits", help="non-inference route to measure")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except httpx.ConnectError:
+        print("Error: Backend not running. Start with: docker-compose up backend")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Replica pool throughput benchmark.
+
+Runs the same stream of images through ReplicaPool with 1..N replicas and
+prints images/sec for each pool size, so you can see how throughput scales
+with the replica count on this machine.
+
+Usage: python scripts/bench_replicas.py [--replicas 1 2 4] [--threads 2] [--images 64]
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.utils.replica_pool import ReplicaPool  # noqa: E402
+from app.config.inference import PREDICT_KWARGS  # noqa: E402
+
+
+def make_images(count, width=1280, height=720):
+    """Random noise images - the forward pass costs the same with or without objects."""
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def run(replicas, threads, images, batch):
+    pool = ReplicaPool(
+        size=replicas,
+        threads_per_replica=threads,
+        predict_kwargs=PREDICT_KWARGS
+    )
+    pool.start()
+    batches = [images[i:i + batch] for i in range(0, len(images), batch)]
+    try:
+        # one submitting thread per replica, same as the inference executor
+        with ThreadPoolExecutor(max_workers=replicas) as submitters:
+            t0 = time.perf_counter()
+            list(submitters.map(pool.predict, batches))
+            elapsed = time.perf_counter() - t0
+    finally:
+        pool.shutdown()
+    return len(images) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=2, help="threads per replica")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=4, help="images per predict() call")
+    args = parser.parse_args()
+
+    images = make_images(args.images)
+    baseline = None
+    print(f"{'replicas':>8}  {'threads':>7}  {'img/s':>8}  {'speedup':>7}")
+    for replicas in args.replicas:
+        ips = run(replicas, args.threads, images, args.batch)
+        baseline = baseline or ips
+        print(f"{replicas:>8}  {args.threads:>7}  {ips:>8.2f}  {ips / baseline:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
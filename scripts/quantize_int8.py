@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Build the INT8 model and check it against user ground truth.
+
+1. Quantizes the weights to INT8 ONNX (static: calibrated on the images in
+   visionpulse_uploads; dynamic: weights only).
+2. Runs FP32 and INT8 over every image users validated via /api/validate
+   and compares precision/recall.
+3. Saves the report next to the model. With INFERENCE_BACKEND = "onnx_int8"
+   the server only serves INT8 if this report passed.
+
+Run it on the server host (it reads the upload + validation temp dirs),
+then restart the backend.
+Usage: python scripts/quantize_int8.py [--mode static|dynamic] [--rebuild]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.config.inference import INT8_QUANTIZATION_MODE, PREDICT_KWARGS, YOLO_MODEL_WEIGHTS  # noqa: E402
+from app.utils.backends import export_model, exported_path  # noqa: E402
+from app.utils.images import read_image  # noqa: E402
+from app.utils.quantization import quantize_int8, report_path, run_guardrail, upload_images  # noqa: E402
+
+
+def latency_ms(model_path, images, runs=20):
+    """Mean single-image latency, after one warmup call."""
+    from ultralytics import YOLO
+    model = YOLO(str(model_path), task="detect")
+    model.predict(images[0], **PREDICT_KWARGS)
+    t0 = time.perf_counter()
+    for i in range(runs):
+        model.predict(images[i % len(images)], **PREDICT_KWARGS)
+    return (time.perf_counter() - t0) / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["static", "dynamic"], default=INT8_QUANTIZATION_MODE)
+    parser.add_argument("--rebuild", action="store_true", help="re-quantize even if an INT8 model exists")
+    args = parser.parse_args()
+
+    int8_path = exported_path(YOLO_MODEL_WEIGHTS, "onnx_int8")
+    if args.rebuild or not int8_path.exists():
+        quantize_int8(YOLO_MODEL_WEIGHTS, mode=args.mode)
+
+    report = run_guardrail(YOLO_MODEL_WEIGHTS)
+
+    images = [read_image(p) for p in upload_images(8)]
+    if images:
+        report["fp32_latency_ms"] = round(latency_ms(export_model(YOLO_MODEL_WEIGHTS, "onnx"), images), 1)
+        report["int8_latency_ms"] = round(latency_ms(int8_path, images), 1)
+        with open(report_path(YOLO_MODEL_WEIGHTS), "w") as f:
+            json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    if report["fp32"]["images"] == 0:
+        print("\nNo validated images found - validate some detections in the UI first.")
+    print(f"\nGuardrail {'PASSED' if report['passed'] else 'FAILED'} - report saved to {report_path(YOLO_MODEL_WEIGHTS)}")
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()